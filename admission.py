@@ -0,0 +1,162 @@
+"""
+Контроль допуска запросов (admission control) для сервера PING/PONG.
+
+Сервер по спецификации сам игнорирует 10% запросов. Этот модуль добавляет
+осознанный сброс нагрузки, когда запросов больше, чем сервер готов обслужить:
+
+1. Token bucket на каждого клиента - один клиент не может залить сервер
+2. Глобальный token bucket - общий потолок запросов в секунду
+3. Ограничение очереди ожидающих ответов на одно соединение
+
+Отклонённые запросы считаются по причинам, чтобы было видно, сколько
+нагрузки сброшено и почему.
+"""
+
+import time
+from typing import Dict, Optional
+
+# Причины сброса запроса (ключи счётчика AdmissionController.shed)
+SHED_CLIENT_RATE: str = 'client_rate'
+SHED_GLOBAL_RATE: str = 'global_rate'
+SHED_QUEUE_FULL: str = 'queue_full'
+
+
+class TokenBucket:
+    """
+    Token bucket: ведро на burst жетонов, пополняется со скоростью rate в секунду.
+
+    Каждый запрос забирает один жетон. Пустое ведро = запрос отклоняется.
+    Пополнение считается лениво при обращении, без фоновых таймеров.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        Args:
+            rate: float - скорость пополнения, жетонов в секунду
+            burst: float - ёмкость ведра (допустимый всплеск запросов)
+
+        Исключения:
+            ValueError: burst меньше одного жетона - запрос не пройдёт никогда
+        """
+        if burst < 1.0:
+            raise ValueError(f'Ёмкость ведра меньше 1 жетона: {burst}')
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst  # Стартуем с полным ведром
+        self.updated: float = time.monotonic()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Пытается забрать жетоны из ведра.
+
+        Args:
+            tokens: float - сколько жетонов нужно
+
+        Returns:
+            bool - True, если жетонов хватило (запрос допущен)
+        """
+        now: float = time.monotonic()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+
+class AdmissionController:
+    """
+    Решает, допускать ли запрос к обработке, и считает сброшенные запросы.
+
+    Любой лимит можно отключить, передав None - тогда сервер ведёт себя
+    строго по спецификации.
+    """
+
+    def __init__(
+        self,
+        client_rate: Optional[float] = None,
+        client_burst: Optional[float] = None,
+        global_rate: Optional[float] = None,
+        global_burst: Optional[float] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            client_rate: Optional[float] - лимит запросов в секунду на клиента
+            client_burst: Optional[float] - всплеск на клиента
+                (по умолчанию = client_rate, но не меньше 1)
+            global_rate: Optional[float] - общий лимит запросов в секунду
+            global_burst: Optional[float] - общий всплеск
+                (по умолчанию = global_rate, но не меньше 1)
+            max_pending: Optional[int] - максимум ожидающих ответов на соединение
+        """
+        self.client_rate: Optional[float] = client_rate
+        # При rate < 1/с ведро на rate жетонов никогда не наберёт целый
+        self.client_burst: Optional[float] = client_burst or (
+            max(1.0, client_rate) if client_rate else None
+        )
+        self.max_pending: Optional[int] = max_pending
+
+        self.global_bucket: Optional[TokenBucket] = None
+        if global_rate:
+            self.global_bucket = TokenBucket(
+                global_rate, global_burst or max(1.0, global_rate)
+            )
+
+        # Счётчики сброшенных запросов по причинам
+        self.shed: Dict[str, int] = {
+            SHED_CLIENT_RATE: 0,
+            SHED_GLOBAL_RATE: 0,
+            SHED_QUEUE_FULL: 0,
+        }
+
+    @property
+    def shed_total(self) -> int:
+        """Общее число запросов, сброшенных из-за перегрузки."""
+        return sum(self.shed.values())
+
+    def client_bucket(self) -> Optional[TokenBucket]:
+        """
+        Создаёт token bucket для нового клиента.
+
+        Returns:
+            Optional[TokenBucket] - ведро клиента или None, если лимит выключен
+        """
+        if not self.client_rate:
+            return None
+        return TokenBucket(self.client_rate, self.client_burst)
+
+    def admit(
+        self, bucket: Optional[TokenBucket], pending: int
+    ) -> Optional[str]:
+        """
+        Проверяет, можно ли принять запрос в обработку.
+
+        Сначала проверяется очередь соединения (самая дешёвая проверка),
+        затем ведро клиента и только потом общее ведро - чтобы шумный
+        клиент не тратил глобальные жетоны.
+
+        Args:
+            bucket: Optional[TokenBucket] - ведро клиента
+            pending: int - сколько ответов этому клиенту уже ожидают отправки
+
+        Returns:
+            Optional[str] - None, если запрос допущен, иначе причина сброса
+        """
+        reason: Optional[str] = None
+        if self.max_pending is not None and pending >= self.max_pending:
+            reason = SHED_QUEUE_FULL
+        elif bucket is not None and not bucket.try_acquire():
+            reason = SHED_CLIENT_RATE
+        elif (
+            self.global_bucket is not None
+            and not self.global_bucket.try_acquire()
+        ):
+            reason = SHED_GLOBAL_RATE
+
+        if reason is not None:
+            self.shed[reason] += 1
+        return reason
@@ -0,0 +1,38 @@
+"""
+Общие помощники разбора логов и замеров.
+
+Нужны и нагрузочным скриптам (bench.py, replay.py), и разбору логов
+(one_way.py), поэтому живут отдельно: скрипт разбора не тянет за собой
+запуск серверов и прокси.
+"""
+
+import datetime
+from typing import List
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Перцентиль по уже отсортированному списку.
+
+    Args:
+        values: List[float] - отсортированные значения
+        fraction: float - доля (0.99 для p99)
+
+    Returns:
+        float - значение перцентиля
+    """
+    index: int = min(len(values) - 1, int(len(values) * fraction))
+    return values[index]
+
+
+def parse_time(date_str: str, time_str: str) -> float:
+    """
+    "ГГГГ-ММ-ДД", "ЧЧ:ММ:СС.ммм" из лога -> unix time.
+
+    Дата в строке лога - момент записи, поэтому для времени отправки,
+    записанного после полуночи по дате предыдущего дня, ошибка в сутки
+    возможна; для замеров интервалов внутри прогона это не важно.
+    """
+    return datetime.datetime.strptime(
+        f"{date_str} {time_str}", '%Y-%m-%d %H:%M:%S.%f'
+    ).timestamp()
@@ -0,0 +1,580 @@
+"""
+Входной прокси, распределяющий клиентов между несколькими серверами.
+
+Когда одного процесса server.py перестаёт хватать, несколько серверов
+запускаются на разных портах, а клиенты по-прежнему подключаются
+к 127.0.0.1:8888 - к балансировщику. Он выбирает сервер (бэкенд) для
+каждого нового соединения и дальше только переносит байты:
+
+- least-conn - бэкенд с наименьшим числом соединений через балансировщик;
+- hash - консистентное хеширование IP-адреса клиента: кольцо из VNODES
+  точек на бэкенд, и при уходе бэкенда переезжают только его клиенты.
+  Порт клиента в ключ не входит: он свой у каждого соединения, и
+  переподключившийся клиент попадал бы на случайный бэкенд. Все
+  клиенты с одного адреса (например, 127.0.0.1) идут на один бэкенд.
+
+Проверка здоровья - сверка часов ("TIME t1", см. clock_sync.py) раз
+в HEALTH_INTERVAL по постоянному соединению с портом проверок сервера
+(server.py --health-port; по умолчанию порт бэкенда + HEALTH_PORT_OFFSET).
+Это не клиент: номера клиента оно не занимает, keepalive не получает.
+Ответ приходит из того же цикла событий, что и ответы клиентам, поэтому
+проверяется не только то, что ядро принимает соединения, но и то, что
+сервер не завис.
+На бэкенд без ответа за HEALTH_TIMEOUT новые клиенты не идут, пока он
+не ответит снова; уже подключённые остаются.
+
+Список бэкендов можно поменять на ходу: --backends-file перечитывается
+по SIGHUP. Убранный бэкенд не получает новых клиентов и дренируется:
+его соединения живут, пока клиенты сами не отключатся, но не дольше
+DRAIN_TIMEOUT.
+
+Байты переносятся протоколами asyncio без StreamReader: кусок, пришедший
+из одного сокета, тем же объектом bytes уходит в другой, а заполненный
+буфер отправки останавливает чтение с другой стороны (pause_reading).
+
+Номера ответов и клиентов у каждого бэкенда свои, server.log - тоже.
+
+Запуск:
+    python balancer.py --spawn 3                  # 3 сервера на 9001-9003
+    python balancer.py --spawn 2 --policy hash --delay-max 0.2
+    python balancer.py --backend 9001 --backend 127.0.0.1:9002/9502
+    python balancer.py --backends-file backends.txt  # kill -HUP - перечитать
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import os
+import signal
+import subprocess
+import sys
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from clock_sync import CLOCK_REQUEST, clock_request, now_us
+
+SERVER_SCRIPT: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'server.py'
+)
+
+LISTEN_PORT: int = 8888
+BASE_PORT: int = 9001  # первый порт серверов, запущенных с --spawn
+# Порт проверок здоровья бэкенда, если не задан явно: порт + смещение
+HEALTH_PORT_OFFSET: int = 1000
+
+POLICY_LEAST_CONN: str = 'least-conn'
+POLICY_HASH: str = 'hash'
+
+HEALTH_INTERVAL: float = 1.0  # секунды между проверками бэкенда
+HEALTH_TIMEOUT: float = 1.0  # ответ на проверку дольше - бэкенд нездоров
+DRAIN_TIMEOUT: float = 30.0  # сколько ждать клиентов убранного бэкенда
+
+VNODES: int = 64  # точек кольца на бэкенд в режиме hash
+
+Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+BackendAddress = Tuple[str, int, int]  # хост, порт, порт проверок
+
+
+def ring_hash(key: str) -> int:
+    """Точка кольца для ключа: первые 8 байт MD5."""
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+def parse_address(value: str) -> BackendAddress:
+    """
+    "[HOST:]PORT[/HEALTH_PORT]" -> (хост, порт, порт проверок).
+
+    Исключения:
+        ValueError: порт не число
+    """
+    address, sep, health = value.strip().partition('/')
+    host, colon, port = address.rpartition(':')
+    return (
+        host if colon else '127.0.0.1',
+        int(port),
+        int(health) if sep else int(port) + HEALTH_PORT_OFFSET,
+    )
+
+
+def read_backends_file(path: str) -> List[BackendAddress]:
+    """Адреса бэкендов из файла: по одному в строке, # - комментарий."""
+    with open(path, encoding='UTF-8') as f:
+        lines: List[str] = [line.split('#')[0].strip() for line in f]
+    return [parse_address(line) for line in lines if line]
+
+
+class Relay(asyncio.Protocol):
+    """
+    Одна сторона пары соединений: всё, что пришло в свой сокет, пишется
+    в сокет пары.
+
+    Атрибуты:
+        transport: Optional[asyncio.Transport] - свой сокет
+        peer: Optional[Relay] - другая сторона пары
+        on_close: Optional[Callable[[], None]] - вызывается при закрытии
+        eof: bool - своя сторона закрыла запись
+    """
+
+    def __init__(self, peer: Optional['Relay'] = None) -> None:
+        self.transport: Optional[asyncio.Transport] = None
+        self.peer: Optional[Relay] = peer
+        self.on_close: Optional[Callable[[], None]] = None
+        self.eof: bool = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        self.peer.transport.write(data)
+
+    def eof_received(self) -> bool:
+        self.eof = True
+        if self.peer.eof:
+            # Обе стороны закрыли запись - пара больше не нужна
+            self.peer.transport.close()
+            return False
+        # Полузакрытие передаём дальше: клиент, закрывший запись, ещё
+        # ждёт ответов на отправленные запросы
+        if self.peer.transport.can_write_eof():
+            self.peer.transport.write_eof()
+        return True
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if self.peer and self.peer.transport:
+            self.peer.transport.close()
+        if self.on_close:
+            self.on_close()
+
+    def pause_writing(self) -> None:
+        # Свой буфер отправки полон: перестаём читать того, кто его заполняет
+        self.peer.transport.pause_reading()
+
+    def resume_writing(self) -> None:
+        self.peer.transport.resume_reading()
+
+
+class ClientRelay(Relay):
+    """Сторона клиента: до подключения к бэкенду клиента не читаем."""
+
+    def __init__(self, balancer: 'Balancer') -> None:
+        super().__init__()
+        self.balancer: Balancer = balancer
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        super().connection_made(transport)
+        transport.pause_reading()
+        self.balancer.start_attach(self)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        super().connection_lost(exc)
+        self.peer = None
+
+
+class Backend:
+    """
+    Сервер за балансировщиком.
+
+    Атрибуты:
+        host: str, port: int - адрес сервера
+        health_port: int - порт проверок здоровья (server.py --health-port)
+        healthy: bool - последняя проверка прошла
+        draining: bool - убран из списка, новых клиентов не получает
+        relays: Set[ClientRelay] - клиенты, идущие через балансировщик
+        total: int - сколько клиентов получил за всё время
+        reserved: int - клиентов, для которых идёт подключение
+        probe: Optional[Streams] - соединение для проверок здоровья
+        health_task: Optional[asyncio.Task[None]] - цикл проверок
+        drain_task: Optional[asyncio.Task[None]] - дренирование
+    """
+
+    def __init__(self, host: str, port: int, health_port: int) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.health_port: int = health_port
+        self.healthy: bool = False
+        self.draining: bool = False
+        self.relays: Set[ClientRelay] = set()
+        self.total: int = 0
+        self.reserved: int = 0
+        self.probe: Optional[Streams] = None
+        self.health_task: Optional[asyncio.Task[None]] = None
+        self.drain_task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @property
+    def active(self) -> int:
+        """Соединения для least-conn, включая ещё подключаемые."""
+        return len(self.relays) + self.reserved
+
+
+class Balancer:
+    """
+    Выбор бэкенда, проверки здоровья, дренирование.
+
+    Атрибуты:
+        policy: str - POLICY_LEAST_CONN или POLICY_HASH
+        backends: Dict[str, Backend] - бэкенды по адресу "хост:порт"
+        ring: List[Tuple[int, Backend]] - кольцо консистентного хеширования
+            (без дренируемых бэкендов), по возрастанию точки
+        stats: Dict[str, int] - принятые клиенты, отказы (нет здорового
+            бэкенда), ошибки подключения к бэкендам
+        attaching: Set[asyncio.Task[None]] - подключения новых клиентов
+            к бэкендам, ещё не завершённые
+    """
+
+    def __init__(self, policy: str = POLICY_LEAST_CONN) -> None:
+        self.policy: str = policy
+        self.backends: Dict[str, Backend] = {}
+        self.ring: List[Tuple[int, Backend]] = []
+        self.ring_points: List[int] = []
+        self.stats: Dict[str, int] = dict.fromkeys(
+            ['accepted', 'rejected', 'connect_errors'], 0
+        )
+        self.attaching: Set[asyncio.Task[None]] = set()
+
+    def update(self, addresses: List[BackendAddress]) -> None:
+        """
+        Приводит список бэкендов к addresses: новые добавляются, убранные
+        дренируются.
+        """
+        wanted: Dict[str, BackendAddress] = {
+            f"{host}:{port}": (host, port, health_port)
+            for host, port, health_port in addresses
+        }
+        for name, address in wanted.items():
+            backend: Optional[Backend] = self.backends.get(name)
+            if backend is None:
+                backend = self.backends[name] = Backend(*address)
+                backend.health_task = asyncio.create_task(
+                    self.check_health(backend)
+                )
+                print(f"Бэкенд {name} добавлен")
+            elif backend.draining:
+                # Вернули в список до конца дренирования: следующее
+                # удаление начнёт дренирование заново
+                backend.draining = False
+                backend.drain_task.cancel()
+                backend.drain_task = None
+                print(f"Бэкенд {name} снова в работе")
+        for name, backend in list(self.backends.items()):
+            if name not in wanted and not backend.draining:
+                backend.draining = True
+                backend.drain_task = asyncio.create_task(self.drain(backend))
+        self.rebuild_ring()
+
+    def rebuild_ring(self) -> None:
+        """Строит кольцо hash из бэкендов, которые не дренируются."""
+        self.ring = sorted(
+            (
+                (ring_hash(f"{backend.name}#{i}"), backend)
+                for backend in self.backends.values()
+                if not backend.draining
+                for i in range(VNODES)
+            ),
+            key=lambda point: point[0],
+        )
+        self.ring_points = [point for point, _ in self.ring]
+
+    async def drain(self, backend: Backend) -> None:
+        """
+        Ждёт, пока клиенты убранного бэкенда отключатся (не дольше
+        DRAIN_TIMEOUT), закрывает оставшихся и забывает бэкенд.
+        """
+        print(
+            f"Бэкенд {backend.name} дренируется, клиентов: "
+            f"{len(backend.relays)}"
+        )
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        deadline: float = loop.time() + DRAIN_TIMEOUT
+        while backend.active and loop.time() < deadline:
+            await asyncio.sleep(HEALTH_INTERVAL)
+        left: List[ClientRelay] = list(backend.relays)
+        for relay in left:
+            relay.transport.close()
+        backend.health_task.cancel()
+        self.backends.pop(backend.name, None)
+        print(f"Бэкенд {backend.name} убран, закрыто клиентов: {len(left)}")
+
+    def choose(self, key: str, tried: Set[Backend]) -> Optional[Backend]:
+        """
+        Выбирает здоровый недренируемый бэкенд по политике.
+
+        Args:
+            key: str - IP-адрес клиента (ключ для hash)
+            tried: Set[Backend] - бэкенды, к которым подключиться не вышло
+
+        Returns:
+            Optional[Backend] - бэкенд или None, если подходящих нет
+        """
+        if self.policy == POLICY_HASH:
+            if not self.ring:
+                return None
+            # По кольцу от точки ключа до первого подходящего бэкенда
+            start: int = bisect.bisect(self.ring_points, ring_hash(key))
+            for offset in range(len(self.ring)):
+                _, backend = self.ring[(start + offset) % len(self.ring)]
+                if backend.healthy and backend not in tried:
+                    return backend
+            return None
+        candidates: List[Backend] = [
+            backend
+            for backend in self.backends.values()
+            if backend.healthy
+            and not backend.draining
+            and backend not in tried
+        ]
+        return min(candidates, key=lambda b: b.active, default=None)
+
+    def start_attach(self, client: ClientRelay) -> None:
+        """Запускает подключение клиента, сохраняя ссылку на задачу."""
+        task: asyncio.Task[None] = asyncio.create_task(self.attach(client))
+        self.attaching.add(task)
+        task.add_done_callback(self.attaching.discard)
+
+    async def attach(self, client: ClientRelay) -> None:
+        """
+        Подключает нового клиента к выбранному бэкенду; если подключиться
+        не вышло - к следующему. Без бэкенда клиента закрываем.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        peer = client.transport.get_extra_info('peername')
+        # Только IP: эфемерный порт меняется при каждом подключении
+        key: str = peer[0] if peer else ''
+        tried: Set[Backend] = set()
+        while True:
+            backend: Optional[Backend] = self.choose(key, tried)
+            if backend is None:
+                self.stats['rejected'] += 1
+                client.transport.close()
+                return
+            tried.add(backend)
+            backend.reserved += 1
+            try:
+                _, server = await loop.create_connection(
+                    lambda: Relay(client), backend.host, backend.port
+                )
+            except OSError:
+                self.stats['connect_errors'] += 1
+                # Следующая проверка вернёт бэкенд, если он жив
+                backend.healthy = False
+                continue
+            finally:
+                backend.reserved -= 1
+            break
+
+        if client.transport.is_closing():
+            server.transport.close()  # Клиент ушёл, пока подключались
+            return
+        client.peer = server
+        backend.relays.add(client)
+        backend.total += 1
+        client.on_close = lambda: backend.relays.discard(client)
+        self.stats['accepted'] += 1
+        client.transport.resume_reading()
+
+    async def check_health(self, backend: Backend) -> None:
+        """Проверяет бэкенд раз в HEALTH_INTERVAL, пока он в списке."""
+        try:
+            while True:
+                healthy: bool = await self.probe(backend)
+                if healthy != backend.healthy:
+                    print(
+                        f"Бэкенд {backend.name} "
+                        f"{'здоров' if healthy else 'не отвечает'}"
+                    )
+                    backend.healthy = healthy
+                await asyncio.sleep(HEALTH_INTERVAL)
+        finally:
+            if backend.probe:
+                backend.probe[1].close()
+
+    async def probe(self, backend: Backend) -> bool:
+        """
+        Одна проверка: сверка часов по постоянному соединению с портом
+        проверок (при ошибке соединение открывается заново).
+
+        Returns:
+            bool - бэкенд ответил за HEALTH_TIMEOUT
+        """
+        try:
+            if backend.probe is None:
+                backend.probe = await asyncio.wait_for(
+                    asyncio.open_connection(
+                        backend.host, backend.health_port
+                    ),
+                    HEALTH_TIMEOUT,
+                )
+            reader, writer = backend.probe
+            writer.write(f"{clock_request(now_us())}\n".encode())
+            return await asyncio.wait_for(
+                self.read_reply(reader), HEALTH_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError):
+            if backend.probe:
+                backend.probe[1].close()
+                backend.probe = None
+            return False
+
+    @staticmethod
+    async def read_reply(reader: asyncio.StreamReader) -> bool:
+        """Ждёт ответа на сверку часов."""
+        line: bytes = await reader.readline()
+        if not line.startswith(CLOCK_REQUEST.encode()):
+            raise ConnectionError('Бэкенд закрыл соединение')
+        return True
+
+
+async def serve(
+    balancer: Balancer,
+    host: str,
+    port: int,
+    addresses: List[BackendAddress],
+    backends_file: Optional[str],
+) -> None:
+    """
+    Запускает проверки бэкендов и принимает клиентов до остановки.
+
+    Args:
+        balancer: Balancer - балансировщик
+        host: str, port: int - где слушать клиентов
+        addresses: List[BackendAddress] - бэкенды из аргументов
+        backends_file: Optional[str] - файл бэкендов, перечитывается по
+            SIGHUP
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+    def reload() -> None:
+        try:
+            balancer.update(read_backends_file(backends_file))
+        except (OSError, ValueError) as exc:
+            print(f"Список бэкендов не перечитан: {exc}")
+
+    if backends_file:
+        addresses = addresses + read_backends_file(backends_file)
+        loop.add_signal_handler(signal.SIGHUP, reload)
+    balancer.update(addresses)
+
+    # Клиентов принимаем, когда хотя бы один бэкенд ответил (запущенным
+    # с --spawn серверам нужно время на старт)
+    for _ in range(int(10 / HEALTH_INTERVAL)):
+        await asyncio.sleep(HEALTH_INTERVAL)
+        if any(b.healthy for b in balancer.backends.values()):
+            break
+    server: asyncio.Server = await loop.create_server(
+        lambda: ClientRelay(balancer), host, port, reuse_address=True
+    )
+    print(f"Балансировщик ({balancer.policy}) слушает {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def spawn_backends(
+    count: int, base_port: int, server_args: List[str]
+) -> List[subprocess.Popen]:
+    """
+    Запускает count серверов на портах base_port, base_port + 1, ...
+    с портами проверок на HEALTH_PORT_OFFSET выше. Каждый работает
+    в своей папке backend_ПОРТ: там его server.log.
+    """
+    servers: List[subprocess.Popen] = []
+    for port in range(base_port, base_port + count):
+        workdir: str = f"backend_{port}"
+        os.makedirs(workdir, exist_ok=True)
+        servers.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    SERVER_SCRIPT,
+                    '--port',
+                    str(port),
+                    '--health-port',
+                    str(port + HEALTH_PORT_OFFSET),
+                    *server_args,
+                ],
+                cwd=workdir,
+                stdout=subprocess.DEVNULL,
+            )
+        )
+    return servers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Балансировщик клиентов между несколькими server.py '
+        '(неизвестные аргументы передаются серверам --spawn)'
+    )
+    parser.add_argument('--listen-host', default='127.0.0.1')
+    parser.add_argument('--listen-port', type=int, default=LISTEN_PORT)
+    parser.add_argument(
+        '--policy',
+        choices=[POLICY_LEAST_CONN, POLICY_HASH],
+        default=POLICY_LEAST_CONN,
+        help='least-conn - меньше всего соединений, hash - консистентное '
+        'хеширование адреса клиента',
+    )
+    parser.add_argument(
+        '--backend',
+        action='append',
+        default=[],
+        metavar='[HOST:]PORT[/HEALTH_PORT]',
+        help='адрес сервера и его --health-port (по умолчанию PORT + '
+        f'{HEALTH_PORT_OFFSET}); можно несколько раз',
+    )
+    parser.add_argument(
+        '--backends-file',
+        metavar='PATH',
+        help='адреса серверов по одному в строке, перечитываются по SIGHUP',
+    )
+    parser.add_argument(
+        '--spawn',
+        type=int,
+        default=0,
+        metavar='N',
+        help='запустить N серверов на портах от --base-port',
+    )
+    parser.add_argument('--base-port', type=int, default=BASE_PORT)
+    args, server_args = parser.parse_known_args()
+    if server_args and not args.spawn:
+        parser.error(f"неизвестные аргументы: {' '.join(server_args)}")
+
+    addresses: List[BackendAddress] = [
+        parse_address(value) for value in args.backend
+    ]
+    addresses += [
+        ('127.0.0.1', port, port + HEALTH_PORT_OFFSET)
+        for port in range(args.base_port, args.base_port + args.spawn)
+    ]
+    if not addresses and not args.backends_file:
+        parser.error('нужны --backend, --backends-file или --spawn')
+
+    servers: List[subprocess.Popen] = spawn_backends(
+        args.spawn, args.base_port, server_args
+    )
+    balancer: Balancer = Balancer(args.policy)
+    try:
+        asyncio.run(
+            serve(
+                balancer,
+                args.listen_host,
+                args.listen_port,
+                addresses,
+                args.backends_file,
+            )
+        )
+    except KeyboardInterrupt:
+        print(f"\nСтатистика балансировщика: {balancer.stats}")
+        for backend in balancer.backends.values():
+            print(
+                f"  {backend.name}: клиентов {backend.total}, "
+                f"{'здоров' if backend.healthy else 'не отвечает'}"
+            )
+    finally:
+        # Серверы получают Ctrl+C как при ручной остановке: печатают
+        # статистику и сбрасывают самописец
+        for process in servers:
+            process.send_signal(signal.SIGINT)
+        for process in servers:
+            process.wait(timeout=10)
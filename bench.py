@@ -0,0 +1,577 @@
+"""
+Бенчмарк транспорта PING/PONG: задержка, пропускная способность и CPU.
+
+Сервер запускается отдельным процессом (server.py) без искусственной
+задержки и без игнорирования запросов, чтобы измерялся сам транспорт.
+Клиенты работают в замкнутом цикле: отправил PING - дождался PONG -
+отправил следующий.
+
+Режимы: TCP и Unix-сокет с текстовыми строками, TCP с бинарными кадрами,
+датаграммы UDP (datagram.py). Потерянную датаграмму клиент UDP ждёт не
+дольше UDP_LOSS_TIMEOUT и переходит к следующему запросу; потери
+выводятся отдельно.
+
+С аргументами ухудшений (--latency, --jitter, --bandwidth, --stall-rate,
+--stall-time) клиенты каждого режима ходят к серверу через impair.py,
+запущенный отдельным процессом, - замер в условиях настоящей сети
+(прокси работает с потоками, поэтому режим UDP тогда не замеряется).
+В режиме unix прокси и сам слушает Unix-сокет, так что TCP в этот
+замер не попадает.
+
+Для каждого режима выводятся:
+- запросов в секунду;
+- RTT: медиана, p99, среднее (мкс);
+- CPU сервера и клиентов на один запрос (мкс).
+
+Запуск:
+    python bench.py
+    python bench.py --clients 8 --requests 5000
+    python bench.py --latency 20 --jitter 5 --bandwidth 0/256
+    python bench.py --skew --clients 10  # один клиент в 100 раз болтливее
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from analysis import percentile
+from datagram import open_datagram_connection, register
+from framing import (
+    FRAME_PONG,
+    HANDSHAKE,
+    HANDSHAKE_ACK,
+    encode_ping,
+    read_frame,
+)
+from impair import add_impairment_args, impairment_argv
+
+SERVER_SCRIPT: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'server.py'
+)
+UNIX_PATH: str = os.path.join(tempfile.gettempdir(), 'pingpong_bench.sock')
+IMPAIR_SCRIPT: str = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'impair.py'
+)
+# Порт прокси: вне диапазона эфемерных портов клиентских соединений
+PROXY_PORT: int = 18888
+# Unix-сокет прокси: режим unix через прокси остаётся Unix-сокетом целиком
+PROXY_UNIX_PATH: str = os.path.join(
+    tempfile.gettempdir(), 'pingpong_bench_proxy.sock'
+)
+
+# Сколько клиент UDP ждёт PONG, прежде чем счесть запрос потерянным, с
+UDP_LOSS_TIMEOUT: float = 1.0
+
+# Сервер без задержки и без игнорирования: измеряем только транспорт
+FAST_SERVER_ARGS: List[str] = [
+    '--delay-min',
+    '0',
+    '--delay-max',
+    '0',
+    '--ignore-rate',
+    '0',
+]
+
+Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+Connector = Callable[[], Awaitable[Streams]]
+
+
+def tcp_connector() -> Awaitable[Streams]:
+    """Подключение по TCP 127.0.0.1:8888."""
+    return asyncio.open_connection('127.0.0.1', 8888)
+
+
+def unix_connector() -> Awaitable[Streams]:
+    """Подключение через Unix-сокет бенчмарка."""
+    return asyncio.open_unix_connection(UNIX_PATH)
+
+
+def proxy_connector() -> Awaitable[Streams]:
+    """Подключение через прокси с ухудшениями (impair.py)."""
+    return asyncio.open_connection('127.0.0.1', PROXY_PORT)
+
+
+def proxy_unix_connector() -> Awaitable[Streams]:
+    """Подключение к Unix-сокету прокси с ухудшениями."""
+    return asyncio.open_unix_connection(PROXY_UNIX_PATH)
+
+
+async def udp_connector() -> Streams:
+    """
+    Регистрация по UDP 127.0.0.1:8888.
+
+    Исключения:
+        ConnectionRefusedError: сервер не подтвердил регистрацию
+    """
+    reader, writer = await open_datagram_connection()
+    if not await register(reader, writer, UDP_LOSS_TIMEOUT):
+        writer.close()
+        raise ConnectionRefusedError('Сервер не подтвердил регистрацию UDP')
+    return reader, writer
+
+
+def children_cpu() -> float:
+    """CPU (user + sys), израсходованный завершёнными дочерними процессами."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def wait_ready(connect: Connector, timeout: float = 10.0) -> None:
+    """
+    Ждёт, пока сервер начнёт принимать подключения.
+
+    Args:
+        connect: Connector - функция подключения к серверу
+        timeout: float - сколько ждать, секунды
+    """
+    deadline: float = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await connect()
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+            continue
+        writer.close()
+        return
+
+
+async def ping_loop(
+    connect: Connector,
+    requests: int,
+    binary: bool = False,
+    deadline: Optional[float] = None,
+    timeout: Optional[float] = None,
+) -> List[float]:
+    """
+    Один клиент в замкнутом цикле: PING -> PONG -> следующий PING.
+
+    Args:
+        connect: Connector - функция подключения к серверу
+        requests: int - сколько запросов отправить
+        binary: bool - согласовать бинарные кадры вместо строк
+        deadline: Optional[float] - не отправлять после этого момента
+            (perf_counter)
+        timeout: Optional[float] - считать запрос без PONG за столько
+            секунд потерянным (None - ждать, как по TCP)
+
+    Returns:
+        List[float] - RTT каждого запроса, секунды
+    """
+    reader, writer = await connect()
+    rtts: List[float] = []
+    try:
+        if binary:
+            writer.write(HANDSHAKE)
+            while await reader.readline() != HANDSHAKE_ACK:
+                pass  # keepalive до подтверждения приходит строкой
+        for req_num in range(requests):
+            sent: float = time.perf_counter()
+            if deadline is not None and sent > deadline:
+                break
+            if binary:
+                writer.write(encode_ping(req_num))
+                while True:
+                    frame = await read_frame(reader)
+                    if frame is None:
+                        raise ConnectionError('Сервер закрыл соединение')
+                    if frame[0] == FRAME_PONG:  # keepalive пропускаем
+                        break
+            else:
+                writer.write(f"[{req_num}] PING\n".encode())
+                try:
+                    await asyncio.wait_for(read_pong(reader, req_num), timeout)
+                except asyncio.TimeoutError:
+                    continue  # PING или PONG потерялся: RTT не считаем
+            rtts.append(time.perf_counter() - sent)
+    finally:
+        writer.close()
+    return rtts
+
+
+async def read_pong(reader: asyncio.StreamReader, req_num: int) -> None:
+    """
+    Читает строки до PONG на запрос req_num: keepalive и опоздавшие
+    ответы на потерянные запросы пропускаются.
+    """
+    expected: bytes = f"/{req_num}] PONG".encode()
+    while True:
+        line: bytes = await reader.readline()
+        if not line:
+            raise ConnectionError('Сервер закрыл соединение')
+        if expected in line:
+            return
+
+
+async def run_load(
+    connect: Connector,
+    clients: int,
+    requests: int,
+    binary: bool,
+    timeout: Optional[float] = None,
+) -> Tuple[List[float], float]:
+    """
+    Запускает клиентов параллельно.
+
+    Returns:
+        Tuple[List[float], float] - все RTT и общее время прогона, секунды
+    """
+    await wait_ready(connect)
+    started: float = time.perf_counter()
+    results: List[List[float]] = await asyncio.gather(
+        *(
+            ping_loop(connect, requests, binary, timeout=timeout)
+            for _ in range(clients)
+        )
+    )
+    elapsed: float = time.perf_counter() - started
+    return [rtt for rtts in results for rtt in rtts], elapsed
+
+
+def bench_mode(
+    name: str,
+    server_args: List[str],
+    connect: Connector,
+    clients: int,
+    requests: int,
+    binary: bool = False,
+    proxy_args: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
+    proxy_connect: Connector = proxy_connector,
+) -> Dict[str, float]:
+    """
+    Прогоняет нагрузку на отдельном процессе сервера и собирает метрики.
+
+    Args:
+        name: str - название режима для отчёта
+        server_args: List[str] - аргументы server.py
+        connect: Connector - функция подключения клиентов
+        clients: int - число параллельных клиентов
+        requests: int - запросов на клиента
+        binary: bool - клиенты согласуют бинарные кадры
+        proxy_args: Optional[List[str]] - аргументы impair.py, включая
+            адрес, который он слушает: клиенты подключаются через прокси
+            (None - напрямую)
+        timeout: Optional[float] - ожидание PONG до признания запроса
+            потерянным (None - без потерь, как по TCP)
+        proxy_connect: Connector - подключение к прокси (тем же
+            транспортом, что и connect)
+
+    Returns:
+        Dict[str, float] - метрики режима
+    """
+    cpu_before: float = children_cpu()
+    with tempfile.TemporaryDirectory() as workdir:
+        # server.log пишется во временную папку, а не рядом с исходниками
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, *FAST_SERVER_ARGS, *server_args],
+            cwd=workdir,
+            stdout=subprocess.DEVNULL,
+        )
+        proxy: Optional[subprocess.Popen] = None
+        try:
+            if proxy_args is not None:
+                # Прокси пропускает подключения только к живому серверу
+                asyncio.run(wait_ready(connect))
+                proxy = subprocess.Popen(
+                    [sys.executable, IMPAIR_SCRIPT, *proxy_args],
+                    stdout=subprocess.DEVNULL,
+                )
+                connect = proxy_connect
+            client_cpu: float = time.process_time()
+            rtts, elapsed = asyncio.run(
+                run_load(connect, clients, requests, binary, timeout)
+            )
+            client_cpu = time.process_time() - client_cpu
+        finally:
+            server.terminate()
+            server.wait(timeout=5)
+            if proxy:
+                proxy.terminate()
+    server_cpu: float = children_cpu() - cpu_before
+    if proxy:
+        # CPU прокси не должен попасть в CPU сервера
+        proxy.wait(timeout=5)
+
+    rtts.sort()
+    total: int = len(rtts)
+    return {
+        'name': name,
+        'rps': total / elapsed,
+        'p50': percentile(rtts, 0.5) * 1e6,
+        'p99': percentile(rtts, 0.99) * 1e6,
+        'mean': statistics.fmean(rtts) * 1e6,
+        'server_cpu': server_cpu / total * 1e6,
+        'client_cpu': client_cpu / total * 1e6,
+        'lost': clients * requests - total,
+    }
+
+
+async def heavy_loop(
+    connect: Connector, depth: int, deadline: float
+) -> List[float]:
+    """
+    Болтливый клиент: держит depth запросов в полёте, на каждый PONG
+    сразу отправляет следующий PING.
+
+    Args:
+        connect: Connector - функция подключения к серверу
+        depth: int - запросов в полёте
+        deadline: float - не отправлять после этого момента (perf_counter)
+
+    Returns:
+        List[float] - RTT каждого запроса, секунды
+    """
+    reader, writer = await connect()
+    sent_at: Dict[int, float] = {}
+    rtts: List[float] = []
+    next_num: int = 0
+    try:
+        for next_num in range(depth):
+            sent_at[next_num] = time.perf_counter()
+            writer.write(f"[{next_num}] PING\n".encode())
+        next_num += 1
+        while sent_at:
+            line: bytes = await reader.readline()
+            if not line:
+                raise ConnectionError('Сервер закрыл соединение')
+            if b'PONG' not in line:
+                continue
+            now: float = time.perf_counter()
+            req_num: int = int(line.split(b'/')[1].split(b']')[0])
+            rtts.append(now - sent_at.pop(req_num))
+            if now < deadline:
+                sent_at[next_num] = now
+                writer.write(f"[{next_num}] PING\n".encode())
+                next_num += 1
+    finally:
+        writer.close()
+    return rtts
+
+
+def bench_skew(
+    name: str,
+    server_args: List[str],
+    light: int,
+    depth: int,
+    duration: float,
+) -> Dict[str, float]:
+    """
+    Перекошенная нагрузка: один клиент держит depth запросов в полёте,
+    light клиентов работают в замкнутом цикле по одному запросу.
+
+    Args:
+        name: str - название режима для отчёта
+        server_args: List[str] - аргументы server.py (планировщик)
+        light: int - число обычных клиентов
+        depth: int - запросов в полёте у болтливого клиента
+        duration: float - длительность прогона, секунды
+
+    Returns:
+        Dict[str, float] - RTT обычных клиентов (общие p50/p99 и разброс
+            p99 между клиентами) и болтливого, доля его ответов
+    """
+
+    async def run() -> Tuple[List[float], List[List[float]]]:
+        await wait_ready(tcp_connector)
+        deadline: float = time.perf_counter() + duration
+        heavy, *lights = await asyncio.gather(
+            heavy_loop(tcp_connector, depth, deadline),
+            *(
+                ping_loop(tcp_connector, 10**9, deadline=deadline)
+                for _ in range(light)
+            ),
+        )
+        return heavy, lights
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, *FAST_SERVER_ARGS, *server_args],
+            cwd=workdir,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            heavy, lights = asyncio.run(run())
+        finally:
+            server.terminate()
+            server.wait(timeout=5)
+
+    heavy.sort()
+    light_all: List[float] = sorted(rtt for rtts in lights for rtt in rtts)
+    light_p99: List[float] = sorted(
+        percentile(sorted(rtts), 0.99) for rtts in lights
+    )
+    return {
+        'name': name,
+        'light_p50': percentile(light_all, 0.5) * 1e6,
+        'light_p99': percentile(light_all, 0.99) * 1e6,
+        'light_p99_min': light_p99[0] * 1e6,
+        'light_p99_max': light_p99[-1] * 1e6,
+        'heavy_p50': percentile(heavy, 0.5) * 1e6,
+        'heavy_p99': percentile(heavy, 0.99) * 1e6,
+        'heavy_share': len(heavy) / (len(heavy) + len(light_all)),
+    }
+
+
+def report_skew(results: List[Dict[str, float]]) -> None:
+    """Печатает RTT обычных и болтливого клиентов по режимам."""
+    print(
+        f"{'режим':<10}{'p50 обыч':>10}{'p99 обыч':>10}"
+        f"{'p99 разброс':>18}{'p50 болт':>10}{'p99 болт':>10}"
+        f"{'доля болт':>11}"
+    )
+    for r in results:
+        spread: str = f"{r['light_p99_min']:.0f}-{r['light_p99_max']:.0f}"
+        print(
+            f"{r['name']:<10}{r['light_p50']:>10.0f}{r['light_p99']:>10.0f}"
+            f"{spread:>18}{r['heavy_p50']:>10.0f}{r['heavy_p99']:>10.0f}"
+            f"{r['heavy_share']:>11.0%}"
+        )
+    print("RTT в мкс; разброс - от лучшего до худшего p99 обычного клиента")
+
+
+def report(results: List[Dict[str, float]]) -> None:
+    """
+    Печатает таблицу метрик и выигрыш каждого режима относительно первого.
+
+    Args:
+        results: List[Dict[str, float]] - метрики режимов, первый - базовый
+    """
+    print(
+        f"{'режим':<10}{'запр/с':>10}{'p50 мкс':>10}{'p99 мкс':>10}"
+        f"{'сред мкс':>10}{'CPU сервера':>13}{'CPU клиентов':>14}"
+    )
+    for r in results:
+        print(
+            f"{r['name']:<10}{r['rps']:>10.0f}{r['p50']:>10.0f}"
+            f"{r['p99']:>10.0f}{r['mean']:>10.0f}"
+            f"{r['server_cpu']:>13.1f}{r['client_cpu']:>14.1f}"
+        )
+    for r in results:
+        if r['lost']:
+            print(f"{r['name']}: потеряно запросов {r['lost']:.0f}")
+
+    base: Dict[str, float] = results[0]
+    for r in results[1:]:
+        print(
+            f"\n{r['name']} относительно {base['name']}: "
+            f"RTT p50 {1 - r['p50'] / base['p50']:+.0%} быстрее, "
+            f"CPU сервера {1 - r['server_cpu'] / base['server_cpu']:+.0%}, "
+            f"CPU клиентов {1 - r['client_cpu'] / base['client_cpu']:+.0%} "
+            f"экономии"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Бенчмарк PING/PONG')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument(
+        '--skew',
+        action='store_true',
+        help='перекошенная нагрузка: один клиент шлёт в --depth раз '
+        'больше остальных; сравнить отправку без очереди, fifo и drr',
+    )
+    parser.add_argument('--depth', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument(
+        '--send-budget',
+        type=int,
+        default=128,
+        help='байт ответов за итерацию цикла сервера в режиме --skew '
+        '(маленький, чтобы очередь ответов успевала копиться)',
+    )
+    add_impairment_args(parser)
+    args = parser.parse_args()
+
+    if args.skew:
+        budget: List[str] = ['--send-budget', str(args.send_budget)]
+        report_skew(
+            [
+                bench_skew(
+                    name,
+                    server_args,
+                    args.clients,
+                    args.depth,
+                    args.duration,
+                )
+                for name, server_args in (
+                    ('сразу', []),
+                    ('fifo', ['--schedule', 'fifo', *budget]),
+                    ('drr', ['--schedule', 'drr', *budget]),
+                )
+            ]
+        )
+        sys.exit()
+    if any(args.reset_rate):
+        parser.error('--reset-rate: клиенты бенчмарка не переподключаются')
+
+    impair: List[str] = impairment_argv(args)
+    tcp_proxy: Optional[List[str]] = None
+    unix_proxy: Optional[List[str]] = None
+    if impair:
+        tcp_proxy = [
+            '--listen-port',
+            str(PROXY_PORT),
+            '--target-port',
+            '8888',
+            *impair,
+        ]
+        # Прокси слушает Unix-сокет, чтобы столбец unix не был на деле
+        # TCP до прокси плюс Unix до сервера
+        unix_proxy = [
+            '--listen-unix',
+            PROXY_UNIX_PATH,
+            '--target-unix',
+            UNIX_PATH,
+            *impair,
+        ]
+
+    results: List[Dict[str, float]] = [
+        bench_mode(
+            'tcp',
+            [],
+            tcp_connector,
+            args.clients,
+            args.requests,
+            proxy_args=tcp_proxy,
+        ),
+        bench_mode(
+            'tcp-bin',
+            [],
+            tcp_connector,
+            args.clients,
+            args.requests,
+            binary=True,
+            proxy_args=tcp_proxy,
+        ),
+        bench_mode(
+            'unix',
+            ['--unix', UNIX_PATH, '--no-tcp'],
+            unix_connector,
+            args.clients,
+            args.requests,
+            proxy_args=unix_proxy,
+            proxy_connect=proxy_unix_connector,
+        ),
+    ]
+    if not impair:
+        results.append(
+            bench_mode(
+                'udp',
+                ['--udp', '--no-tcp'],
+                udp_connector,
+                args.clients,
+                args.requests,
+                timeout=UDP_LOSS_TIMEOUT,
+            )
+        )
+    report(results)
@@ -49,11 +49,55 @@ TCP-клиент для отправки PING-запросов серверу.
 └─────────────────────────────────────────────────────┘
 """
 
+import argparse
 import asyncio
+import functools
 import random
 import datetime
-import sys
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+from clock_sync import (
+    CLOCK_REQUEST,
+    SYNC_INTERVAL,
+    ClockEstimator,
+    ClockSample,
+    clock_request,
+    now_us,
+    parse_clock,
+    write_record,
+)
+from datagram import open_datagram_connection, register
+from flow_control import MAX_WINDOW, TARGET_RTT, SendWindow
+from framing import (
+    FRAME_CLOCK_REPLY,
+    FRAME_KEEPALIVE,
+    FRAME_PONG,
+    HANDSHAKE,
+    HANDSHAKE_ACK,
+    encode_clock,
+    encode_ping,
+    read_frame,
+    render_frame,
+)
+from multiplex import (
+    BROADCAST,
+    MUX_HANDSHAKE,
+    MUX_HANDSHAKE_ACK,
+    ChannelWriter,
+    split_channel,
+)
+from tracing import RequestTrace, Tracer
+
+# Сколько ждать подтверждения бинарного режима от сервера, секунды
+HANDSHAKE_TIMEOUT: float = 5.0
+
+# Ответ, не пришедший за столько секунд после последней отправки запроса,
+# считается таймаутом
+RESPONSE_TIMEOUT: float = 5.0
+
+# Первые сверки часов идут чаще, чтобы оценка смещения была с начала лога
+CLOCK_WARMUP: int = 4
+CLOCK_WARMUP_INTERVAL: float = 0.2
 
 
 class SimpleClient:
@@ -68,18 +112,55 @@ class SimpleClient:
     5. Отслеживает таймауты неответивших запросов
     """
 
-    def __init__(self, client_num: int) -> None:
+    def __init__(
+        self,
+        client_num: int,
+        unix_path: Optional[str] = None,
+        binary: bool = False,
+        tracer: Optional[Tracer] = None,
+        window: Optional[SendWindow] = None,
+        retries: int = 0,
+        retry_after: float = RESPONSE_TIMEOUT,
+        clock_sync: Optional[float] = None,
+        udp: bool = False,
+    ) -> None:
         """
         Инициализирует клиента с заданным номером.
 
         Args:
             client_num: int - номер клиента (1, 2, ...), используется для именования лог-файлов
+            unix_path: Optional[str] - путь Unix-сокета сервера; если задан,
+                клиент подключается через него вместо TCP 127.0.0.1:8888
+            binary: bool - согласовать с сервером бинарные кадры (framing.py)
+            tracer: Optional[Tracer] - трассировка этапов запросов
+                (None - выключена)
+            window: Optional[SendWindow] - окно неотвеченных запросов
+                (None - отправлять по таймеру без ограничений)
+            retries: int - сколько раз повторить запрос без ответа
+                (0 - не повторять, как в спецификации)
+            retry_after: float - через сколько секунд без ответа повторять
+            clock_sync: Optional[float] - как часто сверять часы с сервером,
+                секунды (None - не сверять)
+            udp: bool - обмениваться датаграммами UDP вместо соединения
+                (datagram.py)
 
         Атрибуты:
             client_num: int - идентификатор клиента
+            unix_path: Optional[str] - путь Unix-сокета сервера
+            udp: bool - клиент UDP
+            binary: bool - обмен бинарными кадрами вместо строк
             request_num: int - счетчик отправленных запросов (начинается с 0)
             pending: Dict[int, datetime.datetime] - словарь ожидающих ответа запросов:
                 ключ: номер запроса, значение: время отправки
+            traces: Dict[int, RequestTrace] - трассы ожидающих запросов,
+                выбранных для трассировки
+            window: Optional[SendWindow] - окно неотвеченных запросов
+            attempts: Dict[int, Tuple[int, datetime.datetime]] - повторённые
+                запросы: число повторов и время последней отправки
+            retry_stats: Dict[str, int] - повторов отправлено и запросов,
+                получивших ответ после повтора
+            clock: Optional[ClockEstimator] - оценка смещения часов сервера,
+                пишется в client_N.clock
         """
         self.client_num: int = client_num  # Номер клиента для идентификации
         self.request_num: int = (
@@ -88,13 +169,31 @@ class SimpleClient:
         self.pending: Dict[int, datetime.datetime] = (
             {}
         )  # словарь ожидающих ответов: {0: время_отправки_0, 1: время_отправки_1}
+        self.unix_path: Optional[str] = unix_path
+        self.udp: bool = udp
+        self.binary: bool = binary
+        self.tracer: Optional[Tracer] = tracer
+        self.traces: Dict[int, RequestTrace] = {}
+        self.window: Optional[SendWindow] = window
+        self.retries: int = retries
+        self.retry_after: float = retry_after
+        self.attempts: Dict[int, Tuple[int, datetime.datetime]] = {}
+        self.retry_stats: Dict[str, int] = {'retransmits': 0, 'recovered': 0}
+        # Куда отправлять повторы (задаёт send_pings)
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.clock_sync: Optional[float] = clock_sync
+        self.clock: Optional[ClockEstimator] = (
+            ClockEstimator() if clock_sync else None
+        )
 
     async def start(self) -> None:
         """
         Основной метод запуска клиента.
 
         Последовательность действий:
-        1. Подключается к серверу 127.0.0.1:8888
+        1. Подключается к серверу 127.0.0.1:8888 (или к Unix-сокету,
+           или регистрируется по UDP) и при необходимости согласует
+           бинарный режим
         2. Запускает задачу отправки PING сообщений (send_pings)
         3. Запускает задачу получения ответов (receive_responses)
         4. Работает 5 минут (300 секунд)
@@ -110,13 +209,32 @@ class SimpleClient:
             writer: (
                 asyncio.StreamWriter
             )  # просто создали две переменных, да так можно
-            reader, writer = await asyncio.open_connection('127.0.0.1', 8888)
+            if self.udp:
+                # Соединения нет: сервер запомнит адрес после регистрации
+                reader, writer = await open_datagram_connection()
+                if not await register(reader, writer, HANDSHAKE_TIMEOUT):
+                    writer.close()
+                    raise ConnectionRefusedError
+            elif self.unix_path:
+                # Сервер на той же машине: без TCP-стека и loopback
+                reader, writer = await asyncio.open_unix_connection(
+                    self.unix_path
+                )
+            else:
+                reader, writer = await asyncio.open_connection(
+                    '127.0.0.1', 8888
+                )
             print(f"Клиент {self.client_num} подключился")
-        except (ConnectionRefusedError, ConnectionError):
+        except (ConnectionRefusedError, ConnectionError, FileNotFoundError):
             print(f"Клиент {self.client_num}: не могу подключиться к серверу")
             print("Убедитесь, что сервер запущен: python server.py")
             return  # Ранний выход (early return)
 
+        if self.binary and not await self.negotiate_binary(reader, writer):
+            print(f"Клиент {self.client_num}: сервер не принял бинарный режим")
+            writer.close()
+            return
+
         # Запускаем асинхронные задачи
         send_task: asyncio.Task[None] = asyncio.create_task(
             self.send_pings(writer)
@@ -124,6 +242,9 @@ class SimpleClient:
         recv_task: asyncio.Task[None] = asyncio.create_task(
             self.receive_responses(reader)
         )
+        clock_task: Optional[asyncio.Task[None]] = None
+        if self.clock_sync:
+            clock_task = asyncio.create_task(self.sync_clock(writer))
 
         # Ждем 5 минут (300 секунд) работы клиента
         await asyncio.sleep(300)
@@ -131,8 +252,44 @@ class SimpleClient:
         # Корректная остановка задач и закрытие соединения
         send_task.cancel()
         recv_task.cancel()
+        if clock_task:
+            clock_task.cancel()
         writer.close()
 
+    async def negotiate_binary(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        """
+        Согласует с сервером бинарный формат кадров.
+
+        До подтверждения сервер ещё говорит строками, поэтому пришедший
+        в это время keepalive обрабатывается как обычно.
+
+        Args:
+            reader: asyncio.StreamReader - поток для чтения данных от сервера
+            writer: asyncio.StreamWriter - поток для отправки данных серверу
+
+        Returns:
+            bool - True, если сервер подтвердил бинарный режим
+        """
+        writer.write(HANDSHAKE)
+        await writer.drain()
+        try:
+            while True:
+                data: bytes = await asyncio.wait_for(
+                    reader.readline(), HANDSHAKE_TIMEOUT
+                )
+                if data == HANDSHAKE_ACK:
+                    return True
+                if b'keepalive' not in data:
+                    return False
+                self.log_keepalive(
+                    data.decode(encoding="utf-8").strip(),
+                    datetime.datetime.now(),
+                )
+        except asyncio.TimeoutError:
+            return False
+
     async def send_pings(self, writer: asyncio.StreamWriter) -> None:
         """
         Отправляет PING сообщения серверу со случайными интервалами.
@@ -154,9 +311,14 @@ class SimpleClient:
             "[2] PING\\n"
             ...
         """
+        self.writer = writer
         while True:
             # Случайная задержка между сообщениями: 300-3000 мс
             await asyncio.sleep(random.uniform(0.3, 3.0))
+            if self.window:
+                # Окно заполнено - ждём ответа или таймаута, а не копим
+                # очередь на медленном сервере
+                await self.window.acquire()
 
             # Формируем сообщение с переводом строки в конце \n это бай 0x0A в ASCII таблице
             message: str = f"[{self.request_num}] PING\n"
@@ -164,16 +326,75 @@ class SimpleClient:
 
             # Сохраняем время отправки для последующего сопоставления с ответом
             self.pending[self.request_num] = send_time
+            trace: Optional[RequestTrace] = None
+            if self.tracer:
+                trace = self.tracer.start(
+                    f"клиент {self.client_num} [{self.request_num}] PING",
+                    client_num=self.client_num,
+                    req_num=self.request_num,
+                )
 
             # Отправка сообщения серверу
-            writer.write(message.encode(encoding="utf-8"))
+            if self.binary:
+                writer.write(encode_ping(self.request_num))
+            else:
+                writer.write(message.encode(encoding="utf-8"))
             await writer.drain()
+            if trace:
+                # Запись в сокет и ожидание места в буфере отправки
+                trace.stage('send')
 
             # Логирование отправленного сообщения
             self.log_send(message.strip(), send_time)
+            if trace:
+                trace.stage('log_send')
+                self.traces[self.request_num] = trace
 
             self.request_num += 1
 
+    async def sync_clock(self, writer: asyncio.StreamWriter) -> None:
+        """
+        Периодически отправляет серверу метку времени для сверки часов
+        ("TIME t1\\n" или кадр FRAME_CLOCK). Ответ разбирает
+        handle_clock().
+
+        Args:
+            writer: asyncio.StreamWriter - поток для отправки данных серверу
+        """
+        assert self.clock_sync is not None
+        sent: int = 0
+        while True:
+            t1: int = now_us()
+            if self.binary:
+                writer.write(encode_clock(t1))
+            else:
+                writer.write(f"{clock_request(t1)}\n".encode(encoding="utf-8"))
+            await writer.drain()
+            sent += 1
+            await asyncio.sleep(
+                CLOCK_WARMUP_INTERVAL
+                if sent < CLOCK_WARMUP
+                else self.clock_sync
+            )
+
+    def handle_clock(self, t1: int, t2: int, t3: int, t4: int) -> None:
+        """
+        Учитывает ответ сервера с метками и дописывает в client_N.clock
+        оценку смещения, если она изменилась.
+
+        Args:
+            t1, t2, t3: int - отправка запроса, его получение и отправка
+                ответа сервером, мкс
+            t4: int - получение ответа, мкс
+        """
+        if not self.clock:
+            return
+        previous: Optional[ClockSample] = self.clock.best
+        if self.clock.add(t1, t2, t3, t4) is not previous:
+            write_record(
+                f'client_{self.client_num}.clock', self.clock.record()
+            )
+
     async def receive_responses(self, reader: asyncio.StreamReader) -> None:
         """
         Получает и обрабатывает ответы от сервера.
@@ -192,6 +413,10 @@ class SimpleClient:
             PONG: "[0/0] PONG (1)\\n" - ответ на конкретный запрос
             keepalive: "[5] keepalive\\n" - периодическое сообщение от сервера
         """
+        if self.binary:
+            await self.receive_frames(reader)
+            return
+
         while True:
             data: bytes = await reader.readline()
             if not data:  # Сервер закрыл соединение
@@ -199,31 +424,165 @@ class SimpleClient:
                 break
 
             response: str = data.decode(encoding="utf-8").strip()
+            self.handle_line(response, datetime.datetime.now())
+
+    def handle_line(self, response: str, recv_time: datetime.datetime) -> None:
+        """
+        Обрабатывает одну текстовую строку сервера (PONG или keepalive).
+
+        Args:
+            response: str - строка без "\\n"
+            recv_time: datetime.datetime - время получения строки
+        """
+        if response.startswith(CLOCK_REQUEST):
+            # Ответ на сверку часов: "TIME t1 t2 t3"
+            try:
+                stamps = parse_clock(response)
+            except ValueError:
+                return
+            if len(stamps) == 3:
+                self.handle_clock(
+                    *stamps, int(recv_time.timestamp() * 1_000_000)
+                )
+        elif 'keepalive' in response:
+            # Keepalive сообщение (периодическая проверка от сервера)
+            self.log_keepalive(response, recv_time)
+        elif 'PONG' in response:
+            # Ответ на PING запрос
+            try:
+                # Извлекаем номер запроса из ответа
+                # Формат: "[номер_ответа/номер_запроса] PONG (ID_клиента)"
+                req_num: int = int(response.split('/')[1].split(']')[0])
+                self.handle_pong(req_num, response, recv_time)
+            except (ValueError, IndexError):
+                # Некорректный формат ответа - игнорируем
+                pass
+
+    async def receive_frames(self, reader: asyncio.StreamReader) -> None:
+        """
+        Получает ответы сервера в бинарном режиме.
+
+        Номера приходят готовыми числами, текст спецификации собирается
+        только для лога.
+
+        Args:
+            reader: asyncio.StreamReader - поток для чтения данных от сервера
+        """
+        while True:
+            frame = await read_frame(reader)
+            if frame is None:  # Сервер закрыл соединение
+                print(f"Клиент {self.client_num}: сервер закрыл соединение")
+                break
+
+            frame_type, fields = frame
+            if frame_type == FRAME_CLOCK_REPLY:
+                self.handle_clock(*fields, now_us())
+                continue
             recv_time: datetime.datetime = datetime.datetime.now()
+            response: str = render_frame(frame_type, fields)
 
-            if 'keepalive' in response:
-                # Keepalive сообщение (периодическая проверка от сервера)
+            if frame_type == FRAME_KEEPALIVE:
                 self.log_keepalive(response, recv_time)
-            elif 'PONG' in response:
-                # Ответ на PING запрос
-                try:
-                    # Извлекаем номер запроса из ответа
-                    # Формат: "[номер_ответа/номер_запроса] PONG (ID_клиента)"
-                    req_num: int = int(response.split('/')[1].split(']')[0])
-
-                    if req_num in self.pending:
-                        send_time: datetime.datetime = self.pending[req_num]
-                        self.log_response(
-                            message=f"[{req_num}] PING",
-                            send_time=send_time,
-                            response=response,
-                            recv_time=recv_time,
-                        )
-                        # Удаляем запрос из ожидающих, так как получили ответ
-                        del self.pending[req_num]
-                except (ValueError, IndexError):
-                    # Некорректный формат ответа - игнорируем
-                    pass
+            elif frame_type == FRAME_PONG:
+                self.handle_pong(fields[1], response, recv_time)
+
+    def handle_pong(
+        self, req_num: int, response: str, recv_time: datetime.datetime
+    ) -> None:
+        """
+        Сопоставляет PONG с ожидающим запросом и логирует ответ.
+
+        Args:
+            req_num: int - номер запроса, на который пришёл ответ
+            response: str - текст ответа (например, "[0/0] PONG (1)")
+            recv_time: datetime.datetime - время получения ответа
+        """
+        if req_num in self.pending:
+            send_time: datetime.datetime = self.pending[req_num]
+            trace: Optional[RequestTrace] = self.traces.pop(req_num, None)
+            if trace:
+                # Сервер, сеть и разбор ответа
+                trace.stage('wait')
+            self.log_response(
+                message=f"[{req_num}] PING",
+                send_time=send_time,
+                response=response,
+                recv_time=recv_time,
+            )
+            if trace:
+                trace.stage('log_response')
+            # Удаляем запрос из ожидающих, так как получили ответ
+            del self.pending[req_num]
+            if self.attempts.pop(req_num, None):
+                self.retry_stats['recovered'] += 1
+            if self.window:
+                self.window.release((recv_time - send_time).total_seconds())
+
+    def last_attempt(
+        self, req_num: int, send_time: datetime.datetime
+    ) -> datetime.datetime:
+        """Время последней отправки запроса (исходной или повтора)."""
+        attempt: Optional[Tuple[int, datetime.datetime]] = self.attempts.get(
+            req_num
+        )
+        return attempt[1] if attempt else send_time
+
+    def retransmit(
+        self,
+        req_num: int,
+        send_time: datetime.datetime,
+        now: datetime.datetime,
+    ) -> bool:
+        """
+        Повторяет запрос, если ответа нет дольше retry_after и повторы
+        не исчерпаны.
+
+        Сервер с кэшем ответов (server.py --response-cache) ответит на
+        повтор исходным ответом, без новой обработки. В лог повтор идёт
+        отдельной строкой (см. log_retransmit), чтобы разбор лога не счёл
+        его новым запросом.
+
+        Args:
+            req_num: int - номер запроса
+            send_time: datetime.datetime - время исходной отправки
+            now: datetime.datetime - текущее время
+
+        Returns:
+            bool - True, если запрос отправлен ещё раз
+        """
+        count, last = self.attempts.get(req_num, (0, send_time))
+        if (
+            count >= self.retries
+            or self.writer is None
+            or (now - last).total_seconds() <= self.retry_after
+        ):
+            return False
+        if self.binary:
+            self.writer.write(encode_ping(req_num))
+        else:
+            self.writer.write(f"[{req_num}] PING\n".encode(encoding="utf-8"))
+        self.attempts[req_num] = (count + 1, now)
+        self.retry_stats['retransmits'] += 1
+        self.log_retransmit(f"[{req_num}] PING", now)
+        return True
+
+    def log_retransmit(
+        self, message: str, send_time: datetime.datetime
+    ) -> None:
+        """
+        Логирует повторную отправку запроса в CSV формате.
+
+        Формат записи (четыре поля, в отличие от исходной отправки):
+            ГГГГ-ММ-ДД;ЧЧ:ММ:СС.ммм;сообщение;(повтор)
+
+        Пример:
+            2024-01-15;14:30:26.623;[0] PING;(повтор)
+
+        Args:
+            message: str - текст повторённого сообщения
+            send_time: datetime.datetime - время повторной отправки
+        """
+        self.log_send(f"{message};(повтор)", send_time)
 
     def log_send(self, message: str, send_time: datetime.datetime) -> None:
         """
@@ -316,15 +675,21 @@ async def check_timeouts(client: SimpleClient, client_num: int) -> None:
         pending_items = list(client.pending.items())
 
         for req_num, send_time in pending_items:
-            # Если с момента отправки прошло больше 5 секунд
-            if (now - send_time).total_seconds() > 5:
+            if client.retries and client.retransmit(req_num, send_time, now):
+                continue  # Отправили повтор - ждём ответа дальше
+
+            # Если с момента (последней) отправки прошло больше 5 секунд
+            last_time: datetime.datetime = client.last_attempt(
+                req_num, send_time
+            )
+            if (now - last_time).total_seconds() > RESPONSE_TIMEOUT:
                 # Логируем таймаут
                 date_str: str = datetime.datetime.now().strftime('%Y-%m-%d')
                 send_str: str = send_time.strftime('%H:%M:%S.%f')[:-3]
 
-                # Время таймаута = время отправки + 5 секунд
+                # Время таймаута = время (последней) отправки + 5 секунд
                 timeout_time: datetime.datetime = (
-                    send_time + datetime.timedelta(seconds=5)
+                    last_time + datetime.timedelta(seconds=RESPONSE_TIMEOUT)
                 )
                 timeout_str: str = timeout_time.strftime('%H:%M:%S.%f')[:-3]
 
@@ -337,14 +702,188 @@ async def check_timeouts(client: SimpleClient, client_num: int) -> None:
 
                 # Удаляем запрос из ожидающих
                 del client.pending[req_num]
+                client.attempts.pop(req_num, None)
+                trace: Optional[RequestTrace] = client.traces.pop(
+                    req_num, None
+                )
+                if trace:
+                    trace.stage('timeout')
+                if client.window:
+                    client.window.release(None)
+
+
+async def receive_multiplexed(
+    reader: asyncio.StreamReader, clients: Dict[str, SimpleClient]
+) -> None:
+    """
+    Разбирает строки общего соединения по логическим клиентам.
+
+    Args:
+        reader: asyncio.StreamReader - общее соединение с сервером
+        clients: Dict[str, SimpleClient] - номер канала (строкой) -> клиент
+    """
+    while True:
+        data: bytes = await reader.readline()
+        if not data:  # Сервер закрыл соединение
+            print("Мультиплексированное соединение закрыто сервером")
+            break
 
+        recv_time: datetime.datetime = datetime.datetime.now()
+        try:
+            channel, response = split_channel(
+                data.decode(encoding="utf-8").strip()
+            )
+        except ValueError:
+            continue  # Некорректная строка - игнорируем
+        if channel == BROADCAST:
+            # keepalive приходит один раз на соединение, а в лог -
+            # каждому клиенту, как при отдельных соединениях
+            for client in clients.values():
+                client.handle_line(response, recv_time)
+        elif channel in clients:
+            clients[channel].handle_line(response, recv_time)
+
+
+async def main_multiplexed(
+    first_num: int,
+    count: int,
+    unix_path: Optional[str] = None,
+    tracer: Optional[Tracer] = None,
+    window: Optional[Callable[[], SendWindow]] = None,
+    retries: int = 0,
+    retry_after: float = RESPONSE_TIMEOUT,
+    clock_sync: Optional[float] = None,
+) -> None:
+    """
+    Запускает count логических клиентов в одном соединении.
 
-async def main(client_num: int) -> None:
+    Клиенты получают номера first_num, first_num + 1, ... и пишут каждый
+    свой client_N.log; номер клиента служит и номером канала.
+
+    Args:
+        first_num: int - номер первого клиента
+        count: int - число клиентов в соединении
+        unix_path: Optional[str] - путь Unix-сокета сервера (None - TCP)
+        tracer: Optional[Tracer] - общая трассировка всех клиентов
+        window: Optional[Callable[[], SendWindow]] - создаёт окно
+            неотвеченных запросов, своё каждому клиенту
+        retries: int - повторов запроса без ответа
+        retry_after: float - через сколько секунд без ответа повторять
+        clock_sync: Optional[float] - как часто каждый клиент сверяет часы,
+            секунды (None - не сверять)
+    """
+    try:
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection('127.0.0.1', 8888)
+    except (ConnectionRefusedError, ConnectionError, FileNotFoundError):
+        print("Не могу подключиться к серверу")
+        print("Убедитесь, что сервер запущен: python server.py")
+        return
+
+    writer.write(MUX_HANDSHAKE)
+    await writer.drain()
+    try:
+        while True:
+            data: bytes = await asyncio.wait_for(
+                reader.readline(), HANDSHAKE_TIMEOUT
+            )
+            if data == MUX_HANDSHAKE_ACK:
+                break
+            if b'keepalive' not in data:
+                raise asyncio.TimeoutError
+    except asyncio.TimeoutError:
+        print("Сервер не принял мультиплексный режим")
+        writer.close()
+        return
+    print(f"Клиенты {first_num}-{first_num + count - 1} подключились")
+
+    clients: Dict[str, SimpleClient] = {
+        str(num): SimpleClient(
+            num,
+            tracer=tracer,
+            window=window() if window else None,
+            retries=retries,
+            retry_after=retry_after,
+            clock_sync=clock_sync,
+        )
+        for num in range(first_num, first_num + count)
+    }
+    tasks: List[asyncio.Task[None]] = [
+        asyncio.create_task(receive_multiplexed(reader, clients))
+    ]
+    for num, client in clients.items():
+        tasks.append(
+            asyncio.create_task(
+                client.send_pings(ChannelWriter(writer, int(num)))
+            )
+        )
+        tasks.append(
+            asyncio.create_task(check_timeouts(client, client.client_num))
+        )
+        if clock_sync:
+            tasks.append(
+                asyncio.create_task(
+                    client.sync_clock(ChannelWriter(writer, int(num)))
+                )
+            )
+
+    # Ждем 5 минут (300 секунд) работы клиентов
+    try:
+        await asyncio.sleep(300)
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+        if window:
+            windows: List[SendWindow] = [
+                client.window for client in clients.values() if client.window
+            ]
+            print(
+                f"Окна {len(windows)} клиентов: отправок "
+                f"{sum(w.stats['sends'] for w in windows):.0f}, ждали окна "
+                f"{sum(w.stats['blocked_sends'] for w in windows):.0f} "
+                f"({sum(w.stats['blocked_time'] for w in windows):.1f} с)"
+            )
+        if retries:
+            totals: Dict[str, int] = {
+                key: sum(c.retry_stats[key] for c in clients.values())
+                for key in ('retransmits', 'recovered')
+            }
+            print(
+                f"Повторы {count} клиентов: отправлено "
+                f"{totals['retransmits']}, получили ответ после повтора "
+                f"{totals['recovered']}"
+            )
+
+
+async def main(
+    client_num: int,
+    unix_path: Optional[str] = None,
+    binary: bool = False,
+    tracer: Optional[Tracer] = None,
+    window: Optional[Callable[[], SendWindow]] = None,
+    retries: int = 0,
+    retry_after: float = RESPONSE_TIMEOUT,
+    clock_sync: Optional[float] = None,
+    udp: bool = False,
+) -> None:
     """
     Основная асинхронная функция запуска клиента.
 
     Args:
         client_num: int - номер клиента, передается из аргументов командной строки
+        unix_path: Optional[str] - путь Unix-сокета сервера (None - TCP)
+        binary: bool - согласовать бинарный формат кадров
+        tracer: Optional[Tracer] - трассировка этапов запросов
+        window: Optional[Callable[[], SendWindow]] - создаёт окно
+            неотвеченных запросов (None - без окна)
+        retries: int - повторов запроса без ответа (0 - не повторять)
+        retry_after: float - через сколько секунд без ответа повторять
+        clock_sync: Optional[float] - как часто сверять часы с сервером,
+            секунды (None - не сверять)
+        udp: bool - датаграммы UDP вместо соединения
 
     Процесс:
         1. Создает экземпляр SimpleClient
@@ -352,7 +891,17 @@ async def main(client_num: int) -> None:
         3. Запускает основную логику клиента
         4. Корректно останавливает задачу проверки таймаутов
     """
-    client: SimpleClient = SimpleClient(client_num)
+    client: SimpleClient = SimpleClient(
+        client_num,
+        unix_path,
+        binary,
+        tracer,
+        window() if window else None,
+        retries,
+        retry_after,
+        clock_sync,
+        udp,
+    )
     timeout_task = None
     try:
         # Запускаем проверку таймаутов в фоне
@@ -367,6 +916,14 @@ async def main(client_num: int) -> None:
         # Останавливаем проверку таймаутов
         if timeout_task:
             timeout_task.cancel()
+        if client.window:
+            print(f"Клиент {client_num}: {client.window.summary()}")
+        if retries:
+            print(
+                f"Клиент {client_num}: повторов отправлено "
+                f"{client.retry_stats['retransmits']}, получили ответ после "
+                f"повтора {client.retry_stats['recovered']}"
+            )
 
 
 if __name__ == "__main__":
@@ -381,15 +938,144 @@ if __name__ == "__main__":
     Использование:
         python client.py 1  # Запуск клиента №1
         python client.py 2  # Запуск клиента №2
+        python client.py 1 --unix /tmp/pingpong.sock  # через Unix-сокет
+        python client.py 1 --binary  # бинарные кадры вместо строк
+        python client.py 1 --mux 1000  # клиенты 1-1000 в одном соединении
+        python client.py 1 --trace client_1.trace.json  # трассы запросов
+        python client.py 1 --window 4  # не больше 4 запросов без ответа
+        python client.py 1 --aimd  # окно по RTT (AIMD)
+        python client.py 1 --retries 2 --retry-after 1.5  # повторы запросов
+        python client.py 1 --clock-sync 5  # сверка часов -> client_1.clock
+        python client.py 1 --udp  # датаграммы UDP (сервер с --udp)
     """
-    # Получаем номер клиента из аргументов командной строки
-    if len(sys.argv) > 1:
-        client_num: int = int(sys.argv[1])
-    else:
-        client_num: int = 1  # Значение по умолчанию - клиент №1
-
-    # Очищаем лог-файл при каждом запуске
-    open(f'client_{client_num}.log', 'w').close()
+    parser = argparse.ArgumentParser(description='PING/PONG клиент')
+    # Номер клиента из аргументов командной строки (по умолчанию - клиент №1)
+    parser.add_argument('client_num', type=int, nargs='?', default=1)
+    parser.add_argument(
+        '--unix', metavar='PATH', help='подключаться через Unix-сокет'
+    )
+    parser.add_argument(
+        '--udp',
+        action='store_true',
+        help='датаграммы UDP вместо соединения (сервер с --udp)',
+    )
+    parser.add_argument(
+        '--binary',
+        action='store_true',
+        help='согласовать бинарный формат кадров',
+    )
+    parser.add_argument(
+        '--mux',
+        type=int,
+        metavar='N',
+        help='N клиентов с номерами от client_num в одном соединении',
+    )
+    parser.add_argument(
+        '--trace',
+        metavar='PATH',
+        help='записать трассы запросов (Chrome trace JSON) по завершении',
+    )
+    parser.add_argument(
+        '--trace-sample',
+        type=float,
+        default=1.0,
+        help='доля трассируемых запросов',
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        metavar='N',
+        help='не больше N запросов без ответа (с --aimd - потолок окна)',
+    )
+    parser.add_argument(
+        '--aimd',
+        action='store_true',
+        help='подстраивать окно по RTT: +1 за окно, пополам при замедлении',
+    )
+    parser.add_argument(
+        '--target-rtt',
+        type=float,
+        default=TARGET_RTT,
+        help='RTT, выше которого --aimd уменьшает окно, секунды',
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=0,
+        help='сколько раз повторить запрос, оставшийся без ответа',
+    )
+    parser.add_argument(
+        '--retry-after',
+        type=float,
+        default=RESPONSE_TIMEOUT,
+        help='через сколько секунд без ответа повторять запрос',
+    )
+    parser.add_argument(
+        '--clock-sync',
+        type=float,
+        nargs='?',
+        const=SYNC_INTERVAL,
+        metavar='SECONDS',
+        help='сверять часы с сервером каждые SECONDS секунд '
+        f'(по умолчанию {SYNC_INTERVAL:g}) и писать client_N.clock',
+    )
+    args = parser.parse_args()
+    client_num: int = args.client_num
+    if args.mux and args.binary:
+        parser.error('--mux работает только с текстовыми строками')
+    if args.udp and (args.mux or args.binary or args.unix):
+        parser.error('--udp несовместим с --mux, --binary и --unix')
+
+    # Очищаем лог-файлы при каждом запуске
+    for num in range(client_num, client_num + (args.mux or 1)):
+        open(f'client_{num}.log', 'w').close()
+        if args.clock_sync:
+            open(f'client_{num}.clock', 'w').close()
+
+    tracer: Optional[Tracer] = (
+        Tracer(args.trace_sample, f'client {client_num}')
+        if args.trace
+        else None
+    )
+    window: Optional[Callable[[], SendWindow]] = None
+    if args.window or args.aimd:
+        window = functools.partial(
+            SendWindow,
+            args.window or MAX_WINDOW,
+            args.aimd,
+            args.target_rtt,
+        )
 
-    # Запускаем асинхронный цикл с клиентом
-    asyncio.run(main(client_num))
+    # Запускаем асинхронный цикл с клиентом (или с клиентами)
+    try:
+        if args.mux:
+            asyncio.run(
+                main_multiplexed(
+                    client_num,
+                    args.mux,
+                    args.unix,
+                    tracer,
+                    window,
+                    args.retries,
+                    args.retry_after,
+                    args.clock_sync,
+                )
+            )
+        else:
+            asyncio.run(
+                main(
+                    client_num,
+                    args.unix,
+                    args.binary,
+                    tracer,
+                    window,
+                    args.retries,
+                    args.retry_after,
+                    args.clock_sync,
+                    args.udp,
+                )
+            )
+    finally:
+        # Трассы пишутся и при остановке по Ctrl+C
+        if tracer:
+            tracer.write(args.trace)
@@ -0,0 +1,205 @@
+"""
+Оценка расхождения часов клиента и сервера (как в NTP).
+
+Логи клиента и сервера пишутся по часам своих процессов, поэтому честно
+измерим только полный RTT. Чтобы разделить его на путь запроса и путь
+ответа, клиент периодически обменивается с сервером метками времени
+по тому же соединению:
+
+    КЛИЕНТ -> СЕРВЕР: "TIME t1\\n"
+    СЕРВЕР -> КЛИЕНТ: "TIME t1 t2 t3\\n"
+
+t1 - отправка по часам клиента, t2 - получение и t3 - ответ по часам
+сервера, t4 - получение ответа по часам клиента (все - unix time, мкс).
+Тогда
+
+    смещение = ((t2 - t1) + (t3 - t4)) / 2    (часы сервера минус клиента)
+    задержка = (t4 - t1) - (t3 - t2)          (сеть туда и обратно)
+
+Смещение точно, если пути туда и обратно одинаковы, и тем точнее, чем
+меньше задержка: из последних FILTER_SIZE замеров берётся замер
+с наименьшей задержкой. Дрейф часов (skew) - наклон прямой по смещениям
+выбранных замеров во времени, в миллионных долях (ppm); пока замеры
+охватывают меньше MIN_SKEW_SPAN секунд, дрейф считается нулевым.
+
+Оценки клиент дописывает в client_N.clock, по ним one_way.py раскладывает
+RTT из логов на путь запроса, работу сервера и путь ответа.
+"""
+
+import bisect
+import os
+import time
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+CLOCK_REQUEST: str = 'TIME'
+
+FILTER_SIZE: int = 8  # замеров, из которых берётся лучший
+HISTORY_SIZE: int = 64  # выбранных замеров для оценки дрейфа
+# По замерам за меньший промежуток дрейф тонет в шуме задержки, секунды
+MIN_SKEW_SPAN: float = 30.0
+
+# Как часто клиент сверяет часы по умолчанию, секунды
+SYNC_INTERVAL: float = 10.0
+
+
+class ClockSample(NamedTuple):
+    """Один обмен метками: когда (часы клиента), смещение и задержка, мкс."""
+
+    local: float
+    offset: float
+    delay: float
+
+
+class ClockRecord(NamedTuple):
+    """Строка client_N.clock: оценка на момент local (unix time, с)."""
+
+    local: float
+    offset: float  # мкс
+    delay: float  # мкс
+    skew: float  # ppm
+
+
+def now_us() -> int:
+    """Часы процесса (unix time) в микросекундах."""
+    return time.time_ns() // 1000
+
+
+def clock_request(t1: int) -> str:
+    """Строка запроса меток без "\\n"."""
+    return f"{CLOCK_REQUEST} {t1}"
+
+
+def clock_reply(t1: int, t2: int, t3: int) -> str:
+    """Строка ответа с метками сервера без "\\n"."""
+    return f"{CLOCK_REQUEST} {t1} {t2} {t3}"
+
+
+def parse_clock(message: str) -> Tuple[int, ...]:
+    """
+    Метки из строки "TIME t1 [t2 t3]".
+
+    Исключения:
+        ValueError: строка не является обменом метками
+    """
+    name, *stamps = message.split()
+    if name != CLOCK_REQUEST or len(stamps) not in (1, 3):
+        raise ValueError(f'Не обмен метками: {message!r}')
+    return tuple(int(stamp) for stamp in stamps)
+
+
+class ClockEstimator:
+    """
+    Оценка смещения и дрейфа часов сервера относительно клиента.
+
+    Атрибуты:
+        samples: Deque[ClockSample] - последние замеры
+        history: Deque[ClockSample] - выбранные замеры для дрейфа
+        best: Optional[ClockSample] - текущая оценка смещения
+        skew: float - дрейф, ppm
+    """
+
+    def __init__(self) -> None:
+        self.samples: Deque[ClockSample] = deque(maxlen=FILTER_SIZE)
+        self.history: Deque[ClockSample] = deque(maxlen=HISTORY_SIZE)
+        self.best: Optional[ClockSample] = None
+        self.skew: float = 0.0
+
+    def add(self, t1: int, t2: int, t3: int, t4: int) -> ClockSample:
+        """
+        Учитывает один обмен метками.
+
+        Args:
+            t1, t2, t3, t4: int - отправка и получение запроса, отправка и
+                получение ответа, мкс
+
+        Returns:
+            ClockSample - выбранный замер (с наименьшей задержкой
+                из последних FILTER_SIZE)
+        """
+        self.samples.append(
+            ClockSample(
+                t1 / 1e6,
+                ((t2 - t1) + (t3 - t4)) / 2,
+                (t4 - t1) - (t3 - t2),
+            )
+        )
+        best: ClockSample = min(self.samples, key=lambda s: s.delay)
+        if best is not self.best:
+            self.best = best
+            self.history.append(best)
+            self.skew = self.fit_skew()
+        return best
+
+    def fit_skew(self) -> float:
+        """Наклон смещения во времени (наименьшие квадраты), ppm."""
+        if self.history[-1].local - self.history[0].local < MIN_SKEW_SPAN:
+            return 0.0
+        n: int = len(self.history)
+        mean_t: float = sum(s.local for s in self.history) / n
+        mean_o: float = sum(s.offset for s in self.history) / n
+        var: float = sum((s.local - mean_t) ** 2 for s in self.history)
+        if not var:
+            return 0.0
+        cov: float = sum(
+            (s.local - mean_t) * (s.offset - mean_o) for s in self.history
+        )
+        # мкс смещения на секунду = миллионные доли
+        return cov / var
+
+    def record(self) -> ClockRecord:
+        """Текущая оценка для client_N.clock (на момент лучшего замера)."""
+        assert self.best is not None
+        return ClockRecord(
+            self.best.local, self.best.offset, self.best.delay, self.skew
+        )
+
+
+def write_record(path: str, record: ClockRecord) -> None:
+    """Дописывает оценку строкой "local;offset;delay;skew"."""
+    with open(path, 'a', encoding='UTF-8') as f:
+        f.write(
+            f"{record.local:.6f};{record.offset:.1f};"
+            f"{record.delay:.1f};{record.skew:.3f}\n"
+        )
+
+
+def load_records(path: str) -> List[ClockRecord]:
+    """Оценки из client_N.clock (пустой список, если файла нет)."""
+    records: List[ClockRecord] = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding='UTF-8') as f:
+        for line in f:
+            try:
+                records.append(
+                    ClockRecord(*map(float, line.strip().split(';')))
+                )
+            except (TypeError, ValueError):
+                continue  # Оборванная строка
+    # Лучший замер может оказаться старше предыдущей оценки
+    records.sort()
+    return records
+
+
+def offset_at(
+    records: List[ClockRecord], times: List[float], local: float
+) -> Optional[float]:
+    """
+    Смещение часов сервера (мкс) в момент local по часам клиента:
+    последняя оценка до этого момента, продолженная с её дрейфом
+    (до первой оценки - первая оценка).
+
+    Args:
+        records: List[ClockRecord] - оценки по возрастанию времени
+        times: List[float] - их моменты (records[i].local) для поиска
+        local: float - момент по часам клиента, unix time
+
+    Returns:
+        Optional[float] - смещение или None, если оценок нет
+    """
+    if not records:
+        return None
+    index: int = max(0, bisect.bisect_right(times, local) - 1)
+    chosen: ClockRecord = records[index]
+    return chosen.offset + chosen.skew * (local - chosen.local)
@@ -0,0 +1,202 @@
+"""
+PING/PONG поверх UDP (необязательный режим).
+
+Для частых коротких сообщений поток TCP с разбором строк избыточен:
+каждый PING и PONG и так помещается в одну датаграмму. В режиме UDP
+клиент сначала регистрируется, и дальше в обе стороны идут те же
+строки, что и по TCP:
+
+    КЛИЕНТ -> СЕРВЕР: "UDP/1\\n"             (регистрация)
+    СЕРВЕР -> КЛИЕНТ: "UDP/1 OK\\n"
+    КЛИЕНТ -> СЕРВЕР: "[0] PING\\n"
+    СЕРВЕР -> КЛИЕНТ: "[0/0] PONG (1)\\n"
+    СЕРВЕР -> КЛИЕНТ: "[5] keepalive\\n"
+
+Датаграмма содержит одну или несколько целых строк, поэтому клиент
+читает их тем же StreamReader.readline(), что и поток TCP.
+
+Соединения нет: сервер узнаёт клиента по адресу (хост, порт), с которого
+пришла регистрация, и забывает адрес, от которого PEER_TIMEOUT секунд
+не было датаграмм. Потери ничем не восполняются: потерянный PING или
+PONG клиент засчитывает таймаутом (или повторяет запрос с --retries).
+"""
+
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+REGISTER: bytes = b'UDP/1\n'
+REGISTER_ACK: bytes = b'UDP/1 OK\n'
+
+UDP_PORT: int = 8888
+
+# Клиент без датаграмм дольше этого забывается сервером, секунды
+# (клиент шлёт PING не реже раза в 3 с)
+PEER_TIMEOUT: float = 30.0
+
+# Как часто клиент повторяет регистрацию, пока нет подтверждения, секунды
+REGISTER_RETRY: float = 0.5
+
+# Наибольшая датаграмма, которую собирает отправитель, байт (предел UDP
+# по IPv4 - 65507)
+MAX_DATAGRAM: int = 60000
+
+Address = Tuple[str, int]
+
+
+def split_datagrams(data: bytes, limit: int = MAX_DATAGRAM) -> List[bytes]:
+    """
+    Делит склеенные строки на датаграммы не длиннее limit по границам
+    строк (строка длиннее limit уходит одна).
+
+    Args:
+        data: bytes - одна или несколько строк с "\\n"
+        limit: int - наибольший размер датаграммы, байт
+
+    Returns:
+        List[bytes] - датаграммы из целых строк
+    """
+    if len(data) <= limit:
+        return [data]
+    datagrams: List[bytes] = []
+    start: int = 0
+    while start < len(data):
+        end: int = data.rfind(b'\n', start, start + limit) + 1
+        if end <= start:
+            end = data.find(b'\n', start) + 1 or len(data)
+        datagrams.append(data[start:end])
+        start = end
+    return datagrams
+
+
+class DatagramWriter:
+    """
+    Отправка датаграмм одному адресу с интерфейсом StreamWriter.
+
+    Сервер пишет в UDP-клиента теми же send()/flush(), что и в поток, а
+    SimpleClient.send_pings() не отличает его от соединения.
+
+    Атрибуты:
+        transport: asyncio.DatagramTransport - сокет UDP
+        addr: Optional[Address] - адрес получателя (None - сокет клиента,
+            уже связанный с сервером)
+        on_close: Optional[Callable[[], None]] - вызывается при close()
+    """
+
+    def __init__(
+        self,
+        transport: asyncio.DatagramTransport,
+        addr: Optional[Address] = None,
+        on_close: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.transport: asyncio.DatagramTransport = transport
+        self.addr: Optional[Address] = addr
+        self.on_close: Optional[Callable[[], None]] = on_close
+        self.closed: bool = False
+
+    def write(self, data: bytes) -> None:
+        if self.closed:
+            return
+        for datagram in split_datagrams(data):
+            self.transport.sendto(datagram, self.addr)
+
+    async def drain(self) -> None:
+        # Буфера отправки, которого стоило бы ждать, у UDP нет
+        return
+
+    def is_closing(self) -> bool:
+        return self.closed or self.transport.is_closing()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.on_close:
+            self.on_close()
+        elif self.addr is None:
+            # Сокет клиента принадлежит только ему
+            self.transport.close()
+
+
+class DatagramServerProtocol(asyncio.DatagramProtocol):
+    """Передаёт датаграммы сокета сервера в Server.handle_datagram()."""
+
+    def __init__(self, handle: Callable[[bytes, Address], None]) -> None:
+        self.handle: Callable[[bytes, Address], None] = handle
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        self.handle(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        # Ошибки ICMP от ушедших клиентов: их адреса забудет PEER_TIMEOUT
+        pass
+
+
+class DatagramClientProtocol(asyncio.DatagramProtocol):
+    """Складывает датаграммы сервера в StreamReader клиента."""
+
+    def __init__(self, reader: asyncio.StreamReader) -> None:
+        self.reader: asyncio.StreamReader = reader
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        self.reader.feed_data(data)
+
+    def error_received(self, exc: Exception) -> None:
+        # Сервер не слушает порт (ICMP port unreachable): регистрация
+        # не подтвердится, а потерянные запросы станут таймаутами
+        pass
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.reader.feed_eof()
+
+
+async def open_datagram_connection(
+    host: str = '127.0.0.1', port: int = UDP_PORT
+) -> Tuple[asyncio.StreamReader, DatagramWriter]:
+    """
+    Открывает сокет UDP, связанный с сервером.
+
+    Args:
+        host: str - адрес сервера
+        port: int - порт сервера
+
+    Returns:
+        Tuple[asyncio.StreamReader, DatagramWriter] - строки от сервера
+            и отправка серверу, как у asyncio.open_connection()
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    reader: asyncio.StreamReader = asyncio.StreamReader()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: DatagramClientProtocol(reader), remote_addr=(host, port)
+    )
+    return reader, DatagramWriter(transport)
+
+
+async def register(
+    reader: asyncio.StreamReader, writer: DatagramWriter, timeout: float
+) -> bool:
+    """
+    Регистрируется на сервере, повторяя REGISTER каждые REGISTER_RETRY
+    секунд: и регистрация, и подтверждение могут потеряться.
+
+    Args:
+        reader: asyncio.StreamReader - строки от сервера
+        writer: DatagramWriter - отправка серверу
+        timeout: float - сколько всего ждать подтверждения, секунды
+
+    Returns:
+        bool - True, если сервер подтвердил регистрацию
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    deadline: float = loop.time() + timeout
+    while loop.time() < deadline:
+        writer.write(REGISTER)
+        try:
+            line: bytes = await asyncio.wait_for(
+                reader.readline(),
+                min(REGISTER_RETRY, deadline - loop.time()),
+            )
+        except asyncio.TimeoutError:
+            continue
+        if line == REGISTER_ACK:
+            return True
+    return False
@@ -0,0 +1,207 @@
+"""
+Бортовой самописец сервера: последние события в памяти.
+
+Подробный лог на каждое событие дорог, а без него после "except
+Exception" в handle_client() или падения процесса неизвестно, что
+происходило перед этим. Самописец включён всегда и пишет компактные
+записи в кольцевой буфер, выделенный заранее: массивы array фиксированного
+размера, запись - несколько присваиваний без форматирования и
+выделения памяти (строки деталей - ссылки на уже существующие объекты).
+
+Буфер сбрасывается в файл (дописывается, каждый сброс со своим
+заголовком):
+- по сигналу SIGUSR2 (kill -USR2 <pid>) - работа продолжается;
+- по SIGTERM - после сброса процесс завершается тем же сигналом;
+- при необработанном исключении (sys.excepthook и исключения задач
+  цикла событий);
+- при выходе, если с прошлого сброса были новые события.
+
+Строка файла: время;событие;клиент;значение;детали.
+"""
+
+import asyncio
+import atexit
+import datetime
+import os
+import signal
+import sys
+import time
+import traceback
+from array import array
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+RECORDER_SIZE: int = 65536  # событий в буфере
+
+# Виды событий (значение в массиве kinds)
+EV_CONNECT: int = 0  # клиент подключился
+EV_RECV: int = 1  # сообщение; значение - номер запроса или -1
+EV_DROP: int = 2  # запрос сброшен; детали - причина
+EV_SEND: int = 3  # запись в сокет; значение - байт
+EV_KEEPALIVE: int = 4  # keepalive; значение - номер ответа
+EV_ERROR: int = 5  # ошибка; детали - исключение и где оно возникло
+EV_CLOSE: int = 6  # соединение закрыто; детали - причина
+
+EVENT_NAMES: Tuple[str, ...] = (
+    'connect',
+    'recv',
+    'drop',
+    'send',
+    'keepalive',
+    'error',
+    'close',
+)
+
+# Клиент события, касающегося всех клиентов (keepalive, ошибка цикла)
+ALL_CLIENTS: int = -1
+
+
+def describe_error(exc: BaseException) -> str:
+    """Исключение и место, где оно возникло: "ValueError: ... (f:12)"."""
+    text: str = f"{type(exc).__name__}: {exc}"
+    frames = traceback.extract_tb(exc.__traceback__)
+    if frames:
+        text += f" ({frames[-1].name}:{frames[-1].lineno})"
+    return text
+
+
+class FlightRecorder:
+    """
+    Кольцевой буфер последних событий сервера.
+
+    Атрибуты:
+        size: int - сколько событий помнить
+        path: str - куда дописывать сбросы
+        times: array - время события (unix time)
+        kinds: array - вид события (EV_*)
+        clients: array - номер клиента
+        values: array - число события (номер запроса, байт, номер ответа)
+        details: List[Optional[str]] - строка события (сообщение, причина)
+        index: int - куда пойдёт следующее событие
+        total: int - событий записано за всё время
+        dumped_total: int - total на момент последнего сброса
+    """
+
+    def __init__(
+        self, size: int = RECORDER_SIZE, path: str = 'server.flight'
+    ) -> None:
+        """
+        Args:
+            size: int - сколько последних событий помнить
+            path: str - файл для сбросов
+        """
+        self.size: int = size
+        self.path: str = path
+        self.times: array = array('d', [0.0]) * size
+        self.kinds: array = array('B', [0]) * size
+        self.clients: array = array('q', [0]) * size
+        self.values: array = array('q', [0]) * size
+        self.details: List[Optional[str]] = [None] * size
+        self.index: int = 0
+        self.total: int = 0
+        self.dumped_total: int = 0
+
+    def record(
+        self,
+        kind: int,
+        client_id: int,
+        value: int = 0,
+        detail: Optional[str] = None,
+    ) -> None:
+        """
+        Записывает событие поверх самого старого.
+
+        Args:
+            kind: int - вид события (EV_*)
+            client_id: int - номер клиента (ALL_CLIENTS - всех)
+            value: int - число события
+            detail: Optional[str] - строка события (не форматируется)
+        """
+        i: int = self.index
+        self.times[i] = time.time()
+        self.kinds[i] = kind
+        self.clients[i] = client_id
+        self.values[i] = value
+        self.details[i] = detail
+        i += 1
+        self.index = i if i < self.size else 0
+        self.total += 1
+
+    def dump(self, reason: str) -> int:
+        """
+        Дописывает буфер в файл от старых событий к новым.
+
+        Args:
+            reason: str - почему сброс (попадает в заголовок)
+
+        Returns:
+            int - сколько событий записано
+        """
+        count: int = min(self.total, self.size)
+        start: int = (self.index - count) % self.size
+        lines: List[str] = [
+            f"# {datetime.datetime.now().isoformat(sep=' ')} pid "
+            f"{os.getpid()}: {reason}, событий {count} из {self.total}\n"
+        ]
+        for offset in range(count):
+            i: int = (start + offset) % self.size
+            moment: str = datetime.datetime.fromtimestamp(
+                self.times[i]
+            ).strftime('%H:%M:%S.%f')
+            detail: str = (self.details[i] or '').replace('\n', ' ')
+            lines.append(
+                f"{moment};{EVENT_NAMES[self.kinds[i]]};{self.clients[i]};"
+                f"{self.values[i]};{detail}\n"
+            )
+        with open(self.path, 'a', encoding='UTF-8') as f:
+            f.writelines(lines)
+        self.dumped_total = self.total
+        return count
+
+    def install(self) -> None:
+        """
+        Включает сбросы по SIGUSR2 и SIGTERM, при необработанном
+        исключении и при выходе. Вызывается из главного потока.
+        """
+        signal.signal(signal.SIGUSR2, self.on_signal)
+        signal.signal(signal.SIGTERM, self.on_signal)
+        atexit.register(self.on_exit)
+        previous_hook = sys.excepthook
+
+        def excepthook(
+            exc_type: Type[BaseException],
+            exc: BaseException,
+            tb: Optional[TracebackType],
+        ) -> None:
+            self.record(EV_ERROR, ALL_CLIENTS, detail=describe_error(exc))
+            self.dump('необработанное исключение')
+            previous_hook(exc_type, exc, tb)
+
+        sys.excepthook = excepthook
+
+    def on_signal(self, signum: int, frame: Any) -> None:
+        """SIGUSR2 - сброс; SIGTERM - сброс и завершение тем же сигналом."""
+        self.dump(signal.Signals(signum).name)
+        if signum == signal.SIGTERM:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    def on_exit(self) -> None:
+        """Сброс при выходе, если после прошлого были новые события."""
+        if self.total != self.dumped_total:
+            self.dump('выход')
+
+    def loop_exception_handler(
+        self, loop: asyncio.AbstractEventLoop, context: Dict[str, Any]
+    ) -> None:
+        """
+        Обработчик исключений цикла событий (исключение задачи, которое
+        никто не забрал): запись, сброс и обычный вывод asyncio.
+        """
+        exc: Optional[BaseException] = context.get('exception')
+        detail: str = (
+            describe_error(exc) if exc else str(context.get('message'))
+        )
+        self.record(EV_ERROR, ALL_CLIENTS, detail=detail)
+        self.dump('исключение в цикле событий')
+        loop.default_exception_handler(context)
@@ -0,0 +1,123 @@
+"""
+Окно неотвеченных запросов клиента (flow control).
+
+Без окна клиент шлёт PING по своему таймеру, сколько бы запросов ни ждало
+ответа: замедлившийся сервер получает ещё больше нагрузки, а pending
+клиента растёт. Окно ограничивает число запросов в полёте:
+
+1. Фиксированное - не больше size неотвеченных запросов
+2. Адаптивное (AIMD) - окно растёт на 1 за каждое окно ответов, пришедших
+   быстрее target_rtt, и делится пополам при медленном ответе или
+   таймауте (не чаще раза в target_rtt)
+
+Окно считает, сколько отправок и как долго ждали места: так видно, какая
+часть задержки в нагрузочном тесте - собственная очередь клиента, а не
+сервер.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+# Ответ медленнее этого в адаптивном режиме считается перегрузкой, секунды
+# (сервер по спецификации отвечает не позже чем через 1 с)
+TARGET_RTT: float = 1.5
+MAX_WINDOW: int = 32
+
+
+class SendWindow:
+    """
+    Окно запросов в полёте одного клиента.
+
+    Атрибуты:
+        size: float - текущий размер окна (в адаптивном режиме дробный)
+        max_size: int - потолок окна
+        adaptive: bool - AIMD вместо фиксированного размера
+        target_rtt: float - порог медленного ответа, секунды
+        in_flight: int - отправленные запросы без ответа и таймаута
+        stats: Dict[str, float] - отправки, ожидания окна (число и
+            суммарное время), уменьшения окна, максимум в полёте
+    """
+
+    def __init__(
+        self,
+        size: int = MAX_WINDOW,
+        adaptive: bool = False,
+        target_rtt: float = TARGET_RTT,
+    ) -> None:
+        """
+        Args:
+            size: int - размер фиксированного окна или потолок адаптивного
+            adaptive: bool - подстраивать окно по RTT (AIMD), начиная с 1
+            target_rtt: float - RTT, выше которого окно уменьшается
+        """
+        self.max_size: int = size
+        self.adaptive: bool = adaptive
+        self.size: float = 1.0 if adaptive else float(size)
+        self.target_rtt: float = target_rtt
+        self.in_flight: int = 0
+        self.last_decrease: float = 0.0
+        self.released: asyncio.Event = asyncio.Event()
+        self.stats: Dict[str, float] = {
+            'sends': 0,
+            'blocked_sends': 0,
+            'blocked_time': 0.0,
+            'decreases': 0,
+            'max_in_flight': 0,
+        }
+
+    async def acquire(self) -> None:
+        """Ждёт места в окне и занимает его под новый запрос."""
+        if self.in_flight >= int(self.size):
+            started: float = time.monotonic()
+            while self.in_flight >= int(self.size):
+                self.released.clear()
+                await self.released.wait()
+            self.stats['blocked_sends'] += 1
+            self.stats['blocked_time'] += time.monotonic() - started
+        self.in_flight += 1
+        self.stats['sends'] += 1
+        self.stats['max_in_flight'] = max(
+            self.stats['max_in_flight'], self.in_flight
+        )
+
+    def release(self, rtt: Optional[float]) -> None:
+        """
+        Освобождает место запроса, получившего ответ или таймаут.
+
+        Args:
+            rtt: Optional[float] - RTT ответа, секунды (None - таймаут)
+        """
+        self.in_flight -= 1
+        if self.adaptive:
+            if rtt is None or rtt > self.target_rtt:
+                self.decrease()
+            else:
+                # +1 за окно быстрых ответов, как в TCP congestion avoidance
+                self.size = min(self.max_size, self.size + 1 / self.size)
+        self.released.set()
+
+    def decrease(self) -> None:
+        """
+        Делит окно пополам. Ответы на запросы, отправленные до прошлого
+        уменьшения, приходят в течение target_rtt - по ним окно второй
+        раз не режем.
+        """
+        now: float = time.monotonic()
+        if now - self.last_decrease < self.target_rtt:
+            return
+        self.last_decrease = now
+        self.size = max(1.0, self.size / 2)
+        self.stats['decreases'] += 1
+
+    def summary(self) -> str:
+        """Строка отчёта: сколько отправок и как долго ждали окна."""
+        stats: Dict[str, float] = self.stats
+        return (
+            f"окно {int(self.size)}/{self.max_size}"
+            f"{' (AIMD)' if self.adaptive else ''}: "
+            f"отправок {stats['sends']:.0f}, ждали окна "
+            f"{stats['blocked_sends']:.0f} ({stats['blocked_time']:.1f} с), "
+            f"максимум в полёте {stats['max_in_flight']:.0f}, "
+            f"уменьшений {stats['decreases']:.0f}"
+        )
@@ -0,0 +1,135 @@
+# Нагрузочный тест MyHTTPServer: запросов в секунду в разных режимах
+#
+# python http_load_test.py
+# python http_load_test.py --clients 16 --requests 500 --slow
+
+import argparse
+import socket
+import threading
+import time
+
+from http_server import MyHTTPServer
+
+HOST = '127.0.0.1'
+SERVER_NAME = 'example.local'
+REQUEST = (
+    b'GET /users HTTP/1.1\r\n'
+    b'Host: example.local\r\n'
+    b'Accept: application/json\r\n'
+    b'\r\n'
+)
+
+
+def read_response(rfile):
+    """Читает один ответ, возвращает True, если сервер закрывает соединение"""
+    status_line = rfile.readline()
+    if not status_line:
+        raise ConnectionError('Сервер закрыл соединение')
+    length = 0
+    close = False
+    while True:
+        line = rfile.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('iso-8859-1').partition(':')
+        key = key.strip().lower()
+        if key == 'content-length':
+            length = int(value)
+        elif key == 'connection' and value.strip().lower() == 'close':
+            close = True
+    rfile.read(length)
+    return close
+
+
+def client(port, requests, pipeline):
+    """Отправляет requests запросов пачками по pipeline штук"""
+    sock = rfile = None
+    done = 0
+    while done < requests:
+        if sock is None:
+            sock = socket.create_connection((HOST, port))
+            rfile = sock.makefile('rb')
+        batch = min(pipeline, requests - done)
+        sock.sendall(REQUEST * batch)
+        for _ in range(batch):
+            close = read_response(rfile)
+            done += 1
+            if close:
+                break
+        if close:
+            # Сервер закрыл соединение: неотвеченные запросы пачки
+            # отправим заново по новому соединению
+            rfile.close()
+            sock.close()
+            sock = None
+    if sock:
+        rfile.close()
+        sock.close()
+
+
+def slow_client(port, stop):
+    """Подключается и молчит - как зависший клиент"""
+    sock = socket.create_connection((HOST, port))
+    stop.wait()
+    sock.close()
+
+
+def run(name, port, clients, requests, pipeline, slow, **server_kwargs):
+    server = MyHTTPServer(HOST, port, SERVER_NAME, **server_kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while True:
+        try:
+            socket.create_connection((HOST, port)).close()
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+
+    stop = threading.Event()
+    if slow:
+        threading.Thread(
+            target=slow_client, args=(port, stop), daemon=True
+        ).start()
+        time.sleep(0.1)
+
+    threads = [
+        threading.Thread(target=client, args=(port, requests, pipeline))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    server.shutdown()
+    total = clients * requests
+    print(f'{name:<34}{total / elapsed:>10.0f} запр/с  ({elapsed:.2f} с)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument(
+        '--slow', action='store_true', help='добавить молчащего клиента'
+    )
+    args = parser.parse_args()
+    common = dict(
+        clients=args.clients, requests=args.requests, slow=args.slow
+    )
+
+    # Старое поведение: одно соединение за раз, один запрос на соединение
+    run(
+        'последовательно, 1 запрос/соед.',
+        18080,
+        pipeline=1,
+        workers=1,
+        max_requests=1,
+        idle_timeout=1.0,
+        **common,
+    )
+    run('пул потоков + keep-alive', 18081, pipeline=1, **common)
+    run('пул потоков + конвейер по 8', 18082, pipeline=8, **common)
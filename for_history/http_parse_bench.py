@@ -0,0 +1,93 @@
+# Разбор запросов MyHTTPServer: скорость заголовков и память на потоке
+# запросов
+#
+# python http_parse_bench.py                    # оба замера
+# python http_parse_bench.py --requests 200000   # короче прогон по памяти
+
+import argparse
+import io
+import resource
+import time
+from email.parser import Parser
+
+from http_server import MyHTTPServer
+
+HEADERS = (
+    b'Host: example.local\r\n'
+    b'User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Firefox/128.0\r\n'
+    b'Accept: application/json\r\n'
+    b'Accept-Language: ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3\r\n'
+    b'Accept-Encoding: gzip, deflate, br\r\n'
+    b'Connection: keep-alive\r\n'
+    b'Cache-Control: no-cache\r\n'
+    b'\r\n'
+)
+REQUEST = b'GET /users/1?fields=name&fields=age HTTP/1.1\r\n' + HEADERS
+
+
+def parse_headers_email(rfile):
+    # Прежний разбор: склейка строк и email.parser
+    headers = []
+    while True:
+        line = rfile.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        headers.append(line)
+    return Parser().parsestr(b''.join(headers).decode('iso-8859-1'))
+
+
+def bench_headers(rounds):
+    server = MyHTTPServer('127.0.0.1', 0, 'example.local')
+    rfile = io.BytesIO(HEADERS)
+
+    results = {}
+    for name, parse in (
+        ('email.parser', parse_headers_email),
+        ('байтовый разбор', server.parse_headers),
+    ):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            rfile.seek(0)
+            headers = parse(rfile)
+        elapsed = time.perf_counter() - started
+        assert headers.get('accept') == 'application/json'
+        results[name] = elapsed / rounds * 1e6
+        print(f'{name:<18}{results[name]:>8.2f} мкс на заголовки запроса')
+
+    speedup = results['email.parser'] / results['байтовый разбор']
+    print(f'ускорение: в {speedup:.1f} раза')
+
+
+def max_rss_mb():
+    # На Linux ru_maxrss в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def memory_run(requests, step):
+    # Полный путь запроса без сети: разбор, обработка, запись ответа.
+    # Пиковый RSS должен перестать расти после прогрева
+    server = MyHTTPServer('127.0.0.1', 0, 'example.local')
+    server._users[1] = {'id': 1, 'name': 'a', 'age': '1'}
+    rfile = io.BytesIO(REQUEST)
+    wfile = io.BytesIO()
+
+    print(f'\n{"запросов":>10}{"max RSS, МБ":>14}')
+    for i in range(1, requests + 1):
+        rfile.seek(0)
+        wfile.seek(0)
+        wfile.truncate()
+        req = server.parse_request(rfile)
+        server.send_response(wfile, server.handle_request(req))
+        req.query  # разбор query тоже кэшируется в объекте
+        if i % step == 0:
+            print(f'{i:>10}{max_rss_mb():>14.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=1000000)
+    args = parser.parse_args()
+
+    bench_headers(args.rounds)
+    memory_run(args.requests, max(args.requests // 10, 1))
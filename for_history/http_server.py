@@ -1,54 +1,165 @@
 import json
 import socket
 import sys
-from email.parser import Parser
-from functools import lru_cache
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import parse_qs, urlparse
 
 MAX_LINE = 64 * 1024
 MAX_HEADERS = 100
 
+# Параметры обслуживания соединений по умолчанию
+WORKERS = 32  # потоков в пуле = соединений, обслуживаемых одновременно
+IDLE_TIMEOUT = 5.0  # секунд ждём следующий запрос в keep-alive соединении
+MAX_REQUESTS = 100  # запросов на одно соединение, потом закрываем
+
+# GET /users
+PAGE_SIZE = 100  # пользователей на странице, если limit не задан
+MAX_PAGE_SIZE = 1000
+STREAM_THRESHOLD = 1000  # больше пользователей - отдаём список потоком
+CHUNK_SIZE = 16 * 1024  # примерный размер куска при потоковой отдаче
+
+# POST /users/bulk
+MAX_BULK_BODY = 64 * 1024 * 1024
+
+# Непрочитанное обработчиком тело дочитываем и выбрасываем кусками, но не
+# больше MAX_DISCARD_BODY: за более длинным телом соединение закрываем
+MAX_DISCARD_BODY = 1024 * 1024
+DISCARD_CHUNK = 64 * 1024
+
 
 class MyHTTPServer:
-    def __init__(self, host, port, server_name):
+    def __init__(
+        self,
+        host,
+        port,
+        server_name,
+        workers=WORKERS,
+        idle_timeout=IDLE_TIMEOUT,
+        max_requests=MAX_REQUESTS,
+    ):
         self._host = host
         self._port = port
         self._server_name = server_name
         self._users = {}
+        self._users_lock = threading.Lock()
+        # Готовые ответы GET: (путь, представление) -> (Content-Type, тело).
+        # Версия растёт при каждом изменении _users, кэш при этом очищается
+        self._version = 0
+        self._cache = {}
+
+        self._workers = workers
+        self._idle_timeout = idle_timeout
+        self._max_requests = max_requests
+        self._serv_sock = None
+        # Не больше workers соединений в работе: accept ждёт свободный поток,
+        # а лишние подключения ждут в очереди ядра, а не в памяти процесса
+        self._slots = threading.BoundedSemaphore(workers)
 
     def serve_forever(self):
         serv_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, proto=0)
+        self._serv_sock = serv_sock
+        # Повторный запуск на том же порту не ждёт соединения в TIME_WAIT
+        serv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
         try:
             serv_sock.bind((self._host, self._port))
             serv_sock.listen()
 
-            while True:
-                conn, _ = serv_sock.accept()
-                try:
-                    self.serve_client(conn)
-                except Exception as e:
-                    print('Client serving failed', e)
+            with ThreadPoolExecutor(self._workers) as pool:
+                while True:
+                    self._slots.acquire()
+                    try:
+                        conn, _ = serv_sock.accept()
+                    except OSError:
+                        # Слушающий сокет закрыт в shutdown()
+                        self._slots.release()
+                        break
+                    pool.submit(self._serve_in_pool, conn)
         finally:
             serv_sock.close()
 
-    def serve_client(self, conn):
+    def shutdown(self):
+        if self._serv_sock:
+            # accept() в serve_forever получит OSError и цикл завершится
+            self._serv_sock.shutdown(socket.SHUT_RDWR)
+            self._serv_sock.close()
+
+    def _serve_in_pool(self, conn):
         try:
-            req = self.parse_request(conn)
-            resp = self.handle_request(req)
-            self.send_response(conn, resp)
-        except ConnectionResetError:
-            conn = None
+            self.serve_client(conn)
         except Exception as e:
-            self.send_error(conn, e)
+            print('Client serving failed', e)
+        finally:
+            self._slots.release()
+
+    def serve_client(self, conn):
+        # Файлы создаются один раз на соединение: запросы, пришедшие
+        # конвейером (pipelining), уже лежат в буфере rfile
+        conn.settimeout(self._idle_timeout)
+        # Ответ уходит одним flush; без TCP_NODELAY ответы на конвейер
+        # запросов ждут ACK клиента (Nagle + отложенный ACK)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        rfile = conn.makefile('rb')
+        wfile = conn.makefile('wb')
+        # Ответ уже начал уходить: статус ошибки посреди (chunked) тела
+        # испортил бы поток, поэтому при сбое соединение просто закрываем
+        sending = False
+        try:
+            for served in range(1, self._max_requests + 1):
+                try:
+                    req = self.parse_request(rfile)
+                except (socket.timeout, ConnectionResetError):
+                    break  # клиент молчит дольше idle_timeout или ушёл
+                if req is None:
+                    break  # клиент закрыл соединение между запросами
 
-        if conn:
-            req.rfile.close()
+                try:
+                    resp = self.handle_request(req)
+                except HTTPError as e:
+                    # Ошибка приложения не ломает разбор потока:
+                    # соединение можно использовать дальше
+                    resp = self.error_response(e)
+                keep_alive = (
+                    served < self._max_requests
+                    and req.headers.get('Connection', '').lower() != 'close'
+                )
+                if resp.status == 413 or not req.discard_body():
+                    # Слишком большое тело не дочитываем, а закрываем
+                    # соединение: непрочитанное тело не должно стать
+                    # началом следующего запроса
+                    keep_alive = False
+                if not keep_alive:
+                    resp.add_header('Connection', 'close')
+                sending = True
+                try:
+                    self.send_response(wfile, resp)
+                except OSError:
+                    # В том числе таймаут записи медленному читателю
+                    break
+                sending = False
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        except Exception as e:
+            if not sending:
+                try:
+                    self.send_error(wfile, e)
+                except OSError:
+                    pass
+        finally:
+            for f in (rfile, wfile):
+                try:
+                    f.close()
+                except OSError:
+                    pass
             conn.close()
 
-    def parse_request(self, conn):
-        rfile = conn.makefile('rb')
+    def parse_request(self, rfile):
         method, target, ver = self.parse_request_line(rfile)
+        if method is None:
+            return None
         headers = self.parse_headers(rfile)
         host = headers.get('Host')
         if not host:
@@ -58,25 +169,34 @@ class MyHTTPServer:
             f'{self._server_name}:{self._port}',
         ):
             raise HTTPError(404, 'Not found')
+        # Длину тела проверяем один раз: дальше её читают body() и
+        # discard_body() без разбора ошибок
+        length = headers.get('Content-Length')
+        if length is not None and not length.isdigit():
+            raise HTTPError(400, 'Bad request', 'Invalid Content-Length')
         return Request(method, target, ver, headers, rfile)
 
     def parse_request_line(self, rfile):
         raw = rfile.readline(MAX_LINE + 1)
+        if not raw:
+            return None, None, None
         if len(raw) > MAX_LINE:
             raise HTTPError(400, 'Bad request', 'Request line is too long')
 
-        req_line = str(raw, 'iso-8859-1')
-        words = req_line.split()
+        words = raw.split()
         if len(words) != 3:
             raise HTTPError(400, 'Bad request', 'Malformed request line')
 
         method, target, ver = words
-        if ver != 'HTTP/1.1':
+        if ver != b'HTTP/1.1':
             raise HTTPError(505, 'HTTP Version Not Supported')
-        return method, target, ver
+        return method.decode('ascii'), target.decode('iso-8859-1'), 'HTTP/1.1'
 
     def parse_headers(self, rfile):
-        headers = []
+        # Разбираем байты сразу по строкам: без склейки всех заголовков
+        # в одну строку и без email.parser с его объектами на каждый запрос
+        headers = Headers()
+        count = 0
         while True:
             line = rfile.readline(MAX_LINE + 1)
             if len(line) > MAX_LINE:
@@ -85,12 +205,19 @@ class MyHTTPServer:
             if line in (b'\r\n', b'\n', b''):
                 break
 
-            headers.append(line)
-            if len(headers) > MAX_HEADERS:
+            count += 1
+            if count > MAX_HEADERS:
                 raise HTTPError(494, 'Too many headers')
 
-        sheaders = b''.join(headers).decode('iso-8859-1')
-        return Parser().parsestr(sheaders)
+            name, sep, value = line.partition(b':')
+            # Пробел перед двоеточием запрещён (RFC 9112, 5.1)
+            if not sep or not name or name != name.strip():
+                raise HTTPError(400, 'Bad request', 'Malformed header')
+            headers.add(
+                name.decode('iso-8859-1'),
+                value.strip().decode('iso-8859-1'),
+            )
+        return headers
 
     def handle_request(self, req):
         if req.path == '/users' and req.method == 'POST':
@@ -99,6 +226,9 @@ class MyHTTPServer:
         if req.path == '/users' and req.method == 'GET':
             return self.handle_get_users(req)
 
+        if req.path == '/users/bulk' and req.method == 'POST':
+            return self.handle_post_users_bulk(req)
+
         if req.path.startswith('/users/'):
             user_id = req.path[len('/users/') :]
             if user_id.isdigit():
@@ -106,8 +236,7 @@ class MyHTTPServer:
 
         raise HTTPError(404, 'Not found')
 
-    def send_response(self, conn, resp):
-        wfile = conn.makefile('wb')
+    def send_response(self, wfile, resp):
         status_line = f'HTTP/1.1 {resp.status} {resp.reason}\r\n'
         wfile.write(status_line.encode('iso-8859-1'))
 
@@ -116,126 +245,428 @@ class MyHTTPServer:
                 header_line = f'{key}: {value}\r\n'
                 wfile.write(header_line.encode('iso-8859-1'))
 
+        streamed = resp.body is not None and not isinstance(resp.body, bytes)
+        if streamed:
+            # Длина заранее неизвестна: конец тела отмечает пустой кусок
+            wfile.write(b'Transfer-Encoding: chunked\r\n')
+        # В keep-alive соединении клиент узнаёт конец ответа только по длине
+        elif resp.status not in (204, 304) and not resp.has_header(
+            'Content-Length'
+        ):
+            length = len(resp.body) if resp.body else 0
+            wfile.write(f'Content-Length: {length}\r\n'.encode('iso-8859-1'))
+
         wfile.write(b'\r\n')
 
-        if resp.body:
+        if streamed:
+            for chunk in resp.body:
+                if chunk:
+                    wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            wfile.write(b'0\r\n\r\n')
+        elif resp.body:
             wfile.write(resp.body)
 
         wfile.flush()
-        wfile.close()
 
-    def send_error(self, conn, err):
+    def send_error(self, wfile, err):
+        resp = self.error_response(err)
+        resp.add_header('Connection', 'close')
+        self.send_response(wfile, resp)
+
+    def error_response(self, err):
         try:
             status = err.status
             reason = err.reason
             body = (err.body or err.reason).encode('utf-8')
         except:
             status = 500
-            reason = b'Internal Server Error'
+            reason = 'Internal Server Error'
             body = b'Internal Server Error'
-        resp = Response(status, reason, [('Content-Length', len(body))], body)
-        self.send_response(conn, resp)
+        return Response(status, reason, [('Content-Length', len(body))], body)
 
     def handle_post_users(self, req):
-        user_id = len(self._users) + 1
-        self._users[user_id] = {
-            'id': user_id,
-            'name': req.query['name'][0],
-            'age': req.query['age'][0],
-        }
+        name = req.query['name'][0]
+        age = req.query['age'][0]
+        with self._users_lock:
+            user_id = len(self._users) + 1
+            self._users[user_id] = {
+                'id': user_id,
+                'name': name,
+                'age': age,
+            }
+            # Все закэшированные ответы и выданные ETag устарели
+            self._version += 1
+            self._cache.clear()
         return Response(204, 'Created')
 
-    def handle_get_users(self, req):
-        accept = req.headers.get('Accept')
-        if 'text/html' in accept:
-            contentType = 'text/html; charset=utf-8'
-            body = '<html><head></head><body>'
-            body += f'<div>Пользователи ({len(self._users)})</div>'
-            body += '<ul>'
-            for u in self._users.values():
-                body += f'<li>#{u["id"]} {u["name"]}, {u["age"]}</li>'
-            body += '</ul>'
-            body += '</body></html>'
-
-        elif 'application/json' in accept:
-            contentType = 'application/json; charset=utf-8'
-            body = json.dumps(self._users)
-
+    def handle_post_users_bulk(self, req):
+        # Пользователи в теле запроса: JSON-массив или NDJSON (по объекту
+        # в строке). Ошибочные элементы пропускаются и перечисляются
+        # в ответе, остальные добавляются одной вставкой
+        size = req.headers.get('Content-Length')
+        if not size or not size.isdigit():
+            raise HTTPError(411, 'Length Required')
+        if int(size) > MAX_BULK_BODY:
+            raise HTTPError(413, 'Payload Too Large')
+
+        body = req.body() or b''
+        contentType = req.headers.get('Content-Type') or ''
+        if 'ndjson' in contentType:
+            items = self.parse_ndjson(body)
+        elif 'application/json' in contentType:
+            try:
+                items = json.loads(body)
+            except ValueError as e:
+                raise HTTPError(400, 'Bad request', f'Invalid JSON: {e}')
+            if not isinstance(items, list):
+                raise HTTPError(400, 'Bad request', 'Expected JSON array')
         else:
-            # https://developer.mozilla.org/en-US/docs/Web/HTTP/Status/406
-            return Response(406, 'Not Acceptable')
-
-        body = body.encode('utf-8')
+            raise HTTPError(415, 'Unsupported Media Type')
+
+        users = []
+        errors = []
+        for index, item in enumerate(items):
+            try:
+                users.append(self.bulk_user(item))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+
+        with self._users_lock:
+            first_id = len(self._users) + 1
+            for user_id, (name, age) in enumerate(users, first_id):
+                self._users[user_id] = {
+                    'id': user_id,
+                    'name': name,
+                    'age': age,
+                }
+            if users:
+                self._version += 1
+                self._cache.clear()
+
+        body = json.dumps(
+            {
+                'created': len(users),
+                'first_id': first_id if users else None,
+                'errors': errors,
+            }
+        ).encode('utf-8')
         headers = [
-            ('Content-Type', contentType),
+            ('Content-Type', 'application/json; charset=utf-8'),
             ('Content-Length', len(body)),
         ]
         return Response(200, 'OK', headers, body)
 
+    def parse_ndjson(self, body):
+        # Битая строка - ошибка только этого элемента, а не всего запроса
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield ValueError(f'Invalid JSON: {e}')
+
+    def bulk_user(self, item):
+        if isinstance(item, ValueError):
+            raise item
+        if not isinstance(item, dict):
+            raise ValueError('Expected object')
+        name = item.get('name')
+        age = item.get('age')
+        if not isinstance(name, str) or not name:
+            raise ValueError('name must be a non-empty string')
+        if isinstance(age, bool) or not isinstance(age, (int, str)):
+            raise ValueError('age must be an integer')
+        age = str(age)
+        if not age.isdigit():
+            raise ValueError('age must be an integer')
+        # Как и в POST /users, возраст хранится строкой
+        return name, age
+
+    def handle_get_users(self, req):
+        if 'cursor' in req.query or 'limit' in req.query:
+            cursor, limit = self.page_params(req)
+            # Страницы не кэшируются: они маленькие, а вариантов
+            # cursor/limit слишком много
+            return self.cached_response(
+                req,
+                lambda kind: self.render_users_page(kind, cursor, limit),
+                cache=False,
+            )
+        return self.cached_response(req, self.render_users)
+
+    def page_params(self, req):
+        try:
+            cursor = int(req.query.get('cursor', ['0'])[0])
+            limit = int(req.query.get('limit', [str(PAGE_SIZE)])[0])
+        except ValueError:
+            raise HTTPError(400, 'Bad request', 'cursor and limit must be int')
+        if cursor < 0 or limit < 1:
+            raise HTTPError(400, 'Bad request', 'cursor or limit out of range')
+        return cursor, min(limit, MAX_PAGE_SIZE)
+
     def handle_get_user(self, req, user_id):
         user = self._users.get(int(user_id))
         if not user:
             raise HTTPError(404, 'Not found')
+        return self.cached_response(
+            req, lambda kind: self.render_user(user, kind)
+        )
 
-        accept = req.headers.get('Accept')
+    def cached_response(self, req, render, cache=True):
+        kind = self.representation(req)
+        if kind is None:
+            # https://developer.mozilla.org/en-US/docs/Web/HTTP/Status/406
+            return Response(406, 'Not Acceptable')
+
+        key = (req.path, kind)
+        with self._users_lock:
+            # ETag меняется вместе с версией данных, поэтому клиенту с
+            # актуальной копией отвечаем 304, ничего не отрисовывая
+            etag = f'"{self._version}-{kind}"'
+            if self.etag_matches(req, etag):
+                return Response(
+                    304, 'Not Modified', [('ETag', etag), ('Vary', 'Accept')]
+                )
+            cached = self._cache.get(key) if cache else None
+            if cached is None:
+                # Отрисовка под блокировкой: POST не изменит данные посреди
+                # неё, а в кэш не попадёт ответ от прошлой версии
+                cached = render(kind)
+                # Потоковое тело (генератор) одноразовое - его не кэшируем
+                if cache and isinstance(cached[1], bytes):
+                    self._cache[key] = cached
+
+        contentType, body = cached
+        headers = [('Content-Type', contentType)]
+        if isinstance(body, bytes):
+            headers.append(('Content-Length', len(body)))
+        headers += [('ETag', etag), ('Vary', 'Accept')]
+        return Response(200, 'OK', headers, body)
+
+    def representation(self, req):
+        accept = req.headers.get('Accept') or ''
         if 'text/html' in accept:
+            return 'html'
+        if 'application/json' in accept:
+            return 'json'
+        return None
+
+    def etag_matches(self, req, etag):
+        if_none_match = req.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            # If-None-Match сравнивает слабо: W/"x" совпадает с "x"
+            if tag == '*' or tag.removeprefix('W/') == etag:
+                return True
+        return False
+
+    def render_users(self, kind):
+        # id пользователей идут подряд с 1 и не удаляются, поэтому снимок -
+        # это просто их число: генератор потом читает _users[1..count]
+        # без блокировки и не видит добавленных после снимка
+        count = len(self._users)
+        if kind == 'html':
             contentType = 'text/html; charset=utf-8'
-            body = '<html><head></head><body>'
-            body += f'#{user["id"]} {user["name"]}, {user["age"]}'
-            body += '</body></html>'
+            parts = self.users_html(range(1, count + 1), count)
+        else:
+            contentType = 'application/json; charset=utf-8'
+            parts = self.users_json(range(1, count + 1))
+
+        if count > STREAM_THRESHOLD:
+            # Большой список не собираем целиком: он уходит кусками
+            # (Transfer-Encoding: chunked) по мере отрисовки
+            return contentType, encode_chunks(parts)
+        return contentType, ''.join(parts).encode('utf-8')
+
+    def render_users_page(self, kind, cursor, limit):
+        count = len(self._users)
+        last = min(cursor + limit, count)
+        ids = range(cursor + 1, last + 1)
+        next_cursor = last if last < count else None
 
-        elif 'application/json' in accept:
+        if kind == 'html':
+            contentType = 'text/html; charset=utf-8'
+            body = ''.join(self.users_html(ids, count, next_cursor, limit))
+        else:
+            contentType = 'application/json; charset=utf-8'
+            body = ''.join(
+                [
+                    '{"users": ',
+                    *self.users_json(ids),
+                    f', "next_cursor": {json.dumps(next_cursor)}}}',
+                ]
+            )
+        return contentType, body.encode('utf-8')
+
+    def users_html(self, ids, count, next_cursor=None, limit=None):
+        yield '<html><head></head><body>'
+        yield f'<div>Пользователи ({count})</div>'
+        yield '<ul>'
+        for user_id in ids:
+            u = self._users[user_id]
+            yield f'<li>#{u["id"]} {u["name"]}, {u["age"]}</li>'
+        yield '</ul>'
+        if next_cursor is not None:
+            yield (
+                f'<a href="/users?cursor={next_cursor}&limit={limit}">'
+                'Дальше</a>'
+            )
+        yield '</body></html>'
+
+    def users_json(self, ids):
+        # То же, что json.dumps({id: user, ...}), но по одному пользователю
+        yield '{'
+        separator = ''
+        for user_id in ids:
+            user = json.dumps(self._users[user_id])
+            yield f'{separator}"{user_id}": {user}'
+            separator = ', '
+        yield '}'
+
+    def render_user(self, user, kind):
+        if kind == 'html':
+            contentType = 'text/html; charset=utf-8'
+            body = (
+                '<html><head></head><body>'
+                f'#{user["id"]} {user["name"]}, {user["age"]}'
+                '</body></html>'
+            )
+        else:
             contentType = 'application/json; charset=utf-8'
             body = json.dumps(user)
+        return contentType, body.encode('utf-8')
 
-        else:
-            # https://developer.mozilla.org/en-US/docs/Web/HTTP/Status/406
-            return Response(406, 'Not Acceptable')
 
-        body = body.encode('utf-8')
-        headers = [
-            ('Content-Type', contentType),
-            ('Content-Length', len(body)),
-        ]
-        return Response(200, 'OK', headers, body)
+def encode_chunks(parts, size=CHUNK_SIZE):
+    # Склеивает мелкие строки в куски около size байт: один кусок
+    # chunked-ответа на каждую строку дал бы слишком много накладных
+    buf = []
+    buffered = 0
+    for part in parts:
+        data = part.encode('utf-8')
+        buf.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b''.join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield b''.join(buf)
+
+
+class Headers(dict):
+    """Заголовки запроса, имена без учёта регистра (хранятся в нижнем)"""
+
+    __slots__ = ()
+
+    def add(self, name, value):
+        name = name.lower()
+        if name in self:
+            # Повторный заголовок эквивалентен списку через запятую
+            value = f'{dict.__getitem__(self, name)}, {value}'
+        dict.__setitem__(self, name, value)
+
+    def get(self, name, default=None):
+        return dict.get(self, name.lower(), default)
+
+    def __getitem__(self, name):
+        return dict.__getitem__(self, name.lower())
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name.lower())
 
 
 class Request:
+    __slots__ = (
+        'method',
+        'target',
+        'version',
+        'headers',
+        'rfile',
+        '_body',
+        '_body_read',
+        '_url',
+        '_query',
+    )
+
     def __init__(self, method, target, version, headers, rfile):
         self.method = method
         self.target = target
         self.version = version
         self.headers = headers
         self.rfile = rfile
+        self._body = None
+        self._body_read = False
+        # Разбор URL и query кэшируется в самом объекте и умирает вместе
+        # с ним (lru_cache на свойстве держал каждый Request вечно)
+        self._url = None
+        self._query = None
 
     @property
     def path(self):
         return self.url.path
 
     @property
-    @lru_cache(maxsize=None)
     def query(self):
-        return parse_qs(self.url.query)
+        if self._query is None:
+            self._query = parse_qs(self.url.query)
+        return self._query
 
     @property
-    @lru_cache(maxsize=None)
     def url(self):
-        return urlparse(self.target)
+        if self._url is None:
+            self._url = urlparse(self.target)
+        return self._url
 
     def body(self):
+        # Тело читается из потока один раз: повторный вызов вернёт то же
+        if self._body_read:
+            return self._body
+        self._body_read = True
         size = self.headers.get('Content-Length')
         if not size:
             return None
-        return self.rfile.read(size)
+        self._body = self.rfile.read(int(size))
+        return self._body
+
+    def discard_body(self, limit=MAX_DISCARD_BODY):
+        # Тело, которое обработчик не прочитал, выбрасываем кусками, не
+        # собирая в памяти. False - тело длиннее limit и не прочитано
+        if self._body_read:
+            return True
+        size = int(self.headers.get('Content-Length') or 0)
+        if size > limit:
+            return False
+        self._body_read = True
+        while size > 0:
+            chunk = self.rfile.read(min(size, DISCARD_CHUNK))
+            if not chunk:
+                break
+            size -= len(chunk)
+        return True
 
 
 class Response:
+    __slots__ = ('status', 'reason', 'headers', 'body')
+
     def __init__(self, status, reason, headers=None, body=None):
         self.status = status
         self.reason = reason
         self.headers = headers
         self.body = body
 
+    def has_header(self, name):
+        name = name.lower()
+        return any(key.lower() == name for key, _ in self.headers or ())
+
+    def add_header(self, name, value):
+        if self.headers is None:
+            self.headers = []
+        self.headers.append((name, value))
+
 
 class HTTPError(Exception):
     def __init__(self, status, reason, body=None):
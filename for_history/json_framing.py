@@ -0,0 +1,62 @@
+# Кадры JSON-сообщений для SocketServer/SocketClient
+#
+# Кадр: 4 байта - длина JSON, 4 байта - номер запроса (big-endian), JSON
+# в utf-8. Номер запроса связывает ответ с запросом, поэтому по одному
+# соединению можно отправить много запросов сразу и получать ответы
+# в любом порядке.
+
+import json
+import struct
+
+HEADER = struct.Struct('!II')
+MAX_MESSAGE = 16 * 1024 * 1024  # больше - скорее мусор в потоке, чем JSON
+
+
+def encode_message(req_id, data):
+    """Кадр с JSON-сообщением"""
+    payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return HEADER.pack(len(payload), req_id) + payload
+
+
+class FrameDecoder:
+    """Собирает кадры из кусков, прочитанных из сокета
+
+    Куски складываются в один буфер, pos указывает на начало первого
+    неразобранного кадра. Конец кадра известен из заголовка, поэтому
+    недособранный кадр не перечитывается: при каждом куске проверяется
+    только, хватает ли уже байт.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0
+
+    def feed(self, data):
+        if self._pos:
+            # Разобранные кадры выкидываем один раз на кусок, а не на кадр
+            del self._buffer[: self._pos]
+            self._pos = 0
+        self._buffer += data
+
+    def next_message(self):
+        """Следующее сообщение (номер, данные) или None, если кадр не полон"""
+        buffer = self._buffer
+        start = self._pos + HEADER.size
+        if len(buffer) < start:
+            return None
+        length, req_id = HEADER.unpack_from(buffer, self._pos)
+        if length > MAX_MESSAGE:
+            raise ValueError(f'Message too large: {length} bytes')
+        end = start + length
+        if len(buffer) < end:
+            return None
+        self._pos = end
+        return req_id, json.loads(buffer[start:end])
+
+    def messages(self):
+        """Все полные сообщения, накопленные в буфере"""
+        while True:
+            message = self.next_message()
+            if message is None:
+                return
+            yield message
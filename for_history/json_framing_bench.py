@@ -0,0 +1,82 @@
+# Пропускная способность JSON-кадров SocketServer/SocketClient
+#
+# python json_framing_bench.py
+# python json_framing_bench.py --requests 5000 --in-flight 32 --delay 0
+#
+# Обработчик на сервере "думает" delay секунд (как запрос в базу): при
+# одном запросе в полёте соединение всё это время простаивает
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from simple_client_oop import SocketClient
+from simple_server_oop import SocketServer
+
+HOST = '127.0.0.1'
+PORT = 18686
+
+PAYLOADS = {
+    'маленький': {'cmd': 'ping', 'n': 1},
+    'большой (~1 МБ)': {'cmd': 'data', 'items': ['x' * 100] * 10000},
+}
+
+
+def start_server(delay):
+    def handler(message):
+        time.sleep(delay)
+        return message
+
+    server = SocketServer(HOST, PORT)
+    server.start()
+
+    def serve():
+        while True:
+            try:
+                server.accept_client()
+            except OSError:
+                return
+            server.serve_requests(handler, workers=64)
+            server.close_client()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server
+
+
+def run(name, payload, requests, in_flight):
+    client = SocketClient(HOST, PORT)
+    size = len(json.dumps(payload))
+    started = time.perf_counter()
+    if in_flight == 1:
+        for _ in range(requests):
+            client.request(payload)
+    else:
+        # in_flight потоков шлют запросы по одному общему соединению
+        with ThreadPoolExecutor(in_flight) as pool:
+            for _ in pool.map(client.request, [payload] * requests):
+                pass
+    elapsed = time.perf_counter() - started
+    client.close()
+    print(
+        f'{name:<18}{in_flight:>10}{requests / elapsed:>12.0f}'
+        f'{requests * size / elapsed / 1e6:>10.1f}'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--in-flight', type=int, default=16)
+    parser.add_argument('--delay', type=float, default=0.002)
+    args = parser.parse_args()
+
+    server = start_server(args.delay)
+    print(f'{"сообщение":<18}{"в полёте":>10}{"запр/с":>12}{"МБ/с":>10}')
+    for name, payload in PAYLOADS.items():
+        # Большие сообщения гоняем реже, чтобы прогон шёл секунды
+        requests = args.requests if name == 'маленький' else 100
+        run(name, payload, requests, 1)
+        run(name, payload, requests, args.in_flight)
+    server.close_server()
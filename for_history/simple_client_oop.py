@@ -31,15 +31,29 @@
 
 import socket
 import time
-import json
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from json_framing import FrameDecoder, encode_message
 
 
 class SocketClient:
     ENCODING = 'utf-8'
+    RECV_SIZE = 64 * 1024
 
     def __init__(self, host, port):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.connect((host, port))
+        self._decoder = FrameDecoder()
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)  # 0 - для send_json/receive_json
+        self._pending = {}  # номер запроса -> Future
+        # Общий для request_async и потока чтения: запрос не попадёт
+        # в _pending после того, как поток чтения отказал всем ждущим
+        self._pending_lock = threading.Lock()
+        self._reader = None
+        self._error = None  # почему соединение больше не работает
 
     def send_text(self, text):
         """Отправляет текст"""
@@ -48,8 +62,11 @@ class SocketClient:
 
     def send_json(self, data):
         """Отправляет JSON"""
-        json_str = json.dumps(data, ensure_ascii=False)
-        self.send_text(json_str)
+        self._send(encode_message(0, data))
+
+    def _send(self, frame):
+        with self._send_lock:
+            self.sock.sendall(frame)
 
     def receive_text(self, buffer_size=1024):
         """Получает текст"""
@@ -57,11 +74,78 @@ class SocketClient:
         return data.decode(self.ENCODING)
 
     def receive_json(self):
-        """Получает JSON"""
-        text = self.receive_text()
-        return json.loads(text)
+        """Получает JSON (одно сообщение целиком)"""
+        if self._reader:
+            raise RuntimeError('Ответы читает поток request()')
+        while True:
+            message = self._decoder.next_message()
+            if message is not None:
+                return message[1]
+            data = self.sock.recv(self.RECV_SIZE)
+            if not data:
+                raise ConnectionError('Сервер закрыл соединение')
+            self._decoder.feed(data)
+
+    def request_async(self, data):
+        """Отправляет запрос, не дожидаясь ответа
+
+        Возвращает Future с ответом. Запросы из разных потоков идут по
+        одному соединению, ответ находится по номеру запроса
+        """
+        if self._reader is None:
+            self._reader = threading.Thread(
+                target=self._read_responses, daemon=True
+            )
+            self._reader.start()
+        req_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            if self._error:
+                raise self._error
+            self._pending[req_id] = future
+        try:
+            self._send(encode_message(req_id, data))
+        except OSError:
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+            raise
+        return future
+
+    def request(self, data, timeout=None):
+        """Отправляет запрос и ждёт ответ на него"""
+        return self.request_async(data).result(timeout)
+
+    def _read_responses(self):
+        error = ConnectionError('Сервер закрыл соединение')
+        try:
+            while True:
+                data = self.sock.recv(self.RECV_SIZE)
+                if not data:
+                    break
+                self._decoder.feed(data)
+                for req_id, response in self._decoder.messages():
+                    with self._pending_lock:
+                        future = self._pending.pop(req_id, None)
+                    if future:
+                        future.set_result(response)
+        except (OSError, ValueError) as e:
+            error = e
+        # Соединения больше нет: ждущим запросам ответа не будет, а новые
+        # request_async() сразу получат ошибку
+        with self._pending_lock:
+            self._error = error
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(error)
 
     def close(self):
+        try:
+            # Будит поток чтения, заблокированный в recv: без shutdown
+            # close() не отправит серверу FIN, пока recv не вернётся
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         self.sock.close()
 
 
@@ -71,13 +155,17 @@ if __name__ == "__main__":
     print('client starting')
 
     try:
-        client.send_text('Hello from client!')
-        response = client.receive_text()
-        print(f'Response 1: {response}')
-
         client.send_json({"cmd": "start", "msg": "starting"})
         response = client.receive_json()
-        print(f'Response 2: {response}')
+        print(f'Response 1: {response}')
+
+        # Несколько запросов одновременно по одному соединению
+        with ThreadPoolExecutor(4) as pool:
+            responses = pool.map(
+                lambda n: client.request({"cmd": "ping", "n": n}), range(8)
+            )
+            for response in responses:
+                print(f'Response: {response}')
 
     except Exception as e:
         print(f'Error: {e}')
@@ -37,11 +37,15 @@
 # start_udp_server()
 
 import socket
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from json_framing import FrameDecoder, encode_message
 
 
 class SocketServer:
     ENCODING = 'utf-8'
+    RECV_SIZE = 64 * 1024
 
     def __init__(self, host='0.0.0.0', port=8686):
         self.host = host
@@ -49,6 +53,8 @@ class SocketServer:
         self.server_socket = None
         self.client_socket = None
         self.client_address = None
+        self._decoder = FrameDecoder()
+        self._send_lock = threading.Lock()
 
     def start(self):
         """Запускает сервер"""
@@ -60,6 +66,7 @@ class SocketServer:
     def accept_client(self):
         """Принимает подключение клиента"""
         self.client_socket, self.client_address = self.server_socket.accept()
+        self._decoder = FrameDecoder()
         print(f'\nClient connected from {self.client_address}')
         # return self.client_socket, self.client_address
 
@@ -74,12 +81,26 @@ class SocketServer:
         return data.decode(self.ENCODING)
 
     def receive_json(self):
-        """Получает JSON от клиента"""
-        text = self.receive_text()
-        if text:
-            return json.loads(text)
+        """Получает JSON от клиента (одно сообщение целиком)"""
+        message = self.receive_message()
+        if message:
+            return message[1]
         return None
 
+    def receive_message(self):
+        """Получает кадр от клиента: (номер запроса, данные) или None"""
+        if not self.client_socket:
+            raise RuntimeError("No client connected")
+
+        while True:
+            message = self._decoder.next_message()
+            if message is not None:
+                return message
+            data = self.client_socket.recv(self.RECV_SIZE)
+            if not data:
+                return None
+            self._decoder.feed(data)
+
     def send_text(self, text):
         """Отправляет текст клиенту"""
         if not self.client_socket:
@@ -90,8 +111,37 @@ class SocketServer:
 
     def send_json(self, data):
         """Отправляет JSON клиенту"""
-        json_str = json.dumps(data, ensure_ascii=False)
-        self.send_text(json_str)
+        self.send_message(0, data)
+
+    def send_message(self, req_id, data):
+        """Отправляет кадр с ответом на запрос req_id"""
+        frame = encode_message(req_id, data)
+        # Ответы из разных потоков не должны перемешаться в сокете
+        with self._send_lock:
+            self.client_socket.sendall(frame)
+
+    def serve_requests(self, handler, workers=8):
+        """Обслуживает запросы клиента, пока он не отключится
+
+        Каждый запрос обрабатывается в пуле потоков, ответ уходит, как
+        только готов: медленный запрос не задерживает быстрые
+        """
+        with ThreadPoolExecutor(workers) as pool:
+            while True:
+                message = self.receive_message()
+                if message is None:
+                    break
+                pool.submit(self._respond, handler, *message)
+
+    def _respond(self, handler, req_id, data):
+        try:
+            result = handler(data)
+        except Exception as e:
+            result = {'error': str(e)}
+        try:
+            self.send_message(req_id, result)
+        except OSError:
+            pass  # клиент уже отключился
 
     def close_client(self):
         """Закрывает соединение с клиентом"""
@@ -118,17 +168,8 @@ if __name__ == "__main__":
             # Ждем клиента
             server.accept_client()
 
-            # Общаемся с клиентом
-            while True:
-                # Получаем сообщение
-                message = server.receive_text()
-                if not message:  # Клиент отключился
-                    break
-
-                print(f'From client: {message}')
-
-                # Отправляем ответ
-                server.send_text(message)
+            # Отвечаем на JSON-запросы клиента тем же сообщением
+            server.serve_requests(lambda message: message)
 
             # Закрываем соединение с этим клиентом
             server.close_client()
@@ -0,0 +1,165 @@
+"""
+Бинарный формат сообщений PING/PONG (необязательный режим).
+
+Режим согласуется один раз сразу после подключения: клиент шлёт строку
+HANDSHAKE, сервер отвечает строкой HANDSHAKE_ACK, и дальше в обе стороны
+идут только бинарные кадры. Клиенты, которые сразу шлют "[0] PING\\n",
+продолжают работать в текстовом режиме.
+
+Кадр:
+    2 байта - длина остатка кадра (big-endian)
+    1 байт  - тип кадра
+    поля    - беззнаковые 32-битные числа (big-endian)
+
+Типы кадров:
+    FRAME_PING      [номер_запроса]
+    FRAME_PONG      [номер_ответа, номер_запроса, номер_клиента]
+    FRAME_KEEPALIVE [номер_ответа]
+    FRAME_CLOCK     [t1]            - метки времени clock_sync.py:
+    FRAME_CLOCK_REPLY [t1, t2, t3]    64-битные, мкс
+
+Сообщения разбираются без поиска "\\n" и без разбора десятичных чисел,
+а для логов кадр превращается в текст спецификации функцией render_frame().
+"""
+
+import asyncio
+import struct
+import weakref
+from typing import Dict, Optional, Tuple
+
+HANDSHAKE: bytes = b'BINARY/1\n'
+HANDSHAKE_ACK: bytes = b'BINARY/1 OK\n'
+
+FRAME_PING: int = 1
+FRAME_PONG: int = 2
+FRAME_KEEPALIVE: int = 3
+FRAME_CLOCK: int = 4
+FRAME_CLOCK_REPLY: int = 5
+
+_LENGTH = struct.Struct('!H')
+
+# Тип кадра -> структура всего кадра (длина, тип, поля)
+_FRAMES: Dict[int, struct.Struct] = {
+    FRAME_PING: struct.Struct('!HBI'),
+    FRAME_PONG: struct.Struct('!HBIII'),
+    FRAME_KEEPALIVE: struct.Struct('!HBI'),
+    FRAME_CLOCK: struct.Struct('!HBQ'),
+    FRAME_CLOCK_REPLY: struct.Struct('!HBQQQ'),
+}
+
+# Тип кадра -> структура тела (тип и поля, без длины)
+_BODIES: Dict[int, struct.Struct] = {
+    frame_type: struct.Struct('!' + frame.format[2:])
+    for frame_type, frame in _FRAMES.items()
+}
+
+Frame = Tuple[int, Tuple[int, ...]]
+
+# Заголовки кадров, прочитанных из потока наполовину: чтение отменили
+# (передача соединения), а тело ещё не пришло
+_unread_headers: "weakref.WeakKeyDictionary[asyncio.StreamReader, bytes]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _encode(frame_type: int, *fields: int) -> bytes:
+    frame: struct.Struct = _FRAMES[frame_type]
+    return frame.pack(frame.size - _LENGTH.size, frame_type, *fields)
+
+
+def encode_ping(req_num: int) -> bytes:
+    """Кадр PING с номером запроса."""
+    return _encode(FRAME_PING, req_num)
+
+
+def encode_pong(resp_num: int, req_num: int, client_id: int) -> bytes:
+    """Кадр PONG: номер ответа, номер запроса и номер клиента."""
+    return _encode(FRAME_PONG, resp_num, req_num, client_id)
+
+
+def encode_keepalive(resp_num: int) -> bytes:
+    """Кадр keepalive с номером ответа."""
+    return _encode(FRAME_KEEPALIVE, resp_num)
+
+
+def encode_clock(t1: int) -> bytes:
+    """Кадр запроса меток времени (clock_sync.py)."""
+    return _encode(FRAME_CLOCK, t1)
+
+
+def encode_clock_reply(t1: int, t2: int, t3: int) -> bytes:
+    """Кадр ответа с метками сервера."""
+    return _encode(FRAME_CLOCK_REPLY, t1, t2, t3)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Frame]:
+    """
+    Читает один кадр из потока.
+
+    Отмена безопасна: readexactly() ничего не забирает из буфера, пока
+    не придут все байты, а заголовок кадра, прочитанный до отмены,
+    возвращает unread_header().
+
+    Args:
+        reader: asyncio.StreamReader - поток собеседника
+
+    Returns:
+        Optional[Frame] - (тип, поля) или None, если соединение закрыто
+            ровно на границе кадра
+
+    Исключения:
+        ValueError: неизвестный тип или неверная длина кадра
+        asyncio.IncompleteReadError: соединение оборвалось посреди кадра
+    """
+    try:
+        header: bytes = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+
+    (length,) = _LENGTH.unpack(header)
+    try:
+        body: bytes = await reader.readexactly(length)
+    except asyncio.CancelledError:
+        _unread_headers[reader] = header
+        raise
+    body_struct: Optional[struct.Struct] = (
+        _BODIES.get(body[0]) if body else None
+    )
+    if body_struct is None or body_struct.size != length:
+        raise ValueError(f'Некорректный кадр длиной {length}')
+
+    frame_type, *fields = body_struct.unpack(body)
+    return frame_type, tuple(fields)
+
+
+def unread_header(reader: asyncio.StreamReader) -> bytes:
+    """
+    Заголовок кадра, который read_frame() забрал из потока перед
+    отменой (b'' - чтение отменено на границе кадра). Вместе с
+    остатком буфера это непрочитанные байты собеседника.
+
+    Args:
+        reader: asyncio.StreamReader - поток собеседника
+
+    Returns:
+        bytes - заголовок, уже отсутствующий в буфере reader
+    """
+    return _unread_headers.pop(reader, b'')
+
+
+def render_frame(frame_type: int, fields: Tuple[int, ...]) -> str:
+    """
+    Текстовая форма кадра по спецификации (для логов).
+
+    Примеры:
+        (FRAME_PING, (0,))           -> "[0] PING"
+        (FRAME_PONG, (3, 0, 1))      -> "[3/0] PONG (1)"
+        (FRAME_KEEPALIVE, (5,))      -> "[5] keepalive"
+    """
+    if frame_type == FRAME_PING:
+        return f"[{fields[0]}] PING"
+    if frame_type == FRAME_PONG:
+        return f"[{fields[0]}/{fields[1]}] PONG ({fields[2]})"
+    return f"[{fields[0]}] keepalive"
@@ -0,0 +1,127 @@
+"""
+Передача работы сервера новому процессу без простоя (hot restart).
+
+Старый процесс слушает управляющий Unix-сокет. Новый процесс подключается
+к нему и забирает работу в две фазы:
+
+1. Старый перестаёт принимать подключения и сразу передаёт слушающий
+   сокет - новый процесс начинает принимать клиентов без паузы, очередь
+   подключений ядра при этом не теряется.
+2. Старый перестаёт читать клиентов, дожидается отправки уже назначенных
+   ответов и передаёт состояние: счётчики ответов и клиентов, сокеты
+   живых клиентов и непрочитанный остаток их данных.
+
+Дескрипторы передаются через SCM_RIGHTS (socket.send_fds / recv_fds).
+
+Формат сообщения по управляющему сокету:
+    4 байта - длина JSON, 4 байта - число дескрипторов, JSON, затем
+    дескрипторы пачками по MAX_FDS_PER_MESSAGE (каждая с одним байтом данных)
+"""
+
+import json
+import socket
+import struct
+from typing import Any, Dict, List, Sequence, Tuple
+
+TAKEOVER_REQUEST: bytes = b'TAKEOVER\n'
+
+# Ядро Linux принимает не больше 253 дескрипторов в одном сообщении
+MAX_FDS_PER_MESSAGE: int = 250
+
+_HEADER = struct.Struct('!II')
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Читает ровно size байт из сокета.
+
+    Args:
+        sock: socket.socket - блокирующий Unix-сокет
+        size: int - сколько байт прочитать
+
+    Returns:
+        bytes - прочитанные данные
+
+    Исключения:
+        ConnectionError: если собеседник закрыл сокет раньше времени
+    """
+    chunks: List[bytes] = []
+    while size:
+        chunk: bytes = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('Управляющий сокет закрыт во время передачи')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(
+    sock: socket.socket, payload: Dict[str, Any], fds: Sequence[int] = ()
+) -> None:
+    """
+    Отправляет JSON-сообщение и дескрипторы по управляющему сокету.
+
+    Args:
+        sock: socket.socket - блокирующий Unix-сокет
+        payload: Dict[str, Any] - данные сообщения
+        fds: Sequence[int] - передаваемые дескрипторы
+    """
+    data: bytes = json.dumps(payload).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data), len(fds)) + data)
+    for i in range(0, len(fds), MAX_FDS_PER_MESSAGE):
+        socket.send_fds(sock, [b'F'], fds[i : i + MAX_FDS_PER_MESSAGE])
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    Принимает JSON-сообщение и дескрипторы, отправленные send_message().
+
+    Args:
+        sock: socket.socket - блокирующий Unix-сокет
+
+    Returns:
+        Tuple[Dict[str, Any], List[int]] - данные сообщения и дескрипторы
+    """
+    size, fd_count = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    payload: Dict[str, Any] = json.loads(_recv_exactly(sock, size))
+
+    fds: List[int] = []
+    while len(fds) < fd_count:
+        _, batch, _, _ = socket.recv_fds(sock, 1, MAX_FDS_PER_MESSAGE)
+        if not batch:
+            raise ConnectionError('Дескрипторы не пришли')
+        fds.extend(batch)
+    return payload, fds
+
+
+def accept_takeover(sock: socket.socket) -> bool:
+    """
+    Читает запрос нового процесса на передачу работы.
+
+    Args:
+        sock: socket.socket - принятое управляющее соединение (блокирующее)
+
+    Returns:
+        bool - True, если пришёл корректный запрос TAKEOVER
+    """
+    try:
+        return _recv_exactly(sock, len(TAKEOVER_REQUEST)) == TAKEOVER_REQUEST
+    except ConnectionError:
+        return False
+
+
+def request_takeover(path: str) -> socket.socket:
+    """
+    Подключается к управляющему сокету работающего сервера и просит
+    передать работу.
+
+    Args:
+        path: str - путь к управляющему Unix-сокету старого процесса
+
+    Returns:
+        socket.socket - соединение, по которому придут обе фазы передачи
+    """
+    sock: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    sock.sendall(TAKEOVER_REQUEST)
+    return sock
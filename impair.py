@@ -0,0 +1,422 @@
+"""
+Прокси, ухудшающий локальную сеть для замеров в плохих условиях.
+
+Все замеры идут через идеальный loopback, на котором не видно, как
+ведут себя таймауты клиента (check_timeouts) и буферизация записи
+сервера в настоящей сети. Прокси встаёт между client.py и server.py
+и для каждого направления отдельно добавляет:
+
+- задержку и её разброс (порядок байт TCP при этом сохраняется);
+- ограничение полосы, байт в секунду;
+- зависания: поток в этом направлении замирает на stall_time, в среднем
+  stall_rate раз в секунду;
+- разрывы: соединение сбрасывается (RST) в среднем reset_rate раз
+  в секунду.
+
+client.py подключается только к 127.0.0.1:8888, поэтому прокси обычно
+слушает 8888, а сервер - Unix-сокет или другой порт:
+
+    python server.py --unix /tmp/pingpong.sock --no-tcp
+    python impair.py --target-unix /tmp/pingpong.sock --latency 50 \\
+        --jitter 20 --bandwidth 64/8 --stall-rate 0/0.05 --stall-time 2000
+    python client.py 1
+
+Значение "ВВЕРХ/ВНИЗ" задаёт направления отдельно (вверх - от клиента
+к серверу), одно число - оба сразу. bench.py ставит прокси в путь сам
+(--latency и др.).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import struct
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Сколько байт читать за раз и сколько прочитанных кусков держать
+# в пути: дальше чтение останавливается, и буфер отправителя заполняется,
+# как на настоящем медленном канале
+CHUNK_SIZE: int = 64 * 1024
+MAX_IN_FLIGHT: int = 64
+
+UP: str = 'up'  # клиент -> сервер
+DOWN: str = 'down'  # сервер -> клиент
+
+Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+# Имена аргументов ухудшений (add_impairment_args)
+IMPAIRMENT_ARGS: Tuple[str, ...] = (
+    'latency',
+    'jitter',
+    'bandwidth',
+    'stall_rate',
+    'stall_time',
+    'reset_rate',
+)
+
+
+class Impairment:
+    """
+    Ухудшения одного направления.
+
+    Атрибуты:
+        latency: float - задержка доставки, секунды
+        jitter: float - разброс задержки (равномерно ±jitter), секунды
+        bandwidth: Optional[float] - полоса, байт/с (None - без ограничения)
+        stall_rate: float - зависаний в секунду (в среднем)
+        stall_time: float - длительность зависания, секунды
+        reset_rate: float - разрывов в секунду (в среднем)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        bandwidth: Optional[float] = None,
+        stall_rate: float = 0.0,
+        stall_time: float = 0.0,
+        reset_rate: float = 0.0,
+    ) -> None:
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.bandwidth: Optional[float] = bandwidth
+        self.stall_rate: float = stall_rate
+        self.stall_time: float = stall_time
+        self.reset_rate: float = reset_rate
+
+    def delay(self) -> float:
+        """Задержка очередного куска, секунды."""
+        if not self.jitter:
+            return self.latency
+        return max(
+            0.0, self.latency + random.uniform(-self.jitter, self.jitter)
+        )
+
+    def next_event(self, rate: float) -> float:
+        """
+        Через сколько секунд случится следующее событие потока с частотой
+        rate (пуассоновский поток; inf - никогда).
+        """
+        return random.expovariate(rate) if rate > 0 else float('inf')
+
+
+def reset(writer: asyncio.StreamWriter) -> None:
+    """Закрывает соединение с RST вместо FIN (SO_LINGER с нулём)."""
+    sock: Optional[socket.socket] = writer.get_extra_info('socket')
+    if sock is not None and sock.family != socket.AF_UNIX:
+        sock.setsockopt(
+            socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0)
+        )
+    writer.transport.abort()
+
+
+class ImpairmentProxy:
+    """
+    TCP-прокси с ухудшениями каналов.
+
+    Атрибуты:
+        connect: Callable[[], Awaitable[Streams]] - подключение к серверу
+        impairments: Dict[str, Impairment] - ухудшения по направлениям
+        stats: Dict[str, int] - соединений, байт, зависаний и разрывов
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Streams]],
+        up: Impairment,
+        down: Impairment,
+    ) -> None:
+        """
+        Args:
+            connect: Callable[[], Awaitable[Streams]] - подключение к
+                настоящему серверу
+            up: Impairment - ухудшения направления клиент -> сервер
+            down: Impairment - ухудшения направления сервер -> клиент
+        """
+        self.connect: Callable[[], Awaitable[Streams]] = connect
+        self.impairments: Dict[str, Impairment] = {UP: up, DOWN: down}
+        self.stats: Dict[str, int] = dict.fromkeys(
+            [
+                'connections',
+                f'{UP}_bytes',
+                f'{DOWN}_bytes',
+                f'{UP}_stalls',
+                f'{DOWN}_stalls',
+                f'{UP}_resets',
+                f'{DOWN}_resets',
+            ],
+            0,
+        )
+
+    async def handle(
+        self,
+        client_reader: asyncio.StreamReader,
+        client_writer: asyncio.StreamWriter,
+    ) -> None:
+        """Одно соединение клиента: пара каналов до сервера и обратно."""
+        try:
+            server_reader, server_writer = await self.connect()
+        except OSError:
+            reset(client_writer)
+            return
+        self.stats['connections'] += 1
+        writers: List[asyncio.StreamWriter] = [client_writer, server_writer]
+        tasks: List[asyncio.Task[None]] = [
+            asyncio.create_task(
+                self.pipe(client_reader, server_writer, UP, writers)
+            ),
+            asyncio.create_task(
+                self.pipe(server_reader, client_writer, DOWN, writers)
+            ),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            for writer in writers:
+                writer.close()
+
+    async def pipe(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        direction: str,
+        writers: List[asyncio.StreamWriter],
+    ) -> None:
+        """
+        Переносит байты одного направления с задержкой, полосой,
+        зависаниями и разрывами.
+
+        Чтение и доставка - разные задачи: чтение кладёт куски в очередь
+        с моментом получения, доставка ждёт момента доставки куска. Так
+        задержка не снижает пропускную способность, как в настоящей сети.
+
+        Args:
+            reader: asyncio.StreamReader - откуда читать
+            writer: asyncio.StreamWriter - куда доставлять
+            direction: str - UP или DOWN
+            writers: List[asyncio.StreamWriter] - обе стороны соединения
+                (для разрыва)
+        """
+        imp: Impairment = self.impairments[direction]
+        queue: "asyncio.Queue[Tuple[float, bytes]]" = asyncio.Queue(
+            MAX_IN_FLIGHT
+        )
+
+        async def read() -> None:
+            while True:
+                try:
+                    data: bytes = await reader.read(CHUNK_SIZE)
+                except (ConnectionError, OSError):
+                    data = b''  # Разрыв доставляется как конец потока
+                await queue.put((time.monotonic(), data))
+                if not data:
+                    return
+
+        async def reset_later() -> None:
+            await asyncio.sleep(imp.next_event(imp.reset_rate))
+            self.stats[f'{direction}_resets'] += 1
+            for side in writers:
+                reset(side)
+
+        tasks: List[asyncio.Task[None]] = [asyncio.create_task(read())]
+        if imp.reset_rate > 0:
+            tasks.append(asyncio.create_task(reset_later()))
+        # Куски доставляются по порядку и не раньше, чем освободится канал
+        last_due: float = 0.0
+        link_free: float = 0.0
+        next_stall: float = time.monotonic() + imp.next_event(imp.stall_rate)
+        try:
+            while True:
+                received, data = await queue.get()
+                if not data:
+                    if writer.can_write_eof():
+                        writer.write_eof()
+                    return
+
+                now: float = time.monotonic()
+                if now >= next_stall:
+                    self.stats[f'{direction}_stalls'] += 1
+                    await asyncio.sleep(imp.stall_time)
+                    now = time.monotonic()
+                    next_stall = now + imp.next_event(imp.stall_rate)
+                    link_free = max(link_free, now)
+
+                due: float = max(received + imp.delay(), last_due, link_free)
+                last_due = due
+                if imp.bandwidth:
+                    link_free = due + len(data) / imp.bandwidth
+                if due > now:
+                    await asyncio.sleep(due - now)
+                writer.write(data)
+                self.stats[f'{direction}_bytes'] += len(data)
+                await writer.drain()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def pair(value: str) -> Tuple[float, float]:
+    """
+    Аргумент "ВВЕРХ/ВНИЗ" или одно число для обоих направлений.
+
+    Returns:
+        Tuple[float, float] - значения вверх и вниз
+    """
+    up, _, down = value.partition('/')
+    return float(up), float(down or up)
+
+
+def impairments(args: argparse.Namespace) -> Tuple[Impairment, Impairment]:
+    """
+    Ухудшения обоих направлений из аргументов командной строки
+    (миллисекунды и КБ/с переводятся в секунды и байт/с).
+    """
+    result: List[Impairment] = []
+    for i in range(2):
+        bandwidth: float = args.bandwidth[i] * 1024
+        result.append(
+            Impairment(
+                latency=args.latency[i] / 1000,
+                jitter=args.jitter[i] / 1000,
+                bandwidth=bandwidth or None,
+                stall_rate=args.stall_rate[i],
+                stall_time=args.stall_time[i] / 1000,
+                reset_rate=args.reset_rate[i],
+            )
+        )
+    return result[0], result[1]
+
+
+def add_impairment_args(parser: argparse.ArgumentParser) -> None:
+    """Аргументы ухудшений (общие для impair.py и bench.py)."""
+    parser.add_argument(
+        '--latency',
+        type=pair,
+        default=(0.0, 0.0),
+        metavar='МС',
+        help='задержка в одну сторону, мс',
+    )
+    parser.add_argument(
+        '--jitter',
+        type=pair,
+        default=(0.0, 0.0),
+        metavar='МС',
+        help='разброс задержки, мс',
+    )
+    parser.add_argument(
+        '--bandwidth',
+        type=pair,
+        default=(0.0, 0.0),
+        metavar='КБ/С',
+        help='полоса, КБ/с (0 - без ограничения)',
+    )
+    parser.add_argument(
+        '--stall-rate',
+        type=pair,
+        default=(0.0, 0.0),
+        metavar='1/С',
+        help='зависаний в секунду',
+    )
+    parser.add_argument(
+        '--stall-time',
+        type=pair,
+        default=(1000.0, 1000.0),
+        metavar='МС',
+        help='длительность зависания, мс',
+    )
+    parser.add_argument(
+        '--reset-rate',
+        type=pair,
+        default=(0.0, 0.0),
+        metavar='1/С',
+        help='разрывов соединения в секунду',
+    )
+
+
+def impairment_argv(args: argparse.Namespace) -> List[str]:
+    """
+    Аргументы impair.py, повторяющие ухудшения из args (для запуска
+    прокси отдельным процессом); пустой список, если ухудшений нет.
+    """
+    if not any(
+        any(getattr(args, name))
+        for name in IMPAIRMENT_ARGS
+        if name != 'stall_time'
+    ):
+        return []
+    argv: List[str] = []
+    for name in IMPAIRMENT_ARGS:
+        up, down = getattr(args, name)
+        argv += [f"--{name.replace('_', '-')}", f"{up}/{down}"]
+    return argv
+
+
+async def serve(
+    proxy: ImpairmentProxy,
+    host: str,
+    port: int,
+    unix_path: Optional[str] = None,
+) -> None:
+    """
+    Слушает host:port (или Unix-сокет unix_path) и проксирует
+    подключения до остановки.
+    """
+    server: asyncio.Server
+    if unix_path:
+        # Файл от прошлого запуска мешает bind()
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        server = await asyncio.start_unix_server(proxy.handle, unix_path)
+        print(f"Прокси слушает Unix-сокет {unix_path}")
+    else:
+        server = await asyncio.start_server(
+            proxy.handle, host, port, reuse_address=True
+        )
+        print(f"Прокси слушает {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Прокси с задержкой, полосой, зависаниями и разрывами'
+    )
+    parser.add_argument('--listen-host', default='127.0.0.1')
+    parser.add_argument('--listen-port', type=int, default=8888)
+    parser.add_argument(
+        '--listen-unix',
+        metavar='PATH',
+        help='слушать Unix-сокет вместо TCP (замер Unix-сокета целиком)',
+    )
+    parser.add_argument('--target-host', default='127.0.0.1')
+    parser.add_argument(
+        '--target-port', type=int, help='TCP-порт настоящего сервера'
+    )
+    parser.add_argument(
+        '--target-unix', metavar='PATH', help='Unix-сокет настоящего сервера'
+    )
+    add_impairment_args(parser)
+    args = parser.parse_args()
+    if (args.target_port is None) == (args.target_unix is None):
+        parser.error('нужен ровно один из --target-port и --target-unix')
+
+    connect: Callable[[], Awaitable[Streams]] = (
+        (lambda: asyncio.open_unix_connection(args.target_unix))
+        if args.target_unix
+        else (
+            lambda: asyncio.open_connection(args.target_host, args.target_port)
+        )
+    )
+    proxy: ImpairmentProxy = ImpairmentProxy(connect, *impairments(args))
+    try:
+        asyncio.run(
+            serve(proxy, args.listen_host, args.listen_port, args.listen_unix)
+        )
+    except KeyboardInterrupt:
+        print(f"Статистика прокси: {proxy.stats}")
@@ -0,0 +1,361 @@
+"""
+Живая статистика по логам во время прогона.
+
+Следит за server.log и всеми client_N.log в папке: помнит смещение в каждом
+файле и при обновлении читает и разбирает только дописанные байты. Файл,
+очищенный при запуске (open(..., 'w') в __main__) или удалённый и созданный
+заново (a_run.py), читается с начала.
+
+События раскладываются по посекундным ячейкам кольца на 60 секунд. В каждой
+ячейке - счётчики и гистограмма RTT с геометрическими границами, поэтому
+окна 10 с и 60 с считаются суммой ячеек: стоимость обновления зависит только
+от числа новых байт, а не от длины логов.
+
+Показатели окна:
+- ответов сервера в секунду и PING клиентов в секунду;
+- RTT клиентов: p50, p90, p99;
+- доля проигнорированных сервером запросов и доля таймаутов у клиентов;
+- число запросов, сброшенных сервером из-за перегрузки.
+
+Запуск:
+    python log_follower.py            # логи в текущей папке, раз в секунду
+    python log_follower.py --dir logs --interval 2
+"""
+
+import argparse
+import bisect
+import datetime
+import glob
+import os
+import time
+from typing import Dict, List, Optional
+
+SLOTS: int = 60  # Кольцо на 60 секунд - самое длинное окно
+WINDOWS: List[int] = [10, 60]
+
+# Границы корзин RTT: от 1 мс до ~60 с, каждая следующая на 10% больше
+RTT_BOUNDS: List[float] = []
+_bound: float = 0.001
+while _bound < 60:
+    RTT_BOUNDS.append(_bound)
+    _bound *= 1.1
+
+# Виды событий в логах
+SERVER_RESPONSE: str = 'server_response'
+SERVER_IGNORED: str = 'server_ignored'
+SERVER_SHED: str = 'server_shed'
+CLIENT_SENT: str = 'client_sent'
+CLIENT_RESPONSE: str = 'client_response'
+CLIENT_TIMEOUT: str = 'client_timeout'
+CLIENT_KEEPALIVE: str = 'client_keepalive'
+
+KINDS: List[str] = [
+    SERVER_RESPONSE,
+    SERVER_IGNORED,
+    SERVER_SHED,
+    CLIENT_SENT,
+    CLIENT_RESPONSE,
+    CLIENT_TIMEOUT,
+    CLIENT_KEEPALIVE,
+]
+
+
+class _Slot:
+    """Счётчики и гистограмма RTT за одну секунду."""
+
+    def __init__(self) -> None:
+        self.second: int = -1
+        self.counts: Dict[str, int] = dict.fromkeys(KINDS, 0)
+        self.rtt: List[int] = [0] * (len(RTT_BOUNDS) + 1)
+
+    def reset(self, second: int) -> None:
+        self.second = second
+        for kind in KINDS:
+            self.counts[kind] = 0
+        for i in range(len(self.rtt)):
+            self.rtt[i] = 0
+
+
+class RollingStats:
+    """
+    Скользящая статистика за последние SLOTS секунд.
+
+    Событие кладётся в ячейку своей секунды; ячейка, в которой лежит
+    секунда старше кольца, обнуляется при первом обращении.
+    """
+
+    def __init__(self) -> None:
+        self.slots: List[_Slot] = [_Slot() for _ in range(SLOTS)]
+
+    def add(self, ts: float, kind: str, rtt: Optional[float] = None) -> None:
+        """
+        Учитывает одно событие.
+
+        Args:
+            ts: float - время события (unix time)
+            kind: str - вид события (одна из констант KINDS)
+            rtt: Optional[float] - RTT ответа клиенту, секунды
+        """
+        second: int = int(ts)
+        slot: _Slot = self.slots[second % SLOTS]
+        if slot.second != second:
+            if slot.second > second:
+                return  # Событие старше окна
+            slot.reset(second)
+        slot.counts[kind] += 1
+        if rtt is not None:
+            slot.rtt[bisect.bisect_left(RTT_BOUNDS, rtt)] += 1
+
+    def window(self, seconds: int, now: float) -> Dict[str, float]:
+        """
+        Сводка за последние seconds секунд.
+
+        Args:
+            seconds: int - длина окна (не больше SLOTS)
+            now: float - текущее время (unix time)
+
+        Returns:
+            Dict[str, float] - частоты, доли и перцентили RTT окна
+        """
+        newest: int = int(now)
+        counts: Dict[str, int] = dict.fromkeys(KINDS, 0)
+        rtt: List[int] = [0] * (len(RTT_BOUNDS) + 1)
+        for slot in self.slots:
+            if newest - seconds < slot.second <= newest:
+                for kind in KINDS:
+                    counts[kind] += slot.counts[kind]
+                for i, n in enumerate(slot.rtt):
+                    rtt[i] += n
+
+        requests: int = (
+            counts[SERVER_RESPONSE]
+            + counts[SERVER_IGNORED]
+            + counts[SERVER_SHED]
+        )
+        finished: int = counts[CLIENT_RESPONSE] + counts[CLIENT_TIMEOUT]
+        summary: Dict[str, float] = {
+            'responses_per_sec': counts[SERVER_RESPONSE] / seconds,
+            'pings_per_sec': counts[CLIENT_SENT] / seconds,
+            'ignore_rate': counts[SERVER_IGNORED] / max(requests, 1),
+            'timeout_rate': counts[CLIENT_TIMEOUT] / max(finished, 1),
+            'shed': counts[SERVER_SHED],
+        }
+        for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+            summary[name] = _histogram_percentile(rtt, fraction)
+        return summary
+
+
+def _histogram_percentile(histogram: List[int], fraction: float) -> float:
+    """Верхняя граница корзины, в которую попадает перцентиль (секунды)."""
+    total: int = sum(histogram)
+    if not total:
+        return 0.0
+    rank: float = total * fraction
+    seen: int = 0
+    for i, n in enumerate(histogram):
+        seen += n
+        if seen >= rank:
+            return RTT_BOUNDS[min(i, len(RTT_BOUNDS) - 1)]
+    return RTT_BOUNDS[-1]
+
+
+class FollowedFile:
+    """
+    Читатель дописываемого лог-файла.
+
+    Помнит смещение, inode и недописанный хвост последней строки.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.offset: int = 0
+        self.inode: Optional[int] = None
+        self.tail: bytes = b''
+
+    def read_new_lines(self) -> List[str]:
+        """
+        Возвращает строки, дописанные с прошлого вызова.
+
+        Returns:
+            List[str] - новые полные строки (без \\n)
+        """
+        try:
+            stat: os.stat_result = os.stat(self.path)
+        except FileNotFoundError:
+            self.inode = None
+            return []
+
+        # Файл пересоздан или очищен - начинаем сначала
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode = stat.st_ino
+            self.offset = 0
+            self.tail = b''
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data: bytes = f.read(stat.st_size - self.offset)
+        self.offset += len(data)
+
+        *lines, self.tail = (self.tail + data).split(b'\n')
+        return [line.decode('utf-8', 'replace') for line in lines]
+
+
+class LogFollower:
+    """Следит за логами сервера и клиентов и ведёт RollingStats."""
+
+    def __init__(self, directory: str = '.') -> None:
+        """
+        Args:
+            directory: str - папка с server.log и client_N.log
+        """
+        self.directory: str = directory
+        self.files: Dict[str, FollowedFile] = {}
+        self.stats: RollingStats = RollingStats()
+        # Кэш "дата -> unix time полуночи": дата в логах меняется раз в сутки
+        self._midnights: Dict[str, float] = {}
+
+    def refresh(self) -> int:
+        """
+        Дочитывает все логи и учитывает новые события.
+
+        Returns:
+            int - сколько новых строк разобрано
+        """
+        paths: List[str] = [os.path.join(self.directory, 'server.log')]
+        paths += glob.glob(os.path.join(self.directory, 'client_*.log'))
+
+        parsed: int = 0
+        for path in paths:
+            followed: Optional[FollowedFile] = self.files.get(path)
+            if followed is None:
+                followed = self.files[path] = FollowedFile(path)
+            is_server: bool = os.path.basename(path) == 'server.log'
+            for line in followed.read_new_lines():
+                try:
+                    if is_server:
+                        self.parse_server_line(line)
+                    else:
+                        self.parse_client_line(line)
+                except ValueError:
+                    # Битая строка (например, оборванная при остановке)
+                    continue
+                parsed += 1
+        return parsed
+
+    def timestamp(self, date_str: str, time_str: str) -> float:
+        """
+        Переводит дату и время из лога ("ГГГГ-ММ-ДД", "ЧЧ:ММ:СС.ммм")
+        в unix time без strptime.
+        """
+        midnight: Optional[float] = self._midnights.get(date_str)
+        if midnight is None:
+            midnight = datetime.datetime(
+                int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])
+            ).timestamp()
+            self._midnights[date_str] = midnight
+        return midnight + _seconds_of_day(time_str)
+
+    def parse_server_line(self, line: str) -> None:
+        """
+        Разбирает строку server.log.
+
+        Форматы:
+            дата;время;запрос;(проигнорировано)
+            дата;время;запрос;(перегрузка)
+            дата;время;запрос;(повтор, ещё в пути)
+            дата;время_получения;запрос;время_отправки;ответ
+
+        Повтор ещё не отвеченного запроса не считается: это не новый
+        запрос, и ответ на него - ответ на исходный.
+        """
+        fields: List[str] = line.split(';')
+        if len(fields) == 4 and fields[3] == '(повтор, ещё в пути)':
+            return
+        if len(fields) == 4:
+            kind: str = (
+                SERVER_SHED if fields[3] == '(перегрузка)' else SERVER_IGNORED
+            )
+            self.stats.add(self.timestamp(fields[0], fields[1]), kind)
+        elif len(fields) == 5:
+            self.stats.add(
+                self.timestamp(fields[0], fields[3]), SERVER_RESPONSE
+            )
+
+    def parse_client_line(self, line: str) -> None:
+        """
+        Разбирает строку client_N.log.
+
+        Форматы:
+            дата;время_отправки;запрос
+            дата;время_отправки;запрос;(повтор)
+            дата;;;время_получения;keepalive
+            дата;время_отправки;запрос;время_получения;ответ
+            дата;время_отправки;запрос;время_таймаута;(таймаут)
+
+        Повтор запроса не считается отправкой: ответ на него - ответ
+        на исходный.
+        """
+        fields: List[str] = line.split(';')
+        if len(fields) == 3:
+            self.stats.add(self.timestamp(fields[0], fields[1]), CLIENT_SENT)
+        elif len(fields) == 5:
+            recv_ts: float = self.timestamp(fields[0], fields[3])
+            if not fields[1]:
+                self.stats.add(recv_ts, CLIENT_KEEPALIVE)
+            elif fields[4] == '(таймаут)':
+                self.stats.add(recv_ts, CLIENT_TIMEOUT)
+            else:
+                rtt: float = _seconds_of_day(fields[3]) - _seconds_of_day(
+                    fields[1]
+                )
+                if rtt < 0:  # Ответ пришёл после полуночи
+                    rtt += 86400
+                self.stats.add(recv_ts, CLIENT_RESPONSE, rtt)
+
+
+def _seconds_of_day(time_str: str) -> float:
+    """"ЧЧ:ММ:СС.ммм" -> секунды от полуночи."""
+    return (
+        int(time_str[0:2]) * 3600
+        + int(time_str[3:5]) * 60
+        + float(time_str[6:])
+    )
+
+
+def format_window(seconds: int, summary: Dict[str, float]) -> str:
+    """Одна строка отчёта по окну."""
+    return (
+        f"{seconds}с: {summary['responses_per_sec']:.1f} отв/с, "
+        f"{summary['pings_per_sec']:.1f} PING/с, "
+        f"RTT p50/p90/p99 {summary['p50'] * 1000:.0f}/"
+        f"{summary['p90'] * 1000:.0f}/{summary['p99'] * 1000:.0f} мс, "
+        f"игнор {summary['ignore_rate']:.1%}, "
+        f"таймаут {summary['timeout_rate']:.1%}, "
+        f"перегрузка {summary['shed']:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Живая статистика по логам')
+    parser.add_argument('--dir', default='.', help='папка с логами')
+    parser.add_argument(
+        '--interval', type=float, default=1.0, help='период обновления, с'
+    )
+    args = parser.parse_args()
+
+    follower: LogFollower = LogFollower(args.dir)
+    try:
+        while True:
+            follower.refresh()
+            now: float = time.time()
+            print(
+                ' | '.join(
+                    format_window(w, follower.stats.window(w, now))
+                    for w in WINDOWS
+                )
+            )
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
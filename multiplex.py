@@ -0,0 +1,68 @@
+"""
+Несколько логических клиентов в одном соединении (необязательный режим).
+
+Режим согласуется первым сообщением, как и бинарный: клиент шлёт строку
+MUX_HANDSHAKE, сервер отвечает MUX_HANDSHAKE_ACK. Дальше каждая строка
+в обе стороны начинается с номера канала и пробела:
+
+    КЛИЕНТ -> СЕРВЕР: "7 [0] PING\\n"
+    СЕРВЕР -> КЛИЕНТ: "7 [3/0] PONG (12)\\n"
+    СЕРВЕР -> КЛИЕНТ: "* [5] keepalive\\n"    (всем каналам соединения)
+
+Канал - это отдельный клиент: сервер выдаёт ему свой номер клиента при
+первом сообщении, ведёт для него свои лимиты и пишет лог так же, как для
+отдельного соединения. Так тысячи клиентов моделируются без тысяч сокетов.
+"""
+
+import asyncio
+from typing import Tuple
+
+MUX_HANDSHAKE: bytes = b'MUX/1\n'
+MUX_HANDSHAKE_ACK: bytes = b'MUX/1 OK\n'
+
+# Вместо номера канала: сообщение для всех каналов соединения
+BROADCAST: str = '*'
+
+
+def split_channel(line: str) -> Tuple[str, str]:
+    """
+    Отделяет номер канала от сообщения.
+
+    Args:
+        line: str - строка без "\\n", например "7 [0] PING"
+
+    Returns:
+        Tuple[str, str] - номер канала (или BROADCAST) и сообщение
+
+    Исключения:
+        ValueError: в строке нет номера канала
+    """
+    channel, sep, message = line.partition(' ')
+    if not sep or not (channel == BROADCAST or channel.isdigit()):
+        raise ValueError(f'Нет номера канала: {line!r}')
+    return channel, message
+
+
+class ChannelWriter:
+    """
+    Запись в общее соединение от имени одного канала.
+
+    Подставляет номер канала в начало каждой строки, поэтому код,
+    написанный для отдельного соединения (SimpleClient.send_pings),
+    работает с каналом без изменений.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, channel: int) -> None:
+        """
+        Args:
+            writer: asyncio.StreamWriter - общее соединение с сервером
+            channel: int - номер канала
+        """
+        self.writer: asyncio.StreamWriter = writer
+        self.prefix: bytes = f"{channel} ".encode()
+
+    def write(self, data: bytes) -> None:
+        self.writer.write(self.prefix + data)
+
+    async def drain(self) -> None:
+        await self.writer.drain()
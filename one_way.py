@@ -0,0 +1,207 @@
+"""
+Разбор RTT из логов на путь запроса, работу сервера и путь ответа.
+
+Клиент и сервер пишут логи по своим часам, поэтому напрямую из них
+вычитается только полный RTT. Клиент, запущенный с --clock-sync, пишет
+рядом с client_N.log оценки смещения часов сервера (client_N.clock,
+см. clock_sync.py). По ним моменты клиента переводятся на часы сервера,
+и каждый ответ из client_N.log, найденный в server.log по тексту
+"[номер_ответа/номер_запроса] PONG (ID_клиента)", раскладывается так:
+
+    запрос   = получение сервером - (отправка клиентом + смещение)
+    сервер   = отправка ответа сервером - получение сервером
+    ответ    = (получение клиентом + смещение) - отправка ответа сервером
+
+Время в логах - с точностью до миллисекунды, и ошибка оценки смещения
+не меньше половины асимметрии путей, поэтому отдельные значения могут
+быть слегка отрицательными; смысл имеют распределения.
+
+Запуск:
+    python one_way.py                   # логи в текущей папке
+    python one_way.py --dir logs        # server.log и client_N.* в logs
+"""
+
+import argparse
+import glob
+import os
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from analysis import parse_time, percentile
+from clock_sync import ClockRecord, load_records, offset_at
+
+STAGES: Tuple[str, ...] = ('request', 'server', 'response', 'rtt')
+STAGE_NAMES: Dict[str, str] = {
+    'request': 'запрос',
+    'server': 'сервер',
+    'response': 'ответ',
+    'rtt': 'RTT',
+}
+
+# Отметка, которой сервер помечает ответ, повторённый из кэша
+REPLAY_MARK: str = ' (повтор)'
+
+
+class ServerEntry(NamedTuple):
+    """Строка server.log: получение запроса и отправка ответа, unix time."""
+
+    received: float
+    sent: float
+
+
+def load_server_log(path: str) -> Dict[str, ServerEntry]:
+    """
+    Ответы сервера по их тексту.
+
+    Формат строки: дата;время_получения;запрос;время_отправки;ответ.
+    Проигнорированные запросы и повторы из кэша пропускаются: повтор
+    отправляет тот же текст, а исходные моменты - у первой строки.
+
+    Args:
+        path: str - путь к server.log
+
+    Returns:
+        Dict[str, ServerEntry] - текст ответа -> моменты сервера
+    """
+    entries: Dict[str, ServerEntry] = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fields: List[str] = line.rstrip('\n').split(';')
+            if len(fields) != 5 or 'PONG' not in fields[4]:
+                continue
+            response: str = fields[4]
+            if response.endswith(REPLAY_MARK) or response in entries:
+                continue
+            try:
+                received: float = parse_time(fields[0], fields[1])
+                sent: float = parse_time(fields[0], fields[3])
+            except ValueError:
+                continue  # Оборванная строка
+            if sent < received:  # Ответ ушёл после полуночи
+                sent += 86400
+            entries[response] = ServerEntry(received, sent)
+    return entries
+
+
+def breakdown_client(
+    log_path: str,
+    server: Dict[str, ServerEntry],
+    records: List[ClockRecord],
+) -> Dict[str, List[float]]:
+    """
+    Раскладывает ответы одного клиента по этапам.
+
+    Args:
+        log_path: str - путь к client_N.log
+        server: Dict[str, ServerEntry] - ответы сервера по тексту
+        records: List[ClockRecord] - оценки смещения часов клиента
+
+    Returns:
+        Dict[str, List[float]] - этап -> длительности, секунды
+    """
+    stages: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    times: List[float] = [record.local for record in records]
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            fields: List[str] = line.rstrip('\n').split(';')
+            if len(fields) != 5 or not fields[1]:
+                continue  # Отправка без ответа или keepalive
+            entry: Optional[ServerEntry] = server.get(fields[4])
+            if entry is None:
+                continue  # Таймаут или ответ не из этого server.log
+            try:
+                sent: float = parse_time(fields[0], fields[1])
+                received: float = parse_time(fields[0], fields[3])
+            except ValueError:
+                continue
+            if received < sent:
+                received += 86400
+            offset: Optional[float] = offset_at(records, times, sent)
+            if offset is None:
+                continue
+            # Смещение в мкс: моменты клиента -> часы сервера
+            shift: float = offset / 1e6
+            stages['request'].append(entry.received - (sent + shift))
+            stages['server'].append(entry.sent - entry.received)
+            stages['response'].append((received + shift) - entry.sent)
+            stages['rtt'].append(received - sent)
+    return stages
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    Returns:
+        Dict[str, float] - p50/p90/p99 этапа, мс
+    """
+    values = sorted(values)
+    return {
+        key: percentile(values, fraction) * 1000
+        for key, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+    }
+
+
+def report(title: str, stages: Dict[str, List[float]]) -> None:
+    """Печатает перцентили этапов одной группой."""
+    print(f"{title} (ответов: {len(stages['rtt'])})")
+    for stage in STAGES:
+        summary: Dict[str, float] = summarize(stages[stage])
+        print(
+            f"  {STAGE_NAMES[stage]:<8}"
+            + "".join(
+                f"{key} {value:>8.1f} мс  " for key, value in summary.items()
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='RTT по этапам: путь запроса, сервер, путь ответа'
+    )
+    parser.add_argument(
+        '--dir', default='.', help='папка с server.log и client_N.log/.clock'
+    )
+    parser.add_argument(
+        '--per-client',
+        action='store_true',
+        help='печатать разбивку каждого клиента',
+    )
+    args = parser.parse_args()
+
+    server_log: str = os.path.join(args.dir, 'server.log')
+    if not os.path.exists(server_log):
+        sys.exit(f"В {args.dir} нет server.log")
+    server_entries: Dict[str, ServerEntry] = load_server_log(server_log)
+
+    total: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    skipped: List[str] = []
+    for log_path in sorted(glob.glob(os.path.join(args.dir, 'client_*.log'))):
+        records: List[ClockRecord] = load_records(
+            log_path[: -len('.log')] + '.clock'
+        )
+        name: str = os.path.basename(log_path)
+        if not records:
+            skipped.append(name)
+            continue
+        stages: Dict[str, List[float]] = breakdown_client(
+            log_path, server_entries, records
+        )
+        if not stages['rtt']:
+            continue
+        for stage in STAGES:
+            total[stage].extend(stages[stage])
+        if args.per_client:
+            last: ClockRecord = records[-1]
+            report(
+                f"{name}: смещение {last.offset / 1000:+.3f} мс, "
+                f"дрейф {last.skew:+.1f} ppm",
+                stages,
+            )
+
+    if skipped:
+        print(
+            f"Без оценки часов (нужен client.py --clock-sync): "
+            f"{', '.join(skipped)}"
+        )
+    if not total['rtt']:
+        sys.exit("Нет ответов, найденных и в client_N.log, и в server.log")
+    report('Все клиенты', total)
@@ -0,0 +1,309 @@
+"""
+Повтор записанного трафика клиентов на свежем сервере.
+
+Читает client_N.log из папки, восстанавливает по ним последовательность
+PING каждого клиента с исходными моментами отправки и отправляет её
+серверу: каждому клиенту - своё соединение, интервалы между отправками
+как в записи (или ускоренные в --speed раз, или вообще без пауз).
+В конце сравнивает распределение RTT повтора с записанным.
+
+Так регрессионный замер производительности опирается на реальный трафик,
+а не на синтетические random.uniform(0.3, 3.0).
+
+Запуск:
+    python replay.py --dir logs                  # сервер уже запущен
+    python replay.py --dir logs --speed 10       # в 10 раз быстрее
+    python replay.py --dir logs --asap --spawn   # без пауз, свой сервер
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from analysis import parse_time, percentile
+from bench import SERVER_SCRIPT, Connector, tcp_connector, wait_ready
+
+# Как у клиента: ответ, не пришедший за 5 секунд, считается таймаутом
+RESPONSE_TIMEOUT: float = 5.0
+
+
+class ClientTrace:
+    """
+    Записанный трафик одного клиента.
+
+    Атрибуты:
+        path: str - путь к client_N.log
+        sends: List[Tuple[float, int]] - (время отправки unix time,
+            номер запроса) в порядке записи
+        rtts: List[float] - записанные RTT ответов, секунды
+        timeouts: int - записанные таймауты
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.sends: List[Tuple[float, int]] = []
+        self.rtts: List[float] = []
+        self.timeouts: int = 0
+
+
+def load_trace(path: str) -> ClientTrace:
+    """
+    Разбирает client_N.log.
+
+    Форматы строк:
+        дата;время_отправки;запрос
+        дата;время_отправки;запрос;(повтор)
+        дата;;;время_получения;keepalive
+        дата;время_отправки;запрос;время_получения;ответ
+        дата;время_отправки;запрос;время_таймаута;(таймаут)
+
+    Повторы запросов не воспроизводятся: клиент отправил их сам, без
+    ответа на исходный запрос, а не по сценарию нагрузки.
+
+    Args:
+        path: str - путь к логу клиента
+
+    Returns:
+        ClientTrace - отправки и записанные RTT клиента
+    """
+    trace: ClientTrace = ClientTrace(path)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fields: List[str] = line.rstrip('\n').split(';')
+            try:
+                if len(fields) == 3:
+                    req_num: int = int(fields[2].split('[')[1].split(']')[0])
+                    trace.sends.append(
+                        (parse_time(fields[0], fields[1]), req_num)
+                    )
+                elif len(fields) == 5 and fields[1]:
+                    if fields[4] == '(таймаут)':
+                        trace.timeouts += 1
+                        continue
+                    sent: float = parse_time(fields[0], fields[1])
+                    received: float = parse_time(fields[0], fields[3])
+                    if received < sent:  # Ответ пришёл после полуночи
+                        received += 86400
+                    trace.rtts.append(received - sent)
+            except (ValueError, IndexError):
+                continue  # Оборванная строка
+    return trace
+
+
+def load_traces(directory: str) -> List[ClientTrace]:
+    """Все client_N.log папки, в которых есть хотя бы одна отправка."""
+    paths: List[str] = sorted(
+        glob.glob(os.path.join(directory, 'client_*.log'))
+    )
+    return [trace for trace in map(load_trace, paths) if trace.sends]
+
+
+async def replay_client(
+    trace: ClientTrace,
+    connect: Connector,
+    origin: float,
+    started: float,
+    speed: Optional[float],
+) -> Tuple[List[float], int]:
+    """
+    Повторяет отправки одного клиента по своему соединению.
+
+    Args:
+        trace: ClientTrace - записанный трафик клиента
+        connect: Connector - функция подключения к серверу
+        origin: float - время первой отправки во всей записи (unix time)
+        started: float - момент начала повтора (perf_counter)
+        speed: Optional[float] - во сколько раз ускорить паузы
+            (None - отправлять без пауз)
+
+    Returns:
+        Tuple[List[float], int] - RTT полученных ответов и число таймаутов
+    """
+    reader, writer = await connect()
+    sent_at: Dict[int, float] = {}
+    rtts: List[float] = []
+
+    async def receive() -> None:
+        while True:
+            line: bytes = await reader.readline()
+            if not line:
+                return
+            if b'PONG' not in line:
+                continue  # keepalive
+            received: float = time.perf_counter()
+            try:
+                req_num: int = int(line.split(b'/')[1].split(b']')[0])
+            except (ValueError, IndexError):
+                continue
+            sent: Optional[float] = sent_at.pop(req_num, None)
+            if sent is not None:
+                rtts.append(received - sent)
+
+    receiver: asyncio.Task[None] = asyncio.create_task(receive())
+    try:
+        for send_time, req_num in trace.sends:
+            if speed is not None:
+                due: float = started + (send_time - origin) / speed
+                delay: float = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            sent_at[req_num] = time.perf_counter()
+            writer.write(f"[{req_num}] PING\n".encode())
+            await writer.drain()
+
+        # Ждём ответы на последние запросы, но не дольше таймаута клиента
+        deadline: float = time.perf_counter() + RESPONSE_TIMEOUT
+        while sent_at and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+    finally:
+        receiver.cancel()
+        writer.close()
+
+    # Ответ позже таймаута клиент тоже засчитал бы таймаутом
+    in_time: List[float] = [rtt for rtt in rtts if rtt <= RESPONSE_TIMEOUT]
+    return in_time, len(sent_at) + len(rtts) - len(in_time)
+
+
+async def replay(
+    traces: List[ClientTrace], connect: Connector, speed: Optional[float]
+) -> Tuple[List[float], int, float]:
+    """
+    Повторяет трафик всех клиентов одновременно.
+
+    Returns:
+        Tuple[List[float], int, float] - RTT, таймауты и длительность
+            повтора, секунды
+    """
+    await wait_ready(connect)
+    origin: float = min(trace.sends[0][0] for trace in traces)
+    started: float = time.perf_counter()
+    results: List[Tuple[List[float], int]] = await asyncio.gather(
+        *(
+            replay_client(trace, connect, origin, started, speed)
+            for trace in traces
+        )
+    )
+    elapsed: float = time.perf_counter() - started
+    rtts: List[float] = [rtt for client, _ in results for rtt in client]
+    return rtts, sum(timeouts for _, timeouts in results), elapsed
+
+
+def summarize(rtts: List[float], timeouts: int) -> Dict[str, float]:
+    """
+    Сводка распределения RTT.
+
+    Returns:
+        Dict[str, float] - число ответов, p50/p90/p99 и среднее (мс),
+            доля таймаутов
+    """
+    rtts = sorted(rtts)
+    total: int = len(rtts) + timeouts
+    if not rtts:
+        return {'count': 0, 'timeout_rate': timeouts / max(total, 1)}
+    return {
+        'count': len(rtts),
+        'p50': percentile(rtts, 0.5) * 1000,
+        'p90': percentile(rtts, 0.9) * 1000,
+        'p99': percentile(rtts, 0.99) * 1000,
+        'mean': statistics.fmean(rtts) * 1000,
+        'timeout_rate': timeouts / total,
+    }
+
+
+def report(original: Dict[str, float], replayed: Dict[str, float]) -> None:
+    """Печатает записанное и повторённое распределения рядом."""
+    print(f"{'':<12}{'записано':>12}{'повтор':>12}{'разница':>12}")
+    print(
+        f"{'ответов':<12}{original['count']:>12.0f}"
+        f"{replayed['count']:>12.0f}"
+    )
+    for key in ('p50', 'p90', 'p99', 'mean'):
+        if key not in original or key not in replayed:
+            continue
+        change: float = replayed[key] / original[key] - 1
+        print(
+            f"{key + ', мс':<12}{original[key]:>12.1f}"
+            f"{replayed[key]:>12.1f}{change:>+12.0%}"
+        )
+    print(
+        f"{'таймауты':<12}{original['timeout_rate']:>12.1%}"
+        f"{replayed['timeout_rate']:>12.1%}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Повтор трафика из client_N.log'
+    )
+    parser.add_argument('--dir', default='.', help='папка с client_N.log')
+    parser.add_argument(
+        '--speed',
+        type=float,
+        default=1.0,
+        help='во сколько раз ускорить паузы между отправками',
+    )
+    parser.add_argument(
+        '--asap', action='store_true', help='отправлять без пауз'
+    )
+    parser.add_argument(
+        '--unix', metavar='PATH', help='подключаться через Unix-сокет'
+    )
+    parser.add_argument(
+        '--spawn',
+        action='store_true',
+        help='запустить свежий server.py во временной папке',
+    )
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error('--speed должен быть больше нуля')
+
+    traces: List[ClientTrace] = load_traces(args.dir)
+    if not traces:
+        sys.exit(f"В {args.dir} нет client_N.log с отправками")
+    print(
+        f"Клиентов: {len(traces)}, запросов: "
+        f"{sum(len(trace.sends) for trace in traces)}"
+    )
+
+    connect: Connector = (
+        (lambda: asyncio.open_unix_connection(args.unix))
+        if args.unix
+        else tcp_connector
+    )
+    server: Optional[subprocess.Popen] = None
+    workdir: Optional[tempfile.TemporaryDirectory] = None
+    if args.spawn:
+        # Лог свежего сервера пишется во временную папку
+        workdir = tempfile.TemporaryDirectory()
+        server_args: List[str] = ['--unix', args.unix] if args.unix else []
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, *server_args],
+            cwd=workdir.name,
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        rtts, timeouts, elapsed = asyncio.run(
+            replay(traces, connect, None if args.asap else args.speed)
+        )
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=5)
+        if workdir:
+            workdir.cleanup()
+
+    print(f"Повтор занял {elapsed:.1f} с\n")
+    report(
+        summarize(
+            [rtt for trace in traces for rtt in trace.rtts],
+            sum(trace.timeouts for trace in traces),
+        ),
+        summarize(rtts, timeouts),
+    )
@@ -0,0 +1,138 @@
+"""
+Кэш ответов сервера для повторно присланных запросов (необязательный
+режим).
+
+Клиент с повторной отправкой (client.py --retries) шлёт тот же
+"[n] PING" ещё раз, если ответ не пришёл. Сервер по ключу (номер клиента,
+номер запроса) находит исходный ответ и отправляет его снова - без
+задержки обработки и без нового номера ответа. Если исходный запрос ещё
+обрабатывается, повтор не обрабатывается второй раз: ответ придёт сам.
+Кэш проверяется раньше допуска и игнорирования, чтобы повтор уже
+отвеченного запроса не сбрасывался и не игнорировался.
+
+Кэш ограничен числом записей и вытесняет самые давние (LRU). Память
+считается приблизительно: размеры объектов ответа плюс постоянная
+добавка на запись.
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+MAX_ENTRIES: int = 100_000
+
+# Ключ, строка словаря, кортеж записи - примерно столько занимает запись
+# сверх самих ответа и строки лога, байт
+ENTRY_OVERHEAD: int = 200
+
+CacheKey = Tuple[int, int]  # (номер клиента, номер запроса)
+# Отправленные байты и текст ответа для лога; None - ответ ещё готовится
+CacheEntry = Optional[Tuple[bytes, str]]
+
+# Результаты lookup()
+MISS: str = 'miss'
+HIT: str = 'hit'
+IN_PROGRESS: str = 'in_progress'
+
+
+class ResponseCache:
+    """
+    LRU-кэш ответов по (номер клиента, номер запроса).
+
+    Атрибуты:
+        max_entries: int - сколько ответов помнить
+        entries: OrderedDict[CacheKey, CacheEntry] - от давних к свежим
+        memory: int - приблизительный объём записей, байт
+        stats: Dict[str, int] - промахи, попадания, повторы ещё не
+            готовых запросов, вытеснения
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        """
+        Args:
+            max_entries: int - сколько ответов помнить
+        """
+        self.max_entries: int = max_entries
+        self.entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self.memory: int = 0
+        self.stats: Dict[str, int] = dict.fromkeys(
+            [MISS, HIT, IN_PROGRESS, 'evicted'], 0
+        )
+
+    def lookup(self, key: CacheKey) -> Tuple[str, CacheEntry]:
+        """
+        Ищет ответ на запрос. При промахе запрос отмечается как
+        обрабатываемый, чтобы его повтор не запустил вторую обработку.
+
+        Args:
+            key: CacheKey - (номер клиента, номер запроса)
+
+        Returns:
+            Tuple[str, CacheEntry] - MISS, HIT или IN_PROGRESS и запись
+                (при HIT - байты и текст исходного ответа)
+        """
+        if key not in self.entries:
+            self.stats[MISS] += 1
+            self.put(key, None)
+            return MISS, None
+        entry: CacheEntry = self.entries[key]
+        self.entries.move_to_end(key)
+        result: str = IN_PROGRESS if entry is None else HIT
+        self.stats[result] += 1
+        return result, entry
+
+    def forget(self, key: CacheKey) -> None:
+        """
+        Снимает отметку обработки с запроса, который сервер сбросил или
+        проигнорировал: его повтор обрабатывается заново.
+
+        Args:
+            key: CacheKey - (номер клиента, номер запроса)
+        """
+        if key in self.entries and self.entries[key] is None:
+            self.memory -= self.entry_size(self.entries.pop(key))
+
+    def store(self, key: CacheKey, data: bytes, response: str) -> None:
+        """
+        Запоминает отправленный ответ.
+
+        Args:
+            key: CacheKey - (номер клиента, номер запроса)
+            data: bytes - отправленные байты (строка или кадр)
+            response: str - текст ответа для лога
+        """
+        self.put(key, (data, response))
+
+    def put(self, key: CacheKey, entry: CacheEntry) -> None:
+        """Записывает entry и вытесняет давние записи сверх max_entries."""
+        if key in self.entries:
+            self.memory -= self.entry_size(self.entries.pop(key))
+        self.entries[key] = entry
+        self.memory += self.entry_size(entry)
+        while len(self.entries) > self.max_entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.memory -= self.entry_size(evicted)
+            self.stats['evicted'] += 1
+
+    @staticmethod
+    def entry_size(entry: CacheEntry) -> int:
+        """Приблизительный размер записи, байт."""
+        if entry is None:
+            return ENTRY_OVERHEAD
+        return (
+            ENTRY_OVERHEAD + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+        )
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float] - счётчики, доля попаданий среди повторов
+                и обращений, записей и память (КБ)
+        """
+        lookups: int = self.stats[MISS] + self.stats[HIT]
+        return {
+            **self.stats,
+            'hit_rate': self.stats[HIT] / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+            'memory_kb': self.memory / 1024,
+        }
@@ -0,0 +1,208 @@
+"""
+Справедливая отправка ответов между клиентами (необязательный режим).
+
+Без планировщика ответы уходят в том порядке, в каком цикл событий
+будит корутины respond(), и болтливый клиент занимает и цикл, и исходящую
+полосу. С планировщиком все готовые ответы проходят через одну очередь:
+
+1. За итерацию цикла отправляется не больше budget байт, остальное ждёт
+   следующей итерации - остальные задачи цикла (чтение, keepalive)
+   не стоят за лавиной ответов
+2. Режим drr - deficit round-robin: каждый клиент в свой ход получает
+   quantum байт кредита и отправляет, пока кредита хватает, поэтому за
+   раунд каждый клиент получает примерно равную долю budget
+3. Режим fifo - одна общая очередь с тем же budget (для сравнения)
+
+Для каждого клиента считается, сколько его ответы ждали в очереди:
+по разбросу этого ожидания между клиентами видно, насколько честно
+делится полоса.
+"""
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+SCHEDULE_FIFO: str = 'fifo'
+SCHEDULE_DRR: str = 'drr'
+
+SEND_BUDGET: int = 64 * 1024  # байт за итерацию цикла
+QUANTUM: int = 512  # байт кредита за ход клиента (несколько ответов)
+
+# В очереди: размер, номер клиента, время постановки, что отправить
+Item = Tuple[int, int, float, Any]
+
+
+class Flow:
+    """
+    Очередь ответов одного клиента.
+
+    Атрибуты:
+        key: Hashable - канал или соединение клиента
+        queue: Deque[Item] - ответы в порядке готовности
+        deficit: float - накопленный кредит, байт
+        in_turn: bool - ход клиента прерван исчерпанным budget
+            и продолжится в следующей итерации без нового кредита
+    """
+
+    __slots__ = ('key', 'queue', 'deficit', 'in_turn')
+
+    def __init__(self, key: Hashable) -> None:
+        self.key: Hashable = key
+        self.queue: Deque[Item] = deque()
+        self.deficit: float = 0.0
+        self.in_turn: bool = False
+
+
+class ResponseScheduler:
+    """
+    Очередь готовых ответов с бюджетом на итерацию цикла событий.
+
+    Атрибуты:
+        deliver: Callable[[Any], None] - отправляет один ответ (item)
+        budget: int - байт за итерацию цикла
+        quantum: float - кредит клиента за ход (inf в режиме fifo)
+        mode: str - SCHEDULE_DRR или SCHEDULE_FIFO
+        flows: Dict[Hashable, Flow] - непустые очереди клиентов
+        active: Deque[Flow] - порядок ходов
+        waits: Dict[int, List[float]] - номер клиента -> [ответов,
+            суммарное ожидание, максимальное ожидание], секунды
+        stats: Dict[str, int] - итерации отправки и итерации, в которых
+            budget кончился раньше очереди
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[Any], None],
+        mode: str = SCHEDULE_DRR,
+        budget: int = SEND_BUDGET,
+        quantum: int = QUANTUM,
+    ) -> None:
+        """
+        Args:
+            deliver: Callable[[Any], None] - отправляет один ответ
+            mode: str - SCHEDULE_DRR или SCHEDULE_FIFO
+            budget: int - байт за итерацию цикла
+            quantum: int - кредит клиента за ход в режиме drr, байт
+        """
+        self.deliver: Callable[[Any], None] = deliver
+        self.mode: str = mode
+        self.budget: int = budget
+        # В fifo все ответы в одной очереди, и кредит её не ограничивает
+        self.quantum: float = (
+            quantum if mode == SCHEDULE_DRR else float('inf')
+        )
+        self.flows: Dict[Hashable, Flow] = {}
+        self.active: Deque[Flow] = deque()
+        self.scheduled: bool = False
+        self.waits: Dict[int, List[float]] = {}
+        self.stats: Dict[str, int] = {'runs': 0, 'budget_exhausted': 0}
+
+    def enqueue(
+        self, key: Hashable, client_id: int, size: int, item: Any
+    ) -> None:
+        """
+        Ставит готовый ответ в очередь клиента.
+
+        Args:
+            key: Hashable - очередь клиента (канал или соединение)
+            client_id: int - номер клиента для статистики ожидания
+            size: int - размер ответа, байт
+            item: Any - что передать в deliver()
+        """
+        if self.mode == SCHEDULE_FIFO:
+            key = None
+        flow: Optional[Flow] = self.flows.get(key)
+        if flow is None:
+            flow = self.flows[key] = Flow(key)
+            self.active.append(flow)
+        flow.queue.append((size, client_id, time.monotonic(), item))
+        if not self.scheduled:
+            self.scheduled = True
+            asyncio.get_running_loop().call_soon(self.run)
+
+    def run(self) -> None:
+        """
+        Отправляет очереди в пределах budget; остаток - в следующей
+        итерации цикла.
+        """
+        self.scheduled = False
+        self.stats['runs'] += 1
+        budget: int = self.budget
+        now: float = time.monotonic()
+        while self.active and budget > 0:
+            flow: Flow = self.active[0]
+            if not flow.in_turn:
+                flow.deficit += self.quantum
+                flow.in_turn = True
+            queue: Deque[Item] = flow.queue
+            while queue and budget > 0 and queue[0][0] <= flow.deficit:
+                size, client_id, enqueued, item = queue.popleft()
+                flow.deficit -= size
+                budget -= size
+                self.record_wait(client_id, now - enqueued)
+                self.deliver(item)
+            if budget <= 0 and queue and queue[0][0] <= flow.deficit:
+                break  # Ход не окончен: продолжим его в следующей итерации
+
+            flow.in_turn = False
+            self.active.popleft()
+            if queue:
+                self.active.append(flow)
+            else:
+                # Пустая очередь не копит кредит, как в классическом DRR
+                del self.flows[flow.key]
+
+        if self.active:
+            self.stats['budget_exhausted'] += 1
+            self.scheduled = True
+            asyncio.get_running_loop().call_soon(self.run)
+
+    def drain(self) -> None:
+        """Отправляет все очереди сразу, не дожидаясь следующих итераций."""
+        while self.active:
+            self.run()
+
+    def record_wait(self, client_id: int, wait: float) -> None:
+        """Учитывает ожидание одного ответа клиента в очереди."""
+        record: Optional[List[float]] = self.waits.get(client_id)
+        if record is None:
+            self.waits[client_id] = [1, wait, wait]
+            return
+        record[0] += 1
+        record[1] += wait
+        if wait > record[2]:
+            record[2] = wait
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Разброс ожидания между клиентами.
+
+        Returns:
+            Dict[str, float] - число клиентов, медиана и максимум среднего
+                ожидания клиента и худшее ожидание одного ответа (мс),
+                итерации с исчерпанным budget
+        """
+        if not self.waits:
+            return {'clients': 0}
+        means: List[float] = sorted(
+            total / count for count, total, _ in self.waits.values()
+        )
+        return {
+            'clients': len(means),
+            'mean_wait_p50': statistics.median(means) * 1000,
+            'mean_wait_max': means[-1] * 1000,
+            'max_wait': max(worst for _, _, worst in self.waits.values())
+            * 1000,
+            'budget_exhausted': self.stats['budget_exhausted'],
+        }
@@ -43,39 +43,363 @@ TCP-сервер для обработки PING-запросов от клиен
 
 """
 
+import argparse
 import asyncio
+import functools
+import os
 import random
 import datetime
-from typing import Dict, Optional
+import socket
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from admission import AdmissionController, TokenBucket
+from clock_sync import CLOCK_REQUEST, clock_reply, now_us, parse_clock
+from datagram import (
+    PEER_TIMEOUT,
+    REGISTER,
+    REGISTER_ACK,
+    Address,
+    DatagramServerProtocol,
+    DatagramWriter,
+)
+from flight_recorder import (
+    ALL_CLIENTS,
+    EV_CLOSE,
+    EV_CONNECT,
+    EV_DROP,
+    EV_ERROR,
+    EV_KEEPALIVE,
+    EV_RECV,
+    EV_SEND,
+    RECORDER_SIZE,
+    FlightRecorder,
+    describe_error,
+)
+from framing import (
+    FRAME_CLOCK,
+    FRAME_PING,
+    HANDSHAKE,
+    HANDSHAKE_ACK,
+    encode_clock_reply,
+    encode_keepalive,
+    encode_pong,
+    read_frame,
+    unread_header,
+)
+from handoff import (
+    accept_takeover,
+    recv_message,
+    request_takeover,
+    send_message,
+)
+from multiplex import (
+    BROADCAST,
+    MUX_HANDSHAKE,
+    MUX_HANDSHAKE_ACK,
+    split_channel,
+)
+from response_cache import IN_PROGRESS, ResponseCache
+from scheduling import (
+    QUANTUM,
+    SCHEDULE_DRR,
+    SCHEDULE_FIFO,
+    SEND_BUDGET,
+    ResponseScheduler,
+)
+from tracing import RequestTrace, Tracer
+
+# Сколько старый процесс ждёт отправки уже назначенных ответов при передаче
+HANDOFF_DRAIN_TIMEOUT: float = 5.0
+
+KEEPALIVE_INTERVAL: float = 5.0
+
+# Шаг проверки в режиме idle_keepalive: соединения, простой которых истёк
+# в пределах шага, получают keepalive за одно пробуждение
+KEEPALIVE_BUCKET: float = 0.1
+
+# Порт TCP (и UDP) по умолчанию: на него подключается client.py
+PORT: int = 8888
+
+# Запрос счётчиков на порту проверок здоровья (--health-port)
+STATS_REQUEST: str = 'STATS'
+
+# Максимальная длина строки от клиента (лимит буфера StreamReader)
+MAX_LINE: int = 64 * 1024
+
+# Причины закрытия соединений (ключи Server.close_reasons)
+CLOSE_CLIENT: str = 'client'  # клиент отключился сам
+CLOSE_IDLE: str = 'idle'  # молчал дольше idle_timeout
+CLOSE_LINE_TOO_LONG: str = 'line_too_long'  # строка длиннее max_line
+CLOSE_TOO_MANY: str = 'too_many_connections'  # превышен max_connections
+CLOSE_PROTOCOL: str = 'protocol_error'  # некорректное сообщение
+CLOSE_CONNECTION: str = 'connection_error'  # ошибка сокета
+
+# С Python 3.13 asyncio сам удаляет файл Unix-сокета при закрытии сервера,
+# а при передаче работы файл должен остаться новому процессу
+UNIX_SERVER_OPTIONS: Dict[str, Any] = (
+    {'cleanup_socket': False} if sys.version_info >= (3, 13) else {}
+)
+
+
+class Channel:
+    """
+    Логический клиент внутри мультиплексированного соединения.
+
+    Атрибуты:
+        channel_id: int - номер канала в соединении (выбирает клиент)
+        client_id: int - номер клиента, выданный сервером каналу
+        bucket: Optional[TokenBucket] - ведро жетонов этого клиента
+        pending: Set[asyncio.Task[None]] - ответы канала, ожидающие отправки
+    """
+
+    def __init__(
+        self, channel_id: int, client_id: int, bucket: Optional[TokenBucket]
+    ) -> None:
+        self.channel_id: int = channel_id
+        self.client_id: int = client_id
+        self.bucket: Optional[TokenBucket] = bucket
+        self.pending: Set[asyncio.Task[None]] = set()
+
+
+class ClientConnection:
+    """
+    Состояние одного подключения клиента.
+
+    Атрибуты:
+        client_id: int - номер клиента (по времени подключения, с 1)
+        reader: Optional[asyncio.StreamReader] - поток чтения от клиента
+            (None - клиент UDP)
+        writer: asyncio.StreamWriter - поток отправки клиенту (у клиента
+            UDP - DatagramWriter)
+        bucket: Optional[TokenBucket] - ведро жетонов клиента
+        pending: Set[asyncio.Task[None]] - ответы, ожидающие отправки
+        reader_task: Optional[asyncio.Task[Any]] - задача handle_client()
+        handed_off: bool - соединение передано новому процессу
+        binary: bool - согласован бинарный формат кадров (framing.py)
+        outbox: List[bytes] - сообщения, ждущие общей записи в сокет
+        close_reason: Optional[str] - почему сервер закрыл соединение
+        outbox_traces: List[RequestTrace] - трассы ответов в outbox
+        mux: bool - в соединении несколько логических клиентов (multiplex.py)
+        channels: Dict[int, Channel] - каналы мультиплексированного соединения
+        datagram: bool - клиент UDP, узнаётся по адресу (datagram.py)
+    """
+
+    def __init__(
+        self,
+        client_id: int,
+        reader: Optional[asyncio.StreamReader],
+        writer: asyncio.StreamWriter,
+        bucket: Optional[TokenBucket],
+        binary: bool = False,
+    ) -> None:
+        self.client_id: int = client_id
+        self.reader: Optional[asyncio.StreamReader] = reader
+        self.writer: asyncio.StreamWriter = writer
+        self.bucket: Optional[TokenBucket] = bucket
+        self.pending: Set[asyncio.Task[None]] = set()
+        self.reader_task: Optional[asyncio.Task[Any]] = asyncio.current_task()
+        self.handed_off: bool = False
+        self.binary: bool = binary
+        self.outbox: List[bytes] = []
+        self.close_reason: Optional[str] = None
+        self.outbox_traces: List[RequestTrace] = []
+        self.mux: bool = False
+        self.channels: Dict[int, Channel] = {}
+        self.datagram: bool = False
 
 
 class Server:
     """TCP-сервер для обработки PING/PONG сообщений."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        admission: Optional[AdmissionController] = None,
+        handoff_path: Optional[str] = None,
+        takeover_path: Optional[str] = None,
+        unix_path: Optional[str] = None,
+        tcp: bool = True,
+        delay: Tuple[float, float] = (0.1, 1.0),
+        ignore_rate: float = 0.1,
+        idle_timeout: Optional[float] = None,
+        max_line: int = MAX_LINE,
+        max_connections: Optional[int] = None,
+        tracer: Optional[Tracer] = None,
+        idle_keepalive: bool = False,
+        schedule: Optional[str] = None,
+        send_budget: int = SEND_BUDGET,
+        quantum: int = QUANTUM,
+        response_cache: Optional[ResponseCache] = None,
+        udp: bool = False,
+        recorder: Optional[FlightRecorder] = None,
+        port: int = PORT,
+        health_port: Optional[int] = None,
+    ) -> None:
         """
         Инициализирует TCP-сервер.
 
+        Args:
+            admission: Optional[AdmissionController] - контроль допуска
+                запросов при перегрузке (по умолчанию все лимиты выключены)
+            handoff_path: Optional[str] - Unix-сокет, через который этот
+                процесс отдаст работу следующему (hot restart)
+            takeover_path: Optional[str] - Unix-сокет работающего сервера,
+                у которого нужно забрать работу при старте
+            unix_path: Optional[str] - путь Unix-сокета для клиентов на
+                той же машине (слушается вместе с TCP или вместо него)
+            tcp: bool - слушать TCP 127.0.0.1:port
+            delay: Tuple[float, float] - границы задержки ответа, секунды
+            ignore_rate: float - вероятность проигнорировать запрос
+            idle_timeout: Optional[float] - закрывать соединения, от которых
+                столько секунд не пришло ни одного сообщения (None - никогда)
+            max_line: int - максимальная длина строки от клиента, байт
+            max_connections: Optional[int] - максимум одновременных
+                соединений (None - без ограничения)
+            tracer: Optional[Tracer] - трассировка этапов запросов
+                (None - выключена)
+            idle_keepalive: bool - слать keepalive только соединениям,
+                которым сервер ничего не отправлял KEEPALIVE_INTERVAL
+                (по умолчанию - всем, как в спецификации)
+            schedule: Optional[str] - пропускать ответы через планировщик
+                (SCHEDULE_DRR или SCHEDULE_FIFO; None - сразу в outbox)
+            send_budget: int - байт ответов за итерацию цикла (с schedule)
+            quantum: int - кредит клиента за ход DRR, байт
+            response_cache: Optional[ResponseCache] - отвечать на повтор
+                запроса исходным ответом (None - каждый запрос заново)
+            udp: bool - принимать клиентов и по UDP 127.0.0.1:port
+            recorder: Optional[FlightRecorder] - самописец последних
+                событий (None - выключен)
+            port: int - порт TCP и UDP (несколько серверов за balancer.py
+                слушают разные порты)
+            health_port: Optional[int] - порт проверок здоровья: только
+                сверка часов, без номера клиента (None - не слушать)
+
         Атрибуты:
             response_counter: int - сквозная нумерация всех ответов сервера
-            clients: Dict[asyncio.StreamWriter, int] - словарь подключений: writer -> client_id
+            clients: Dict[asyncio.StreamWriter, ClientConnection] - словарь подключений: writer -> состояние клиента
             next_client_id: int - следующий доступный ID для нового клиента
+            admission: AdmissionController - лимиты и счётчики сброса нагрузки
+            state_ready: asyncio.Event - счётчики известны, можно обслуживать
+            stopped: asyncio.Event - работа передана, процесс может завершиться
+            write_stats: Dict[str, int] - записи в сокеты: сколько записей,
+                сообщений и байт (сообщений на запись = messages / writes)
+            activity: OrderedDict[ClientConnection, float] - соединения
+                в порядке последнего сообщения (monotonic) для reap_idle()
+            close_reasons: Dict[str, int] - сколько соединений закрыто
+                по каждой причине (CLOSE_*)
+            last_sent: OrderedDict[ClientConnection, float] - соединения
+                в порядке последней записи (monotonic) для режима
+                idle_keepalive
+            scheduler: Optional[ResponseScheduler] - очередь ответов
+                с бюджетом на итерацию и справедливым порядком клиентов
+            peers: OrderedDict[Address, ClientConnection] - клиенты UDP
+                в порядке последней датаграммы для reap_peers()
+            peer_activity: Dict[Address, float] - время последней
+                датаграммы клиента UDP (monotonic)
+            datagram_transport: Optional[asyncio.DatagramTransport] -
+                сокет UDP сервера
+            health_server: Optional[asyncio.Server] - порт проверок
+                здоровья (не передаётся при перезапуске без простоя)
+            handoff_task, takeover_task: Optional[asyncio.Task[None]] -
+                передача и приём работы (ошибки - в check_task())
         """
         self.response_counter: int = 0  # Сквозная нумерация всех ответов
-        self.clients: Dict[asyncio.StreamWriter, int] = (
+        self.clients: Dict[asyncio.StreamWriter, ClientConnection] = (
             {}
-        )  # writer -> client_id
+        )  # writer -> состояние клиента
         self.next_client_id: int = 1  # ID следующего клиента
+        self.admission: AdmissionController = (
+            admission or AdmissionController()
+        )
+
+        self.handoff_path: Optional[str] = handoff_path
+        self.takeover_path: Optional[str] = takeover_path
+        self.state_ready: asyncio.Event = asyncio.Event()
+        self.stopped: asyncio.Event = asyncio.Event()
+        self.unix_path: Optional[str] = unix_path
+        self.tcp: bool = tcp
+        self.port: int = port
+        self.delay: Tuple[float, float] = delay
+        self.ignore_rate: float = ignore_rate
+        self.servers: List[asyncio.Server] = []
+        self.keepalive_task: Optional[asyncio.Task[None]] = None
+        self.last_keepalive: float = time.monotonic()
+        self.write_stats: Dict[str, int] = {
+            'writes': 0,
+            'messages': 0,
+            'bytes': 0,
+        }
+
+        self.idle_timeout: Optional[float] = idle_timeout
+        self.max_line: int = max_line
+        self.max_connections: Optional[int] = max_connections
+        self.tracer: Optional[Tracer] = tracer
+        self.reaper_task: Optional[asyncio.Task[None]] = None
+        # Одна структура на все соединения вместо таймера на каждое:
+        # сообщение переносит соединение в конец, самое давнее - в начале
+        self.activity: "OrderedDict[ClientConnection, float]" = OrderedDict()
+        self.idle_keepalive: bool = idle_keepalive
+        self.last_sent: "OrderedDict[ClientConnection, float]" = OrderedDict()
+        self.scheduler: Optional[ResponseScheduler] = (
+            ResponseScheduler(self.deliver, schedule, send_budget, quantum)
+            if schedule
+            else None
+        )
+        self.response_cache: Optional[ResponseCache] = response_cache
+        self.udp: bool = udp
+        self.datagram_transport: Optional[asyncio.DatagramTransport] = None
+        self.peers: "OrderedDict[Address, ClientConnection]" = OrderedDict()
+        self.peer_activity: Dict[Address, float] = {}
+        self.peer_reaper_task: Optional[asyncio.Task[None]] = None
+        self.handoff_task: Optional[asyncio.Task[None]] = None
+        self.takeover_task: Optional[asyncio.Task[None]] = None
+        self.recorder: Optional[FlightRecorder] = recorder
+        self.health_port: Optional[int] = health_port
+        self.health_server: Optional[asyncio.Server] = None
+        self.close_reasons: Dict[str, int] = dict.fromkeys(
+            [
+                CLOSE_CLIENT,
+                CLOSE_IDLE,
+                CLOSE_LINE_TOO_LONG,
+                CLOSE_TOO_MANY,
+                CLOSE_PROTOCOL,
+                CLOSE_CONNECTION,
+            ],
+            0,
+        )
+
+    def next_response_number(self) -> int:
+        """
+        Выдаёт очередной сквозной номер ответа.
+
+        Номер берётся и увеличивается без await между ними, поэтому
+        параллельные ответы и keepalive никогда не получат один номер.
+
+        Returns:
+            int - номер для следующего ответа сервера
+        """
+        number: int = self.response_counter
+        self.response_counter += 1
+        return number
 
     async def handle_client(
-        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        client_id: Optional[int] = None,
+        binary: bool = False,
+        channels: Optional[Dict[int, int]] = None,
     ) -> None:
         """
         Обрабатывает подключение одного клиента.
 
         Эта корутина запускается для каждого нового клиента и:
         1. Регистрирует клиента с уникальным ID
-        2. Читает сообщения от клиента построчно
+        2. Читает сообщения от клиента построчно (или бинарными кадрами,
+           если первой строкой клиент согласовал бинарный режим; или
+           строками с номером канала, если согласован мультиплексный)
         3. Обрабатывает PING запросы
         4. Отправляет PONG ответы
         5. Корректно закрывает соединение при отключении
@@ -83,70 +407,729 @@ class Server:
         Args:
             reader: asyncio.StreamReader - поток для чтения данных от клиента
             writer: asyncio.StreamWriter - поток для отправки данных клиенту
+            client_id: Optional[int] - номер клиента, принятого от
+                предыдущего процесса (None - выдать новый)
+            binary: bool - клиент, принятый от предыдущего процесса, уже
+                согласовал бинарный режим
+            channels: Optional[Dict[int, int]] - каналы мультиплексированного
+                соединения, принятого от предыдущего процесса:
+                номер канала -> номер клиента (None - обычное соединение)
 
         Процесс работы:
             КЛИЕНТ -> СЕРВЕР: "[0] PING\\n"
             СЕРВЕР -> КЛИЕНТ: "[0/0] PONG (1)\\n" (после задержки 100-1000мс)
         """
-        client_id: int = (
-            self.next_client_id
-        )  # хитрая система увеличения id клиента
-        # зафиксировали в словаре
-        self.clients[writer] = client_id
-        self.next_client_id += 1  # и вот он стал на единицу больше
+        # При приёме работы у старого процесса счётчики приходят не сразу
+        await self.state_ready.wait()
+
+        # Лимит касается только новых подключений: клиенты, принятые от
+        # старого процесса, уже были обслужены
+        if (
+            client_id is None
+            and self.max_connections is not None
+            and len(self.clients) >= self.max_connections
+        ):
+            self.close_reasons[CLOSE_TOO_MANY] += 1
+            writer.close()
+            return
+
+        if client_id is None:
+            client_id = (
+                self.next_client_id
+            )  # хитрая система увеличения id клиента
+            self.next_client_id += 1  # и вот он стал на единицу больше
+
+        # зафиксировали в словаре вместе с ведром жетонов клиента
+        conn: ClientConnection = ClientConnection(
+            client_id, reader, writer, self.admission.client_bucket(), binary
+        )
+        if channels is not None:
+            conn.mux = True
+            for channel_id, channel_client_id in channels.items():
+                conn.channels[channel_id] = Channel(
+                    channel_id,
+                    channel_client_id,
+                    self.admission.client_bucket(),
+                )
+        self.clients[writer] = conn
+        self.touch(conn)
+        # Простой до первого keepalive отсчитывается от подключения
+        self.mark_sent(conn)
 
         print(f"Клиент {client_id} подключился")
+        if self.recorder:
+            self.recorder.record(EV_CONNECT, client_id)
+
+        # Согласовать бинарный или мультиплексный режим можно только
+        # первым сообщением
+        first_message: bool = not binary and channels is None
 
         try:
             while True:
-                # Чтение сообщения от клиента (ждет до символа \\n -
-                # это и есть в аски таблице байт 0x0a перевода на новую строку LF)
-                data: bytes = await reader.readline()
-                if not data:  # Клиент отключился
-                    break
+                req_num: Optional[int] = None
+                if conn.binary:
+                    # Кадр фиксированного размера: номер уже числом
+                    frame = await read_frame(reader)
+                    if frame is None:  # Клиент отключился
+                        break
+                    read_ns: int = time.monotonic_ns()
+                    frame_type, fields = frame
+                    if frame_type == FRAME_CLOCK:
+                        received_us: int = now_us()
+                        self.touch(conn)
+                        reply: bytes = encode_clock_reply(
+                            fields[0], received_us, now_us()
+                        )
+                        writer.write(reply)
+                        continue
+                    if frame_type != FRAME_PING:
+                        raise ValueError('Клиент прислал не PING')
+                    req_num = fields[0]
+                    # Лог ведётся в текстовом виде спецификации
+                    message: str = f"[{req_num}] PING"
+                else:
+                    # Чтение сообщения от клиента (ждет до символа \\n -
+                    # это и есть в аски таблице байт 0x0a перевода на новую строку LF)
+                    try:
+                        data: bytes = await reader.readline()
+                    except ValueError:
+                        # Строка длиннее max_line: буфер StreamReader
+                        # дальше не растёт, соединение закрываем
+                        conn.close_reason = CLOSE_LINE_TOO_LONG
+                        break
+                    if not data:  # Клиент отключился
+                        break
+                    read_ns = time.monotonic_ns()
+
+                    if first_message and data == HANDSHAKE:
+                        conn.binary = True
+                        writer.write(HANDSHAKE_ACK)
+                        continue
+                    if first_message and data == MUX_HANDSHAKE:
+                        conn.mux = True
+                        writer.write(MUX_HANDSHAKE_ACK)
+                        first_message = False
+                        continue
 
-                # Декодируем Убираем пробелы и \\n
-                message: str = data.decode().strip()
-                # Время получения
-                receive_time: datetime.datetime = datetime.datetime.now()
-
-                # 10% шанс игнорировать запрос
-                if random.random() < 0.1:
-                    self.log_ignored(message, receive_time)
-                    continue  # сброс и новая итерация цикла
-
-                # Имитация обработки: задержка 100-1000 мс
-                await asyncio.sleep(random.uniform(0.1, 1.0))
-
-                # Извлекаем номер запроса, т.е. цифру 0 из: "[0] PING" -> 0
-                req_num: int = int(
-                    message.split('[')[1].split(']')[0]
-                )  # жоское место, последовательно разрезаем по ключевым символам
-                response: str = (
-                    f"[{self.response_counter}/{req_num}] PONG ({client_id})\n"
+                    # Декодируем Убираем пробелы и \\n
+                    message = data.decode().strip()
+                first_message = False
+                # Активностью считается любое сообщение клиента, даже
+                # если запрос потом сброшен или проигнорирован
+                self.touch(conn)
+
+                # Дальше запрос канала обрабатывается так же, как запрос
+                # отдельного соединения: своё ведро, свои ожидающие ответы
+                channel: Optional[Channel] = None
+                if conn.mux:
+                    channel_id, message = split_channel(message)
+                    channel = self.open_channel(conn, int(channel_id))
+                self.handle_message(conn, channel, message, req_num, read_ns)
+
+        except ConnectionError as exc:
+            conn.close_reason = conn.close_reason or CLOSE_CONNECTION
+            if self.recorder:
+                self.recorder.record(EV_ERROR, client_id, detail=repr(exc))
+        except Exception as exc:
+            # Любая другая ошибка = некорректное сообщение и разрыв
+            conn.close_reason = conn.close_reason or CLOSE_PROTOCOL
+            if self.recorder:
+                # Где именно упал разбор - видно в сбросе самописца
+                self.recorder.record(
+                    EV_ERROR, client_id, detail=describe_error(exc)
                 )
+        finally:
+            # Переданное соединение живёт дальше в новом процессе: не
+            # закрываем его, а return гасит отмену задачи, иначе asyncio
+            # закроет транспорт вместе с ещё не отправленными ответами
+            if conn.handed_off:
+                return
+            # Очистка ресурсов при отключении клиента
+            for task in conn.pending:
+                task.cancel()
+            del self.clients[writer]
+            self.activity.pop(conn, None)
+            self.last_sent.pop(conn, None)
+            reason: str = conn.close_reason or CLOSE_CLIENT
+            self.close_reasons[reason] += 1
+            if self.recorder:
+                self.recorder.record(EV_CLOSE, client_id, detail=reason)
+            writer.close()
 
-                send_time: datetime.datetime = datetime.datetime.now()
+    def handle_message(
+        self,
+        conn: ClientConnection,
+        channel: Optional[Channel],
+        message: str,
+        req_num: Optional[int],
+        read_ns: int,
+    ) -> None:
+        """
+        Обрабатывает одно сообщение клиента: сверку часов или PING.
 
-                # Отправка ответа клиенту
-                writer.write(response.encode(encoding="utf-8"))
-                await writer.drain()
+        Запрос проходит кэш ответов (повтор отвеченного запроса получает
+        тот же ответ мимо допуска и игнорирования), допуск и
+        игнорирование, после чего ответ готовится в отдельной задаче
+        respond().
 
-                # Логирование успешной обработки
-                self.log_message(
-                    message, receive_time, response.strip(), send_time
+        Args:
+            conn: ClientConnection - подключение клиента
+            channel: Optional[Channel] - канал мультиплексного соединения
+                (None - обычное соединение или клиент UDP)
+            message: str - текст сообщения без "\\n" и номера канала
+            req_num: Optional[int] - номер запроса, если он уже известен
+                (бинарный кадр), иначе берётся из текста
+            read_ns: int - момент чтения сообщения (monotonic_ns)
+
+        Исключения:
+            ValueError, IndexError: некорректное сообщение
+        """
+        limits: Any = channel or conn
+        if self.recorder:
+            self.recorder.record(
+                EV_RECV,
+                limits.client_id,
+                -1 if req_num is None else req_num,
+                message,
+            )
+
+        if message.startswith(CLOCK_REQUEST):
+            # Сверка часов (clock_sync.py): ответ сразу, мимо
+            # задержки, допуска, лога и нумерации ответов
+            self.reply_clock(conn, channel, message)
+            return
+
+        # Время получения
+        receive_time: datetime.datetime = datetime.datetime.now()
+
+        if req_num is None:
+            # Извлекаем номер запроса, т.е. цифру 0 из: "[0] PING" -> 0
+            req_num = int(
+                message.split('[')[1].split(']')[0]
+            )  # жоское место, последовательно разрезаем по ключевым символам
+
+        if self.response_cache is not None:
+            result, entry = self.response_cache.lookup(
+                (limits.client_id, req_num)
+            )
+            if entry is not None:
+                # Повтор отвеченного запроса: тот же ответ сразу
+                self.replay_response(conn, message, receive_time, entry)
+                return
+            if result == IN_PROGRESS:
+                # Ответ на исходный запрос ещё в пути
+                self.log_in_flight(message, receive_time)
+                if self.recorder:
+                    self.recorder.record(
+                        EV_DROP,
+                        limits.client_id,
+                        req_num,
+                        detail='повтор, ещё в пути',
+                    )
+                return
+
+        # Перегрузка: сбрасываем запрос до любой работы над ним
+        if (
+            self.admission.admit(limits.bucket, len(limits.pending))
+            is not None
+        ):
+            self.log_shed(message, receive_time)
+            if self.recorder:
+                self.recorder.record(
+                    EV_DROP, limits.client_id, req_num, detail='перегрузка'
+                )
+            if self.response_cache is not None:
+                self.response_cache.forget((limits.client_id, req_num))
+            return
+
+        # 10% шанс игнорировать запрос
+        if random.random() < self.ignore_rate:
+            self.log_ignored(message, receive_time)
+            if self.recorder:
+                self.recorder.record(
+                    EV_DROP,
+                    limits.client_id,
+                    req_num,
+                    detail='проигнорировано',
                 )
+            if self.response_cache is not None:
+                self.response_cache.forget((limits.client_id, req_num))
+            return  # сброс запроса
+
+        trace: Optional[RequestTrace] = None
+        if self.tracer:
+            sender: int = (channel or conn).client_id
+            trace = self.tracer.start(
+                f"клиент {sender} {message}",
+                read_ns,
+                client_id=sender,
+                req_num=req_num,
+            )
+            if trace:
+                # Декодирование, разбор и проверки допуска
+                trace.stage('parse')
+
+        # Ответ готовится в отдельной задаче, чтобы задержка одного
+        # запроса не задерживала чтение следующих
+        task: asyncio.Task[None] = asyncio.create_task(
+            self.respond(conn, message, req_num, receive_time, channel, trace)
+        )
+        conn.pending.add(task)
+        task.add_done_callback(conn.pending.discard)
+        if channel:
+            channel.pending.add(task)
+            task.add_done_callback(channel.pending.discard)
+
+    def touch(self, conn: ClientConnection) -> None:
+        """
+        Отмечает сообщение от клиента для поиска молчащих соединений.
+
+        Args:
+            conn: ClientConnection - подключение клиента
+        """
+        if self.idle_timeout is None:
+            return
+        self.activity[conn] = time.monotonic()
+        self.activity.move_to_end(conn)
+
+    def mark_sent(self, conn: ClientConnection) -> None:
+        """
+        Отмечает запись в соединение для режима idle_keepalive.
+
+        Args:
+            conn: ClientConnection - подключение клиента
+        """
+        if not self.idle_keepalive:
+            return
+        self.last_sent[conn] = time.monotonic()
+        self.last_sent.move_to_end(conn)
+
+    async def reap_idle(self) -> None:
+        """
+        Закрывает соединения, молчащие дольше idle_timeout.
+
+        Один таймер на все соединения: activity упорядочен по последнему
+        сообщению, поэтому просроченные лежат в начале, и проход
+        останавливается на первом живом. Спим до момента, когда истечёт
+        самое давнее соединение.
+        """
+        while True:
+            now: float = time.monotonic()
+            while self.activity:
+                conn, last = next(iter(self.activity.items()))
+                if now - last < self.idle_timeout:
+                    break
+                del self.activity[conn]
+                # handle_client получит конец потока и уберёт соединение
+                conn.close_reason = CLOSE_IDLE
+                conn.writer.close()
+
+            wait: float = self.idle_timeout
+            if self.activity:
+                oldest: float = next(iter(self.activity.values()))
+                wait = oldest + self.idle_timeout - now
+            await asyncio.sleep(wait)
+
+    def handle_datagram(self, data: bytes, addr: Address) -> None:
+        """
+        Обрабатывает датаграмму клиента UDP (datagram.py).
+
+        Первая датаграмма с адреса должна быть регистрацией, остальные
+        датаграммы незнакомых адресов отбрасываются. Датаграмма может
+        нести несколько строк, каждая обрабатывается как сообщение
+        соединения. Некорректная строка отбрасывается: закрывать нечего.
+
+        Args:
+            data: bytes - содержимое датаграммы
+            addr: Address - адрес отправителя
+        """
+        read_ns: int = time.monotonic_ns()
+        conn: Optional[ClientConnection] = self.peers.get(addr)
+        if conn is None:
+            if data == REGISTER:
+                self.register_peer(addr)
+            return
+
+        self.peers.move_to_end(addr)
+        self.peer_activity[addr] = time.monotonic()
+        if data == REGISTER:
+            # Подтверждение потерялось, и клиент повторил регистрацию
+            conn.writer.write(REGISTER_ACK)
+            return
+        for line in data.splitlines():
+            try:
+                message: str = line.decode().strip()
+                if not message:
+                    continue
+                self.touch(conn)
+                self.handle_message(conn, None, message, None, read_ns)
+            except (ValueError, IndexError) as exc:
+                if self.recorder:
+                    self.recorder.record(
+                        EV_ERROR, conn.client_id, detail=describe_error(exc)
+                    )
+
+    def register_peer(self, addr: Address) -> None:
+        """
+        Регистрирует клиента UDP: выдаёт номер клиента, как новому
+        соединению, и подтверждает регистрацию.
+
+        Args:
+            addr: Address - адрес клиента
+        """
+        if (
+            self.max_connections is not None
+            and len(self.clients) >= self.max_connections
+        ):
+            self.close_reasons[CLOSE_TOO_MANY] += 1
+            return
+
+        writer: DatagramWriter = DatagramWriter(
+            self.datagram_transport,
+            addr,
+            functools.partial(self.forget_peer, addr),
+        )
+        conn: ClientConnection = ClientConnection(
+            self.next_client_id, None, writer, self.admission.client_bucket()
+        )
+        self.next_client_id += 1
+        conn.datagram = True
+        self.clients[writer] = conn
+        self.peers[addr] = conn
+        self.peer_activity[addr] = time.monotonic()
+        self.touch(conn)
+        self.mark_sent(conn)
+        writer.write(REGISTER_ACK)
+        print(f"Клиент {conn.client_id} подключился по UDP (порт {addr[1]})")
+        if self.recorder:
+            self.recorder.record(EV_CONNECT, conn.client_id, addr[1], 'udp')
+
+    def forget_peer(self, addr: Address) -> None:
+        """
+        Убирает клиента UDP, как handle_client() убирает отключившееся
+        соединение (вызывается из DatagramWriter.close()).
+
+        Args:
+            addr: Address - адрес клиента
+        """
+        conn: Optional[ClientConnection] = self.peers.pop(addr, None)
+        if conn is None:
+            return
+        del self.peer_activity[addr]
+        for task in conn.pending:
+            task.cancel()
+        del self.clients[conn.writer]
+        self.activity.pop(conn, None)
+        self.last_sent.pop(conn, None)
+        reason: str = conn.close_reason or CLOSE_CLIENT
+        self.close_reasons[reason] += 1
+        if self.recorder:
+            self.recorder.record(EV_CLOSE, conn.client_id, detail=reason)
+
+    async def reap_peers(self) -> None:
+        """
+        Забывает клиентов UDP, от которых PEER_TIMEOUT секунд не было
+        датаграмм: соединения нет, и о том, что клиент ушёл, больше
+        ничего не скажет. Устроено как reap_idle(): peers упорядочен
+        по последней датаграмме.
+        """
+        while True:
+            now: float = time.monotonic()
+            while self.peers:
+                addr, conn = next(iter(self.peers.items()))
+                if now - self.peer_activity[addr] < PEER_TIMEOUT:
+                    break
+                conn.close_reason = CLOSE_IDLE
+                conn.writer.close()  # forget_peer() уберёт адрес
+
+            wait: float = PEER_TIMEOUT
+            if self.peers:
+                oldest: float = self.peer_activity[next(iter(self.peers))]
+                wait = oldest + PEER_TIMEOUT - now
+            await asyncio.sleep(wait)
+
+    def open_channel(
+        self, conn: ClientConnection, channel_id: int
+    ) -> Channel:
+        """
+        Находит канал соединения, при первом сообщении создаёт его.
 
-                self.response_counter += 1
+        Новый канал получает номер клиента из общей нумерации, как новое
+        соединение.
 
-        except Exception:
-            # Любая ошибка = разрыв соединения
+        Args:
+            conn: ClientConnection - мультиплексированное соединение
+            channel_id: int - номер канала из сообщения
+
+        Returns:
+            Channel - состояние канала
+        """
+        channel: Optional[Channel] = conn.channels.get(channel_id)
+        if channel is None:
+            channel = Channel(
+                channel_id, self.next_client_id, self.admission.client_bucket()
+            )
+            self.next_client_id += 1
+            conn.channels[channel_id] = channel
+            print(
+                f"Клиент {channel.client_id} подключился "
+                f"(канал {channel_id} соединения {conn.client_id})"
+            )
+        return channel
+
+    async def respond(
+        self,
+        conn: ClientConnection,
+        message: str,
+        req_num: int,
+        receive_time: datetime.datetime,
+        channel: Optional[Channel] = None,
+        trace: Optional[RequestTrace] = None,
+    ) -> None:
+        """
+        Отвечает PONG на один запрос после случайной задержки.
+
+        Args:
+            conn: ClientConnection - подключение клиента
+            message: str - текст запроса (например, "[0] PING")
+            req_num: int - номер запроса из сообщения
+            receive_time: datetime.datetime - время получения запроса
+            channel: Optional[Channel] - канал, от которого пришёл запрос
+                (None - обычное соединение)
+            trace: Optional[RequestTrace] - трасса запроса, если он выбран
+        """
+        delay: float = random.uniform(*self.delay)
+        if trace:
+            # От создания задачи до её первого шага
+            trace.stage('schedule')
+
+        # Имитация обработки: задержка 100-1000 мс
+        await asyncio.sleep(delay)
+        if trace:
+            # Намеренная задержка и опоздание пробуждения сверх неё
+            trace.stage('delay', trace.last_ns + int(delay * 1e9))
+            trace.stage('wake_lag')
+
+        number: int = self.next_response_number()
+        client_id: int = channel.client_id if channel else conn.client_id
+        response: str = f"[{number}/{req_num}] PONG ({client_id})\n"
+        if conn.binary:
+            data: bytes = encode_pong(number, req_num, client_id)
+        elif channel:
+            # В лог ответ попадает без номера канала, как у отдельного клиента
+            data = f"{channel.channel_id} {response}".encode(encoding="utf-8")
+        else:
+            data = response.encode(encoding="utf-8")
+
+        send_time: datetime.datetime = datetime.datetime.now()
+        if self.response_cache is not None:
+            self.response_cache.store(
+                (client_id, req_num), data, response.strip()
+            )
+
+        if trace:
+            trace.stage('encode')
+
+        if self.scheduler:
+            # Ответ уйдёт в свою очередь клиента, из неё - в outbox
+            self.scheduler.enqueue(
+                channel or conn, client_id, len(data), (conn, data, trace)
+            )
+        else:
+            # Отправка ответа клиенту (вместе с другими ответами итерации)
+            self.send(conn, data)
+
+        # Логирование успешной обработки
+        self.log_message(message, receive_time, response.strip(), send_time)
+        if trace:
+            trace.stage('log')
+            if not self.scheduler:
+                # Этапы очереди вывода и записи закроет flush()
+                conn.outbox_traces.append(trace)
+
+    def reply_clock(
+        self,
+        conn: ClientConnection,
+        channel: Optional[Channel],
+        message: str,
+    ) -> None:
+        """
+        Отвечает на запрос меток времени своими метками получения и ответа.
+
+        Ответ пишется в транспорт сразу, а не через outbox: метка t3 должна
+        быть как можно ближе к настоящей отправке.
+
+        Args:
+            conn: ClientConnection - подключение клиента
+            channel: Optional[Channel] - канал мультиплексного соединения
+            message: str - "TIME t1"
+
+        Исключения:
+            ValueError: некорректный запрос меток
+        """
+        received_us: int = now_us()
+        (t1,) = parse_clock(message)
+        reply: str = clock_reply(t1, received_us, now_us())
+        if channel:
+            reply = f"{channel.channel_id} {reply}"
+        conn.writer.write(f"{reply}\n".encode(encoding="utf-8"))
+
+    async def handle_health(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Отвечает на порту проверок здоровья: на сверку часов
+        (balancer.py) и на запрос счётчиков "STATS".
+
+        Ответ идёт из того же цикла событий, что и у клиентов, поэтому
+        зависший сервер проверку не пройдёт. Такое соединение - не
+        клиент: ни номера, ни keepalive, ни лимита соединений, ни лога.
+        Любая другая строка закрывает соединение.
+
+        Протокол:
+            "TIME t1" -> "TIME t1 t2 t3"
+            "STATS"   -> "STATS shed=3 client_rate=3 ... clients=2"
+
+        Args:
+            reader: asyncio.StreamReader - строки проверяющего
+            writer: asyncio.StreamWriter - ответы проверяющему
+        """
+        try:
+            while True:
+                line: bytes = await reader.readline()
+                if not line:
+                    break
+                received_us: int = now_us()
+                message: str = line.decode().strip()
+                if message == STATS_REQUEST:
+                    reply: str = self.stats_line()
+                else:
+                    (t1,) = parse_clock(message)
+                    reply = clock_reply(t1, received_us, now_us())
+                writer.write(f"{reply}\n".encode(encoding="utf-8"))
+        except (ConnectionError, ValueError):
             pass
         finally:
-            # Очистка ресурсов при отключении клиента
-            del self.clients[writer]
             writer.close()
 
+    def stats_line(self) -> str:
+        """
+        Счётчики работающего сервера одной строкой "STATS ключ=значение":
+        сброшенные при перегрузке запросы (всего и по причинам),
+        закрытые соединения по причинам, подключённые клиенты и ответы.
+        """
+        counters: Dict[str, int] = {
+            'shed': self.admission.shed_total,
+            **self.admission.shed,
+            **{
+                f"closed_{reason}": count
+                for reason, count in self.close_reasons.items()
+            },
+            'clients': len(self.clients),
+            'responses': self.response_counter,
+        }
+        return STATS_REQUEST + ''.join(
+            f" {key}={value}" for key, value in counters.items()
+        )
+
+    def replay_response(
+        self,
+        conn: ClientConnection,
+        message: str,
+        receive_time: datetime.datetime,
+        entry: Tuple[bytes, str],
+    ) -> None:
+        """
+        Отправляет сохранённый ответ на повторно присланный запрос.
+
+        Ни задержки, ни нового номера ответа: клиент получает те же байты,
+        что и в первый раз. В лог идёт обычная строка ответа с пометкой
+        "(повтор)".
+
+        Args:
+            conn: ClientConnection - подключение клиента
+            message: str - текст повторного запроса
+            receive_time: datetime.datetime - время получения повтора
+            entry: Tuple[bytes, str] - байты и текст исходного ответа
+        """
+        data, response = entry
+        self.send(conn, data)
+        self.log_message(
+            message,
+            receive_time,
+            f"{response} (повтор)",
+            datetime.datetime.now(),
+        )
+
+    def deliver(
+        self, item: Tuple[ClientConnection, bytes, Optional[RequestTrace]]
+    ) -> None:
+        """
+        Передаёт ответ из планировщика в очередь вывода соединения.
+
+        Args:
+            item: Tuple[ClientConnection, bytes, Optional[RequestTrace]] -
+                соединение, ответ и трасса запроса
+        """
+        conn, data, trace = item
+        self.send(conn, data)
+        if trace:
+            trace.stage('fair_queue')
+            conn.outbox_traces.append(trace)
+
+    def send(self, conn: ClientConnection, data: bytes) -> None:
+        """
+        Ставит сообщение в очередь вывода соединения.
+
+        Первое сообщение в пустой очереди планирует flush() на следующую
+        итерацию цикла событий. Все ответы и keepalive, ставшие готовыми в
+        текущей итерации, уйдут в сокет одной записью.
+
+        Args:
+            conn: ClientConnection - подключение клиента
+            data: bytes - готовое сообщение (строка или бинарный кадр)
+        """
+        conn.outbox.append(data)
+        if len(conn.outbox) == 1:
+            asyncio.get_running_loop().call_soon(self.flush, conn)
+
+    def flush(self, conn: ClientConnection) -> None:
+        """
+        Отправляет накопленную очередь вывода одной записью в транспорт.
+
+        drain() здесь не ждём: транспорт сам буферизует то, что ядро не
+        приняло сразу, и ни ответы, ни keepalive не стоят в ожидании
+        медленного клиента.
+
+        Args:
+            conn: ClientConnection - подключение клиента
+        """
+        if not conn.outbox:
+            return
+        messages: int = len(conn.outbox)
+        data: bytes = (
+            conn.outbox[0] if messages == 1 else b''.join(conn.outbox)
+        )
+        conn.outbox.clear()
+        traces: List[RequestTrace] = conn.outbox_traces
+        if traces:
+            conn.outbox_traces = []
+            for trace in traces:
+                trace.stage('send_queue')
+        if conn.writer.is_closing():
+            # Клиент отключился, пока ответы ждали своей очереди
+            return
+
+        conn.writer.write(data)
+        for trace in traces:
+            trace.stage('write')
+        if self.recorder:
+            self.recorder.record(EV_SEND, conn.client_id, len(data))
+        self.mark_sent(conn)
+        self.write_stats['writes'] += 1
+        self.write_stats['messages'] += messages
+        self.write_stats['bytes'] += len(data)
+
     def log_ignored(
         self, message: str, receive_time: datetime.datetime
     ) -> None:
@@ -168,6 +1151,44 @@ class Server:
         with open('server.log', 'a', encoding='UTF-8') as f:
             f.write(f"{date_str};{time_str};{message};(проигнорировано)\n")
 
+    def log_shed(self, message: str, receive_time: datetime.datetime) -> None:
+        """
+        Логирует запрос, сброшенный из-за перегрузки сервера.
+
+        В отличие от "(проигнорировано)" по спецификации, это осознанный
+        отказ контроля допуска, поэтому у него своя пометка.
+
+        Формат записи:
+            ГГГГ-ММ-ДД;ЧЧ:ММ:СС.ммм;запрос;(перегрузка)
+
+        Args:
+            message: str - текст запроса от клиента
+            receive_time: datetime.datetime - время получения запроса
+        """
+        date_str: str = datetime.datetime.now().strftime('%Y-%m-%d')
+        time_str: str = receive_time.strftime('%H:%M:%S.%f')[:-3]
+        with open('server.log', 'a', encoding='UTF-8') as f:
+            f.write(f"{date_str};{time_str};{message};(перегрузка)\n")
+
+    def log_in_flight(
+        self, message: str, receive_time: datetime.datetime
+    ) -> None:
+        """
+        Логирует повтор запроса, ответ на который ещё готовится: второй
+        раз запрос не обрабатывается, ответ на исходный придёт сам.
+
+        Формат записи:
+            ГГГГ-ММ-ДД;ЧЧ:ММ:СС.ммм;запрос;(повтор, ещё в пути)
+
+        Args:
+            message: str - текст повторного запроса
+            receive_time: datetime.datetime - время получения повтора
+        """
+        date_str: str = datetime.datetime.now().strftime('%Y-%m-%d')
+        time_str: str = receive_time.strftime('%H:%M:%S.%f')[:-3]
+        with open('server.log', 'a', encoding='UTF-8') as f:
+            f.write(f"{date_str};{time_str};{message};(повтор, ещё в пути)\n")
+
     def log_message(
         self,
         message: str,
@@ -196,65 +1217,476 @@ class Server:
         with open('server.log', 'a', encoding='UTF-8') as f:
             f.write(f"{date_str};{recv_str};{message};{send_str};{response}\n")
 
-    async def keepalive(self) -> None:
+    async def keepalive(self, first_delay: float = KEEPALIVE_INTERVAL) -> None:
         """
         Периодическая отправка keepalive сообщений всем подключенным клиентам.
 
         Работает в бесконечном цикле:
-        1. Ждет 5 секунд
+        1. Ждет 5 секунд (первый раз - first_delay, чтобы после передачи
+           работы новый процесс продолжил ритм старого)
         2. Формирует keepalive сообщение со сквозным номером
         3. Отправляет всем подключенным клиентам
-        4. Увеличивает счетчик ответов
+        4. Номер берётся из общего счетчика ответов
 
         Формат keepalive:
             [номер] keepalive\\n
 
         Пример:
             [5] keepalive\\n
+
+        Args:
+            first_delay: float - задержка перед первым keepalive, секунды
         """
+        if self.idle_keepalive:
+            await self.keepalive_idle()
+            return
+
+        delay: float = first_delay
         while True:
-            await asyncio.sleep(5)
+            await asyncio.sleep(delay)
+            delay = KEEPALIVE_INTERVAL
+            self.last_keepalive = time.monotonic()
+            self.send_keepalive(self.clients.values())
 
-            # Формируем keepalive сообщение
-            keepalive_msg: str = f"[{self.response_counter}] keepalive\n"
+    async def keepalive_idle(self) -> None:
+        """
+        Keepalive только соединениям, которым сервер молчит весь период.
 
-            # Отправляем всем подключенным клиентам (список из ключей словаря)
-            for writer in list(self.clients.keys()):
-                try:
-                    writer.write(keepalive_msg.encode(encoding="utf-8"))
-                    await writer.drain()
-                except:
-                    # Клиент отключился, продолжаем с остальными, т.е. поглотили исключение
-                    pass
+        Клиенту, недавно получившему PONG, keepalive не нужен: соединение
+        и так живое. Устроено как reap_idle(): last_sent упорядочен по
+        последней записи, поэтому просроченные соединения лежат в начале,
+        и проход останавливается на первом свежем. Пробуждения не чаще
+        раза в KEEPALIVE_BUCKET, и все соединения, чей период истёк за это
+        время, получают один keepalive с одним номером - нумерация ответов
+        остаётся сквозной без пропусков.
+        """
+        while True:
+            now: float = time.monotonic()
+            due: List[ClientConnection] = []
+            while self.last_sent:
+                conn, last = next(iter(self.last_sent.items()))
+                if now - last < KEEPALIVE_INTERVAL:
+                    break
+                # Сам keepalive - тоже запись: следующий через период
+                self.last_sent[conn] = now
+                self.last_sent.move_to_end(conn)
+                due.append(conn)
+            if due:
+                self.last_keepalive = now
+                self.send_keepalive(due)
 
-            self.response_counter += 1
+            wait: float = KEEPALIVE_INTERVAL
+            if self.last_sent:
+                oldest: float = next(iter(self.last_sent.values()))
+                wait = oldest + KEEPALIVE_INTERVAL - now
+            await asyncio.sleep(max(wait, KEEPALIVE_BUCKET))
+
+    def send_keepalive(self, conns: Iterable[ClientConnection]) -> None:
+        """
+        Ставит в очередь один keepalive со следующим номером ответа.
+
+        Args:
+            conns: Iterable[ClientConnection] - кому отправить
+        """
+        # Формируем keepalive сообщение
+        number: int = self.next_response_number()
+        if self.recorder:
+            self.recorder.record(EV_KEEPALIVE, ALL_CLIENTS, number)
+        keepalive_msg: str = f"[{number}] keepalive\n"
+        text: bytes = keepalive_msg.encode(encoding="utf-8")
+        frame: bytes = encode_keepalive(number)
+        # Мультиплексированному соединению - одна строка на все каналы
+        broadcast: bytes = f"{BROADCAST} ".encode() + text
+
+        # Ставим в очередь всем подключенным клиентам: отключившихся
+        # отсеет flush(), а медленный клиент не задерживает остальных
+        for conn in conns:
+            if conn.binary:
+                self.send(conn, frame)
+            elif conn.mux:
+                self.send(conn, broadcast)
+            else:
+                self.send(conn, text)
 
     async def start(self) -> None:
         """
         Запускает TCP-сервер и начинает принимать подключения.
 
         Процесс запуска:
-        1. Создает TCP-сервер на 127.0.0.1:8888
+        1. Создает TCP-сервер на 127.0.0.1:port и/или Unix-сервер на
+           unix_path (или забирает слушающие сокеты у работающего процесса,
+           если задан takeover_path)
         2. Запускает фоновую задачу keepalive
         3. Начинает принимать подключения клиентов
         4. Для каждого клиента запускает handle_client() в отдельной корутине
-        5. Работает до принудительной остановки (Ctrl+C)
+        5. Работает до принудительной остановки (Ctrl+C) или до передачи
+           работы новому процессу
 
         Использует asyncio.start_server() для создания асинхронного TCP-сервера.
         """
-        # Создание TCP-сервера
-        # (первый аргумент - функция обратного вызова, переменная без вызова сразу)
-        server: asyncio.Server = await asyncio.start_server(
-            self.handle_client, '127.0.0.1', 8888
+        if self.recorder:
+            # Исключения задач, которые никто не дождался, - в самописец
+            asyncio.get_running_loop().set_exception_handler(
+                self.recorder.loop_exception_handler
+            )
+        if self.takeover_path:
+            # Фаза 1: забираем слушающие сокеты и сразу принимаем клиентов
+            control: socket.socket = await asyncio.to_thread(
+                request_takeover, self.takeover_path
+            )
+            _, fds = await asyncio.to_thread(recv_message, control)
+            for fd in fds:
+                self.servers.append(
+                    await self.serve_socket(socket.socket(fileno=fd))
+                )
+            self.takeover_task = asyncio.create_task(
+                self.complete_takeover(control)
+            )
+            self.takeover_task.add_done_callback(self.check_task)
+            print("Сервер принял слушающие сокеты у предыдущего процесса")
+        else:
+            if self.tcp:
+                # Создание TCP-сервера
+                # (первый аргумент - функция обратного вызова, переменная без вызова сразу)
+                self.servers.append(
+                    await asyncio.start_server(
+                        self.handle_client,
+                        '127.0.0.1',
+                        self.port,
+                        limit=self.max_line,
+                    )
+                )
+                print(f"Сервер запущен на порту {self.port}")
+            if self.unix_path:
+                # Файл от прошлого запуска мешает bind()
+                if os.path.exists(self.unix_path):
+                    os.unlink(self.unix_path)
+                self.servers.append(
+                    await asyncio.start_unix_server(
+                        self.handle_client,
+                        self.unix_path,
+                        limit=self.max_line,
+                        **UNIX_SERVER_OPTIONS,
+                    )
+                )
+                print(f"Сервер запущен на Unix-сокете {self.unix_path}")
+            if self.udp:
+                loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+                self.datagram_transport, _ = (
+                    await loop.create_datagram_endpoint(
+                        lambda: DatagramServerProtocol(self.handle_datagram),
+                        local_addr=('127.0.0.1', self.port),
+                    )
+                )
+                self.peer_reaper_task = asyncio.create_task(
+                    self.reap_peers()
+                )
+                print(f"Сервер слушает UDP-порт {self.port}")
+            if self.health_port:
+                self.health_server = await asyncio.start_server(
+                    self.handle_health, '127.0.0.1', self.health_port
+                )
+                print(f"Проверки здоровья - на порту {self.health_port}")
+            self.state_ready.set()
+            # Запуск фоновой задачи keepalive
+            self.keepalive_task = asyncio.create_task(self.keepalive())
+            if self.idle_timeout is not None:
+                self.reaper_task = asyncio.create_task(self.reap_idle())
+            if self.handoff_path:
+                self.start_handoff_task()
+
+        # Запуск основного цикла сервера
+        try:
+            await self.stopped.wait()
+        finally:
+            for server in self.servers:
+                server.close()
+            if self.datagram_transport:
+                self.datagram_transport.close()
+            if self.health_server:
+                self.health_server.close()
+            # Файл Unix-сокета убираем, только если работа не передана
+            if (
+                self.unix_path
+                and not self.stopped.is_set()
+                and os.path.exists(self.unix_path)
+            ):
+                os.unlink(self.unix_path)
+
+    async def serve_socket(self, sock: socket.socket) -> asyncio.Server:
+        """
+        Начинает принимать клиентов на уже открытом слушающем сокете.
+
+        Args:
+            sock: socket.socket - слушающий TCP или Unix сокет
+
+        Returns:
+            asyncio.Server - сервер, обслуживающий этот сокет
+        """
+        if sock.family == socket.AF_UNIX:
+            return await asyncio.start_unix_server(
+                self.handle_client,
+                sock=sock,
+                limit=self.max_line,
+                **UNIX_SERVER_OPTIONS,
+            )
+        return await asyncio.start_server(
+            self.handle_client, sock=sock, limit=self.max_line
         )
 
-        # Запуск фоновой задачи keepalive
-        asyncio.create_task(self.keepalive())
+    def start_handoff_task(self) -> None:
+        """Запускает ожидание нового процесса (serve_handoff())."""
+        self.handoff_task = asyncio.create_task(self.serve_handoff())
+        self.handoff_task.add_done_callback(self.check_task)
 
-        # Запуск основного цикла сервера
-        async with server:
-            print("Сервер запущен на порту 8888")
-            await server.serve_forever()
+    def check_task(self, task: asyncio.Task[None]) -> None:
+        """
+        Сообщает об ошибке задачи передачи или приёма работы: иначе
+        передача молча не состоится, а приём не завершится.
+
+        Без принятых счётчиков обслуживать клиентов нельзя (нумерация
+        начнётся заново), поэтому при ошибке приёма процесс завершается.
+
+        Args:
+            task: asyncio.Task[None] - handoff_task или takeover_task
+        """
+        if task.cancelled() or task.exception() is None:
+            return
+        detail: str = describe_error(task.exception())
+        what: str = (
+            'Приём работы' if task is self.takeover_task else 'Передача работы'
+        )
+        print(f"{what} не удалась: {detail}")
+        if self.recorder:
+            self.recorder.record(EV_ERROR, ALL_CLIENTS, detail=detail)
+        if task is self.takeover_task:
+            self.stopped.set()
+
+    async def serve_handoff(self) -> None:
+        """
+        Ждёт новый процесс на управляющем Unix-сокете и передаёт ему работу.
+
+        После передачи выставляет событие stopped, и start() завершается.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        if os.path.exists(self.handoff_path):
+            os.unlink(self.handoff_path)
+
+        listener: socket.socket = socket.socket(
+            socket.AF_UNIX, socket.SOCK_STREAM
+        )
+        listener.bind(self.handoff_path)
+        listener.listen(1)
+        listener.setblocking(False)
+        try:
+            while True:
+                control, _ = await loop.sock_accept(listener)
+                control.setblocking(True)
+                if await asyncio.to_thread(accept_takeover, control):
+                    break
+                control.close()
+        finally:
+            # Путь освобождаем сразу: новый процесс займёт его для себя
+            listener.close()
+            os.unlink(self.handoff_path)
+
+        try:
+            await self.hand_off(control)
+        finally:
+            control.close()
+            self.stopped.set()
+
+    async def hand_off(self, control: socket.socket) -> None:
+        """
+        Передаёт работу новому процессу по управляющему соединению.
+
+        Фаза 1: перестаём принимать подключения и отдаём слушающие сокеты.
+        Фаза 2: перестаём читать клиентов, досылаем уже назначенные ответы
+        и отдаём счётчики, сокеты клиентов и непрочитанные ими байты.
+
+        Args:
+            control: socket.socket - управляющее соединение с новым процессом
+        """
+        # Фаза 1. Дубликаты дескрипторов переживут закрытие наших серверов
+        listen_fds: List[int] = [
+            os.dup(server.sockets[0].fileno()) for server in self.servers
+        ]
+        for server in self.servers:
+            server.close()
+        self.keepalive_task.cancel()
+        if self.reaper_task:
+            self.reaper_task.cancel()
+        try:
+            await asyncio.to_thread(
+                send_message, control, {'phase': 'listen'}, listen_fds
+            )
+        finally:
+            for fd in listen_fds:
+                os.close(fd)
+
+        # Фаза 2. Останавливаем чтение, не закрывая соединений (клиентов
+        # UDP не передаём: их сокет - сокет самого сервера)
+        connections: List[ClientConnection] = [
+            conn for conn in self.clients.values() if not conn.datagram
+        ]
+        for conn in connections:
+            conn.handed_off = True
+            conn.writer.transport.pause_reading()
+            conn.reader_task.cancel()
+        await asyncio.gather(
+            *(conn.reader_task for conn in connections),
+            return_exceptions=True,
+        )
+
+        # Досылаем ответы, которые уже ждут своей задержки
+        in_flight: List[asyncio.Task[None]] = [
+            task for conn in connections for task in conn.pending
+        ]
+        if in_flight:
+            _, late = await asyncio.wait(
+                in_flight, timeout=HANDOFF_DRAIN_TIMEOUT
+            )
+            for task in late:
+                task.cancel()
+
+        # Всё, что стоит в очередях вывода, уходит до передачи сокетов
+        if self.scheduler:
+            self.scheduler.drain()
+        for conn in connections:
+            self.flush(conn)
+            try:
+                await conn.writer.drain()
+            except ConnectionError:
+                pass
+
+        clients: List[Dict[str, Any]] = []
+        fds: List[int] = []
+        for conn in connections:
+            if conn.writer.is_closing():
+                continue
+            # Остаток недочитанной строки (или кадра вместе с заголовком,
+            # прочитанным до отмены) тоже принадлежит новому процессу
+            conn.reader.feed_eof()
+            buffered: bytes = unread_header(conn.reader) + (
+                await conn.reader.read()
+            )
+            clients.append(
+                {
+                    'client_id': conn.client_id,
+                    'binary': conn.binary,
+                    'buffered': buffered.decode('latin-1'),
+                    # Каналы: номер канала -> номер клиента (ключи JSON -
+                    # строки)
+                    'channels': (
+                        {
+                            str(channel.channel_id): channel.client_id
+                            for channel in conn.channels.values()
+                        }
+                        if conn.mux
+                        else None
+                    ),
+                }
+            )
+            fds.append(conn.writer.get_extra_info('socket').fileno())
+
+        state: Dict[str, Any] = {
+            'phase': 'state',
+            'response_counter': self.response_counter,
+            'next_client_id': self.next_client_id,
+            'keepalive_elapsed': time.monotonic() - self.last_keepalive,
+            'clients': clients,
+        }
+        await asyncio.to_thread(send_message, control, state, fds)
+
+        # Закрываем только свои копии: у нового процесса сокеты остаются
+        for conn in connections:
+            conn.writer.close()
+        print(f"Работа передана новому процессу, клиентов: {len(clients)}")
+
+    async def complete_takeover(self, control: socket.socket) -> None:
+        """
+        Фаза 2 приёма работы: получает счётчики и сокеты клиентов.
+
+        До этого момента новые подключения ждут в handle_client(), поэтому
+        номера клиентов и ответов продолжают нумерацию старого процесса.
+
+        Args:
+            control: socket.socket - управляющее соединение со старым процессом
+        """
+        try:
+            state, fds = await asyncio.to_thread(recv_message, control)
+        finally:
+            control.close()
+
+        self.response_counter = state['response_counter']
+        self.next_client_id = state['next_client_id']
+        for client, fd in zip(state['clients'], fds):
+            channels: Optional[Dict[str, int]] = client.get('channels')
+            await self.adopt_client(
+                fd,
+                client['client_id'],
+                client['binary'],
+                client['buffered'].encode('latin-1'),
+                (
+                    {int(ch): cid for ch, cid in channels.items()}
+                    if channels is not None
+                    else None
+                ),
+            )
+
+        self.state_ready.set()
+        self.keepalive_task = asyncio.create_task(
+            self.keepalive(
+                max(0.0, KEEPALIVE_INTERVAL - state['keepalive_elapsed'])
+            )
+        )
+        if self.idle_timeout is not None:
+            self.reaper_task = asyncio.create_task(self.reap_idle())
+        if self.handoff_path:
+            self.start_handoff_task()
+        print(f"Работа принята, клиентов: {len(state['clients'])}")
+
+    async def adopt_client(
+        self,
+        fd: int,
+        client_id: int,
+        binary: bool,
+        buffered: bytes,
+        channels: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """
+        Подключает клиента, переданного старым процессом.
+
+        Непрочитанные старым процессом байты кладутся в StreamReader до
+        того, как транспорт начнёт читать сокет, так что порядок данных
+        сохраняется.
+
+        Args:
+            fd: int - дескриптор сокета клиента
+            client_id: int - номер клиента, выданный старым процессом
+            binary: bool - клиент работает в бинарном режиме
+            buffered: bytes - непрочитанный остаток данных клиента
+            channels: Optional[Dict[int, int]] - каналы мультиплексированного
+                соединения: номер канала -> номер клиента
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        reader: asyncio.StreamReader = asyncio.StreamReader(
+            limit=self.max_line
+        )
+        if buffered:
+            reader.feed_data(buffered)
+        protocol: asyncio.StreamReaderProtocol = asyncio.StreamReaderProtocol(
+            reader,
+            functools.partial(
+                self.handle_client,
+                client_id=client_id,
+                binary=binary,
+                channels=channels,
+            ),
+        )
+        await loop.connect_accepted_socket(
+            lambda: protocol, socket.socket(fileno=fd)
+        )
 
 
 if __name__ == "__main__":
@@ -263,18 +1695,241 @@ if __name__ == "__main__":
 
     При запуске скрипта напрямую:
     1. Очищается лог-файл server.log
-    2. Создается экземпляр Server
+    2. Создается экземпляр Server (лимиты перегрузки - из аргументов)
     3. Запускается асинхронный цикл с server.start()
     4. Обрабатывается Ctrl+C для корректного завершения
+
+    Использование:
+        python server.py                               # строго по спецификации
+        python server.py --client-rate 5 --max-pending 20
+        python server.py --unix /tmp/pingpong.sock     # TCP и Unix-сокет
+        python server.py --unix /tmp/pingpong.sock --no-tcp
+        python server.py --udp                         # TCP и UDP
+        kill -USR2 <pid>    # сбросить самописец в server.flight
+
+        # hot restart: новый процесс забирает работу у старого
+        python server.py --handoff-path /tmp/server.sock
+        python server.py --takeover /tmp/server.sock --handoff-path /tmp/server.sock
     """
-    # Очищаем лог файл при каждом запуске
-    open('server.log', 'w').close()
+    parser = argparse.ArgumentParser(description='PING/PONG сервер')
+    parser.add_argument(
+        '--client-rate', type=float, help='лимит запросов/с на клиента'
+    )
+    parser.add_argument(
+        '--client-burst', type=float, help='всплеск запросов на клиента'
+    )
+    parser.add_argument(
+        '--global-rate', type=float, help='общий лимит запросов/с'
+    )
+    parser.add_argument(
+        '--global-burst', type=float, help='общий всплеск запросов'
+    )
+    parser.add_argument(
+        '--max-pending',
+        type=int,
+        help='максимум ожидающих ответов на одно соединение',
+    )
+    parser.add_argument(
+        '--handoff-path',
+        help='Unix-сокет для передачи работы следующему процессу',
+    )
+    parser.add_argument(
+        '--takeover',
+        metavar='PATH',
+        help='забрать работу у сервера, слушающего этот Unix-сокет',
+    )
+    parser.add_argument(
+        '--unix', metavar='PATH', help='слушать также Unix-сокет по пути'
+    )
+    parser.add_argument(
+        '--no-tcp',
+        action='store_true',
+        help='не слушать TCP (только вместе с --unix или --udp)',
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=PORT,
+        help='порт TCP и UDP (по умолчанию 8888)',
+    )
+    parser.add_argument(
+        '--udp',
+        action='store_true',
+        help='принимать клиентов и по UDP (тот же порт, что у TCP)',
+    )
+    parser.add_argument(
+        '--health-port',
+        type=int,
+        help='порт проверок здоровья для balancer.py: сверка часов и '
+        'счётчики по строке STATS, без номера клиента',
+    )
+    parser.add_argument(
+        '--delay-min',
+        type=float,
+        default=0.1,
+        help='минимальная задержка ответа, с',
+    )
+    parser.add_argument(
+        '--delay-max',
+        type=float,
+        default=1.0,
+        help='максимальная задержка ответа, с',
+    )
+    parser.add_argument(
+        '--ignore-rate',
+        type=float,
+        default=0.1,
+        help='вероятность проигнорировать запрос',
+    )
+    parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        help='закрывать соединения без сообщений дольше стольких секунд',
+    )
+    parser.add_argument(
+        '--idle-keepalive',
+        action='store_true',
+        help='keepalive только клиентам, которым сервер молчал весь период',
+    )
+    parser.add_argument(
+        '--response-cache',
+        type=int,
+        metavar='N',
+        help='помнить N последних ответов и отвечать ими на повторы запросов',
+    )
+    parser.add_argument(
+        '--schedule',
+        choices=[SCHEDULE_DRR, SCHEDULE_FIFO],
+        help='отправлять ответы через очередь: drr - поровну между '
+        'клиентами, fifo - в порядке готовности',
+    )
+    parser.add_argument(
+        '--send-budget',
+        type=int,
+        default=SEND_BUDGET,
+        help='байт ответов за итерацию цикла (с --schedule)',
+    )
+    parser.add_argument(
+        '--quantum',
+        type=int,
+        default=QUANTUM,
+        help='кредит клиента за ход drr, байт',
+    )
+    parser.add_argument(
+        '--max-line',
+        type=int,
+        default=MAX_LINE,
+        help='максимальная длина строки от клиента, байт',
+    )
+    parser.add_argument(
+        '--max-connections',
+        type=int,
+        help='максимум одновременных соединений',
+    )
+    parser.add_argument(
+        '--trace',
+        metavar='PATH',
+        help='записать трассы запросов (Chrome trace JSON) при остановке',
+    )
+    parser.add_argument(
+        '--flight-recorder',
+        type=int,
+        default=RECORDER_SIZE,
+        metavar='N',
+        help='помнить N последних событий для сброса по SIGUSR2, при '
+        'падении и выходе (0 - выключить)',
+    )
+    parser.add_argument(
+        '--flight-dump',
+        default='server.flight',
+        metavar='PATH',
+        help='куда дописывать сбросы самописца',
+    )
+    parser.add_argument(
+        '--trace-sample',
+        type=float,
+        default=0.01,
+        help='доля трассируемых запросов',
+    )
+    args = parser.parse_args()
+    if args.no_tcp and not (args.unix or args.udp):
+        parser.error('--no-tcp требует --unix или --udp')
+    if args.udp and (args.handoff_path or args.takeover):
+        parser.error('клиентов UDP нельзя передать другому процессу')
+    if args.health_port and (args.handoff_path or args.takeover):
+        parser.error('--health-port несовместим с перезапуском без простоя')
+    for option, burst in (
+        ('--client-burst', args.client_burst),
+        ('--global-burst', args.global_burst),
+    ):
+        if burst is not None and burst < 1:
+            parser.error(f'{option} должен быть не меньше 1')
+
+    # Очищаем лог файл при каждом запуске (кроме приёма работы: лог общий)
+    if not args.takeover:
+        open('server.log', 'w').close()
 
+    recorder: Optional[FlightRecorder] = None
+    if args.flight_recorder:
+        recorder = FlightRecorder(args.flight_recorder, args.flight_dump)
+        recorder.install()
+
+    server: Server = Server(
+        AdmissionController(
+            client_rate=args.client_rate,
+            client_burst=args.client_burst,
+            global_rate=args.global_rate,
+            global_burst=args.global_burst,
+            max_pending=args.max_pending,
+        ),
+        handoff_path=args.handoff_path,
+        takeover_path=args.takeover,
+        unix_path=args.unix,
+        tcp=not args.no_tcp,
+        udp=args.udp,
+        delay=(args.delay_min, args.delay_max),
+        ignore_rate=args.ignore_rate,
+        idle_timeout=args.idle_timeout,
+        idle_keepalive=args.idle_keepalive,
+        schedule=args.schedule,
+        send_budget=args.send_budget,
+        quantum=args.quantum,
+        response_cache=(
+            ResponseCache(args.response_cache) if args.response_cache else None
+        ),
+        max_line=args.max_line,
+        max_connections=args.max_connections,
+        tracer=(
+            Tracer(args.trace_sample, 'server') if args.trace else None
+        ),
+        recorder=recorder,
+        port=args.port,
+        health_port=args.health_port,
+    )
     try:
-        server: Server = Server()
         asyncio.run(server.start())
     except KeyboardInterrupt:
         print("\nСервер остановлен")
+        print(
+            f"Сброшено при перегрузке: {server.admission.shed_total} "
+            f"{server.admission.shed}"
+        )
+        print(f"Закрыто соединений по причинам: {server.close_reasons}")
+        if server.response_cache is not None:
+            print(f"Кэш ответов: {server.response_cache.summary()}")
+        if server.scheduler:
+            print(f"Ожидание в очереди ответов: {server.scheduler.summary()}")
+        if server.tracer:
+            written: int = server.tracer.write(args.trace)
+            print(f"Трассы: {written} событий в {args.trace}")
+        stats: Dict[str, int] = server.write_stats
+        if stats['writes']:
+            writes: int = stats['writes']
+            print(
+                f"Записей в сокеты: {writes}, "
+                f"сообщений на запись: {stats['messages'] / writes:.2f}, "
+                f"байт на запись: {stats['bytes'] / writes:.1f}"
+            )
 
 
 # Если у нас одна коробка 11,5 руб, а коробок 1000, то мы бы получили 11500 руб.
@@ -284,7 +1939,7 @@ if __name__ == "__main__":
 # Разница 540 руб.
 
 
-------------------------
+# ------------------------
 
-10768 руб получили после дождя, а хотели бы получить 11500
-купили за 10000 руб. итого прибыл 768 руб.
+# 10768 руб получили после дождя, а хотели бы получить 11500
+# купили за 10000 руб. итого прибыл 768 руб.
@@ -0,0 +1,166 @@
+"""
+Трассировка отдельных запросов по этапам (необязательный режим).
+
+Каждый выбранный запрос получает номер трассы, а его этапы - отрезки
+времени по time.monotonic_ns(). Этапы идут друг за другом: конец одного -
+начало следующего, поэтому по трассе видно, куда ушло время запроса
+(разбор, намеренная задержка, ожидание цикла событий, очередь вывода,
+запись лога).
+
+Трассируется доля запросов sample_rate, события копятся в памяти
+(не больше max_events, старые вытесняются) и выгружаются в формате
+Chrome trace-event JSON: файл открывается в chrome://tracing или
+https://ui.perfetto.dev. Каждая трасса - отдельная строка (tid), время
+в микросекундах. CLOCK_MONOTONIC общий для процессов одной машины, так что
+трассы сервера и клиентов можно склеить в один файл (списки traceEvents).
+"""
+
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+MAX_EVENTS: int = 100_000
+
+
+class Tracer:
+    """
+    Буфер событий трассировки одного процесса.
+
+    Атрибуты:
+        sample_rate: float - доля трассируемых запросов (0..1)
+        events: Deque[Dict[str, Any]] - события в формате trace-event
+        next_id: int - номер следующей трассы
+        pid: int - номер процесса в событиях
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        process_name: str = '',
+        max_events: int = MAX_EVENTS,
+    ) -> None:
+        """
+        Args:
+            sample_rate: float - доля трассируемых запросов (0..1)
+            process_name: str - подпись процесса в просмотрщике
+            max_events: int - сколько событий держать в памяти
+        """
+        self.sample_rate: float = sample_rate
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.next_id: int = 1
+        self.pid: int = os.getpid()
+        self.metadata: Dict[str, Any] = {
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': self.pid,
+            'args': {'name': process_name or f'pid {self.pid}'},
+        }
+
+    def start(
+        self, name: str, start_ns: Optional[int] = None, **args: Any
+    ) -> Optional['RequestTrace']:
+        """
+        Решает, трассировать ли запрос, и начинает трассу.
+
+        Args:
+            name: str - подпись трассы (например, "клиент 3 [5] PING")
+            start_ns: Optional[int] - начало первого этапа (по умолчанию -
+                сейчас)
+            **args: Any - поля, которые попадут в каждое событие трассы
+
+        Returns:
+            Optional[RequestTrace] - трасса или None, если запрос не выбран
+        """
+        if random.random() >= self.sample_rate:
+            return None
+        trace_id: int = self.next_id
+        self.next_id += 1
+        self.events.append(
+            {
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': self.pid,
+                'tid': trace_id,
+                'args': {'name': name},
+            }
+        )
+        return RequestTrace(self, trace_id, args, start_ns)
+
+    def span(
+        self,
+        trace_id: int,
+        name: str,
+        start_ns: int,
+        end_ns: int,
+        args: Dict[str, Any],
+    ) -> None:
+        """Записывает один этап трассы (событие "X")."""
+        self.events.append(
+            {
+                'name': name,
+                'ph': 'X',
+                'pid': self.pid,
+                'tid': trace_id,
+                'ts': start_ns / 1000,
+                'dur': (end_ns - start_ns) / 1000,
+                'args': args,
+            }
+        )
+
+    def write(self, path: str) -> int:
+        """
+        Выгружает накопленные события в файл Chrome trace JSON.
+
+        Args:
+            path: str - путь к файлу
+
+        Returns:
+            int - сколько событий записано
+        """
+        events = [self.metadata, *self.events]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'traceEvents': events, 'displayTimeUnit': 'ms'},
+                f,
+                ensure_ascii=False,
+            )
+        return len(events)
+
+
+class RequestTrace:
+    """
+    Трасса одного запроса: этапы пишутся подряд, каждый от конца
+    предыдущего.
+    """
+
+    __slots__ = ('tracer', 'trace_id', 'args', 'last_ns')
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        trace_id: int,
+        args: Dict[str, Any],
+        start_ns: Optional[int] = None,
+    ) -> None:
+        self.tracer: Tracer = tracer
+        self.trace_id: int = trace_id
+        self.args: Dict[str, Any] = {'trace_id': trace_id, **args}
+        self.last_ns: int = (
+            time.monotonic_ns() if start_ns is None else start_ns
+        )
+
+    def stage(self, name: str, end_ns: Optional[int] = None) -> None:
+        """
+        Закрывает этап name, начавшийся в конце предыдущего.
+
+        Args:
+            name: str - название этапа
+            end_ns: Optional[int] - конец этапа (по умолчанию - сейчас)
+        """
+        if end_ns is None:
+            end_ns = time.monotonic_ns()
+        self.tracer.span(self.trace_id, name, self.last_ns, end_ns, self.args)
+        self.last_ns = end_ns